@@ -81,7 +81,15 @@ async def run_async_migrations() -> None:
 
 
 def run_migrations_online() -> None:
-    """Run migrations in 'online' mode."""
+    """Run migrations in 'online' mode.
+
+    Uses the connection passed in ``config.attributes["connection"]`` if any, e.g. the one
+    holding the migrations lock, see src/db/migrations.py.
+    """
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        do_run_migrations(connection)
+        return
 
     asyncio.run(run_async_migrations())
 
@@ -37,7 +37,7 @@ def upgrade() -> None:
 
     op.bulk_insert(
         sa.table(
-            "user_account",
+            "user_accounts",
             sa.column("id", sa.Integer),
             sa.column("username", sa.String(30)),
             sa.column("fullname", sa.String(30)),
@@ -0,0 +1,30 @@
+"""add_user_token_version
+
+Revision ID: 3b7c2e91d4a5
+Revises: 9d18b9bb73f4
+Create Date: 2026-10-17 10:12:41.503118
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3b7c2e91d4a5"
+down_revision: Union[str, None] = "9d18b9bb73f4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "user_accounts",
+        sa.Column("token_version", sa.Integer(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("user_accounts", "token_version")
@@ -0,0 +1,39 @@
+"""widen_user_hashed_password
+
+Revision ID: c41f08a2e6d3
+Revises: 3b7c2e91d4a5
+Create Date: 2026-10-17 11:47:05.228714
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c41f08a2e6d3"
+down_revision: Union[str, None] = "3b7c2e91d4a5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        "user_accounts",
+        "hashed_password",
+        existing_type=sa.String(length=64),
+        type_=sa.String(length=128),
+        existing_nullable=False,
+    )
+
+
+def downgrade() -> None:
+    op.alter_column(
+        "user_accounts",
+        "hashed_password",
+        existing_type=sa.String(length=128),
+        type_=sa.String(length=64),
+        existing_nullable=False,
+    )
@@ -0,0 +1,36 @@
+"""add_user_token_revoked_at
+
+Revision ID: 7e5a1d03b9c2
+Revises: c41f08a2e6d3
+Create Date: 2026-10-17 21:40:12.318274
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7e5a1d03b9c2"
+down_revision: Union[str, None] = "c41f08a2e6d3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "user_accounts",
+        sa.Column("token_revoked_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index(
+        "ix_user_accounts_token_revoked_at", "user_accounts", ["token_revoked_at"], unique=False
+    )
+    # Tokens revoked before the column existed may still be valid for a token lifetime.
+    op.execute("UPDATE user_accounts SET token_revoked_at = now() WHERE token_version > 0")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_accounts_token_revoked_at", table_name="user_accounts")
+    op.drop_column("user_accounts", "token_revoked_at")
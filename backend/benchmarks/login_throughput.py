@@ -0,0 +1,89 @@
+"""Login throughput of the password hashing service at different pool sizes.
+
+Every simulated login verifies a scrypt hash through ``HashingService``, which is the CPU-bound
+part of ``AuthController.login``. Besides logins per second, the benchmark reports the worst
+event loop lag observed by a ticker coroutine, i.e. how long other requests would be stalled.
+
+Run from the backend directory:
+    python -m benchmarks.login_throughput --logins 200 --pool-sizes 1 2 4 8
+"""
+
+import argparse
+import asyncio
+import time
+
+from src.service_layer.hasher import Hasher
+from src.service_layer.hashing_service import HashingService
+
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.005) -> float:
+    max_lag = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        max_lag = max(max_lag, time.perf_counter() - started - interval)
+    return max_lag
+
+
+async def run_inline(logins: int, password: str, hashed_password: str) -> tuple[float, float]:
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    for _ in range(logins):
+        Hasher.verify_password(password, hashed_password)
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    return logins / elapsed, await lag_task
+
+
+async def run_pool(
+    pool_kind: str, pool_size: int, logins: int, password: str, hashed_password: str
+) -> tuple[float, float]:
+    service = HashingService(pool_kind=pool_kind, pool_size=pool_size, queue_size=logins)
+    await service.verify_password(password, hashed_password)
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(service.verify_password(password, hashed_password) for _ in range(logins))
+    )
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    max_lag = await lag_task
+    service.shutdown()
+    return logins / elapsed, max_lag
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--pool-kinds", nargs="+", default=["thread", "process"])
+    args = parser.parse_args()
+
+    password = "benchmark-password"
+    hashed_password = Hasher.get_password_hash(password)
+
+    print(f"{'mode':<10}{'pool size':>10}{'logins/s':>12}{'max loop lag, ms':>20}")  # noqa: T201
+    throughput, max_lag = await run_inline(args.logins, password, hashed_password)
+    print(f"{'inline':<10}{'-':>10}{throughput:>12.1f}{max_lag * 1000:>20.1f}")  # noqa: T201
+
+    for pool_kind in args.pool_kinds:
+        for pool_size in args.pool_sizes:
+            throughput, max_lag = await run_pool(
+                pool_kind, pool_size, args.logins, password, hashed_password
+            )
+            print(  # noqa: T201
+                f"{pool_kind:<10}{pool_size:>10}{throughput:>12.1f}{max_lag * 1000:>20.1f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
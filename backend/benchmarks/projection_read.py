@@ -0,0 +1,99 @@
+"""Read throughput of ORM hydration versus column projection for the user list.
+
+The ORM path is the one ``GET /api/users`` used before: ``find_all`` hydrates ``User`` instances,
+converts them with ``to_read_model`` and builds a ``ShowUser`` per row. The projection path is
+``find_all_as(ShowUser)``, which selects only the needed columns and validates all rows with one
+``TypeAdapter`` call. The seeded users are inserted in a transaction that is rolled back.
+
+Run from the backend directory against a development database:
+    python -m benchmarks.projection_read --rows 10000 100000 --repeat 5
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import insert
+
+from src.db.models.user import User
+from src.db.session import db_connections
+from src.repositories.user import UserRepository
+from src.schemas import ShowUser
+
+
+async def read_with_orm(repository: UserRepository) -> list[ShowUser]:
+    users = await repository.find_all()
+    result = [
+        ShowUser(
+            id=user.id,
+            username=user.username,
+            fullname=user.fullname,
+            email=user.email,
+            disabled=user.disabled,
+            roles=user.roles,
+        )
+        for user in users
+    ]
+    repository.session.expunge_all()
+    return result
+
+
+async def read_with_projection(repository: UserRepository) -> list[ShowUser]:
+    return await repository.find_all_as(ShowUser)
+
+
+async def best_of(
+    repeat: int, read: Callable[[UserRepository], Awaitable[list[Any]]], repository: UserRepository
+) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await read(repository)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+async def run(rows: int, repeat: int) -> tuple[float, float]:
+    tag = uuid.uuid4().hex[:8]
+    async with db_connections.async_session() as session:
+        repository = UserRepository(session)
+        await session.execute(
+            insert(User),
+            [
+                {
+                    "username": f"bench{tag}{i}",
+                    "fullname": "Benchmark User",
+                    "email": f"bench{i}@example.com",
+                    "hashed_password": "x" * 96,
+                    "disabled": False,
+                    "roles": ["STUDENT", "TUTOR"],
+                }
+                for i in range(rows)
+            ],
+        )
+        orm_seconds = await best_of(repeat, read_with_orm, repository)
+        projection_seconds = await best_of(repeat, read_with_projection, repository)
+        await session.rollback()
+    return orm_seconds, projection_seconds
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}{'orm, ms':>12}{'projection, ms':>18}{'speedup':>10}")  # noqa: T201
+    for rows in args.rows:
+        orm_seconds, projection_seconds = await run(rows, args.repeat)
+        print(  # noqa: T201
+            f"{rows:>10}{orm_seconds * 1000:>12.1f}{projection_seconds * 1000:>18.1f}"
+            f"{orm_seconds / projection_seconds:>10.2f}"
+        )
+    await db_connections.engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
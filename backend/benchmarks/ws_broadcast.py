@@ -0,0 +1,124 @@
+"""Broadcast to many websockets with a few slow clients: sequential sends versus queues.
+
+The sequential path is the one ``ConnectionManager.broadcast`` used before: it awaits
+``send_text`` for every connection in turn, so each slow client delays the broadcast and every
+client after it. The queued path is the current manager: ``broadcast`` only enqueues and every
+connection has its own writer task. The sockets are simulated: a send takes one event loop
+iteration, or ``--slow-delay-ms`` for the ``--slow-fraction`` of slow clients.
+
+Run from the backend directory:
+    python -m benchmarks.ws_broadcast --sockets 10000 --messages 10
+"""
+
+import argparse
+import asyncio
+import time
+
+from src.controllers.ws import ConnectionManager
+
+
+class SimulatedWebSocket:
+    def __init__(self, delay_seconds: float) -> None:
+        self.delay_seconds = delay_seconds
+        self.received = 0
+        self.scope: dict = {}
+
+    async def accept(self, subprotocol: str | None = None) -> None:
+        pass
+
+    async def send_text(self, message: str) -> None:
+        await asyncio.sleep(self.delay_seconds)
+        self.received += 1
+
+    async def close(self, code: int) -> None:
+        pass
+
+
+def make_websockets(
+    sockets: int, slow_fraction: float, slow_delay_ms: float
+) -> list[SimulatedWebSocket]:
+    slow_every = round(1 / slow_fraction) if slow_fraction else 0
+    return [
+        SimulatedWebSocket(slow_delay_ms / 1000 if slow_every and i % slow_every == 0 else 0)
+        for i in range(sockets)
+    ]
+
+
+async def wait_delivered(websockets: list[SimulatedWebSocket], messages: int) -> None:
+    while any(websocket.received < messages for websocket in websockets):
+        await asyncio.sleep(0.01)
+
+
+async def run_sequential(
+    websockets: list[SimulatedWebSocket], messages: int
+) -> tuple[float, float]:
+    started = time.perf_counter()
+    for i in range(messages):
+        for websocket in websockets:
+            await websocket.send_text(f"message {i}")
+    elapsed = time.perf_counter() - started
+    # The broadcaster is blocked for the whole delivery, fast clients wait for slow ones.
+    return elapsed / messages, elapsed
+
+
+async def run_queued(
+    websockets: list[SimulatedWebSocket], messages: int, queue_size: int
+) -> tuple[float, float, int]:
+    manager = ConnectionManager(
+        queue_size=queue_size, overflow_policy="drop_oldest", send_timeout_seconds=60
+    )
+    for user_id, websocket in enumerate(websockets):
+        await manager.connect(user_id, websocket)
+    await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    enqueue_seconds = 0.0
+    for i in range(messages):
+        enqueue_started = time.perf_counter()
+        manager.broadcast(f"message {i}")
+        enqueue_seconds += time.perf_counter() - enqueue_started
+        await asyncio.sleep(0)
+    await wait_delivered(
+        [websocket for websocket in websockets if not websocket.delay_seconds], messages
+    )
+    fast_delivered = time.perf_counter() - started
+    dropped = manager.dropped_messages
+    await manager.close_all()
+    return enqueue_seconds / messages, fast_delivered, dropped
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sockets", type=int, default=10_000)
+    parser.add_argument("--messages", type=int, default=10)
+    parser.add_argument("--slow-fraction", type=float, default=0.01)
+    parser.add_argument("--slow-delay-ms", type=float, default=20)
+    parser.add_argument("--queue-size", type=int, default=256)
+    args = parser.parse_args()
+
+    def make() -> list[SimulatedWebSocket]:
+        return make_websockets(args.sockets, args.slow_fraction, args.slow_delay_ms)
+
+    sequential_blocked, sequential_delivered = await run_sequential(make(), args.messages)
+    queued_blocked, queued_delivered, dropped = await run_queued(
+        make(), args.messages, args.queue_size
+    )
+
+    print(  # noqa: T201
+        f"{args.sockets} sockets, {args.slow_fraction:.1%} slow by {args.slow_delay_ms:g} ms, "
+        f"{args.messages} messages"
+    )
+    print(  # noqa: T201
+        f"{'':>12}{'broadcast blocks, ms':>24}{'fast clients served, ms':>27}{'dropped':>10}"
+    )
+    print(  # noqa: T201
+        f"{'sequential':>12}{sequential_blocked * 1000:>24.2f}"
+        f"{sequential_delivered * 1000:>27.1f}{0:>10}"
+    )
+    print(  # noqa: T201
+        f"{'queued':>12}{queued_blocked * 1000:>24.2f}{queued_delivered * 1000:>27.1f}{dropped:>10}"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,119 @@
+"""Dashboard updates over websockets: JSON text frames versus the batched msgpack framing.
+
+Every socket subscribes to one dashboard topic, which receives ``--messages`` small updates
+in bursts of ``--burst``. The sockets are simulated and record the size of every frame,
+including the websocket frame header, so bytes are the ones on the wire before any
+permessage-deflate. CPU is the process time spent publishing, framing and sending, per
+delivered message.
+
+Run from the backend directory:
+    python -m benchmarks.ws_framing_bench --sockets 1000 --messages 200
+"""
+
+import argparse
+import asyncio
+import time
+
+from src.controllers.ws import ConnectionManager
+from src.controllers.ws_framing import MsgpackFraming, TextFraming
+
+TOPIC = "dashboard:tutor"
+
+
+class RecordingWebSocket:
+    def __init__(self, subprotocols: list[str]) -> None:
+        self.scope = {"subprotocols": subprotocols}
+        self.frames = 0
+        self.bytes = 0
+
+    async def accept(self, subprotocol: str | None = None) -> None:
+        pass
+
+    async def send_text(self, message: str) -> None:
+        self.record(len(message.encode()))
+
+    async def send_bytes(self, message: bytes) -> None:
+        self.record(len(message))
+
+    async def close(self, code: int) -> None:
+        pass
+
+    def record(self, size: int) -> None:
+        # Server frames are not masked: 2 bytes of header, plus 2 or 8 for the length.
+        self.bytes += size + (2 if size < 126 else 4 if size < 65536 else 10)
+        self.frames += 1
+
+
+def make_update(i: int) -> dict:
+    return {
+        "student_id": i % 30,
+        "lesson_id": 1042,
+        "progress": round(i % 100 / 100, 2),
+        "status": "active" if i % 7 else "idle",
+        "updated_at": "2026-10-17T12:00:00Z",
+    }
+
+
+async def run(framing: TextFraming, sockets: int, messages: int, burst: int) -> tuple:
+    framings = {} if framing.subprotocol is None else {framing.subprotocol: framing}
+    manager = ConnectionManager(
+        queue_size=messages + 1, framings=framings, heartbeat_interval_seconds=0
+    )
+    offered = [] if framing.subprotocol is None else [framing.subprotocol]
+    websockets = [RecordingWebSocket(offered) for _ in range(sockets)]
+    for user_id, websocket in enumerate(websockets):
+        manager.subscribe(await manager.connect(user_id, websocket), TOPIC)
+    await asyncio.sleep(0)
+
+    started = time.process_time()
+    for i in range(0, messages, burst):
+        for j in range(i, min(i + burst, messages)):
+            manager.publish(TOPIC, make_update(j))
+        await asyncio.sleep(0.002)
+    while manager.sent_messages < sockets * messages:
+        await asyncio.sleep(0.005)
+    cpu_seconds = time.process_time() - started
+    await manager.close_all()
+
+    delivered = sockets * messages
+    return (
+        sum(websocket.frames for websocket in websockets),
+        sum(websocket.bytes for websocket in websockets) / delivered,
+        cpu_seconds / delivered,
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sockets", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--burst", type=int, default=20)
+    parser.add_argument("--batch-interval-ms", type=float, default=10)
+    parser.add_argument("--compression-threshold", type=int, default=1024)
+    args = parser.parse_args()
+
+    interval = args.batch_interval_ms / 1000
+    variants = {
+        "json text": TextFraming(),
+        "msgpack": MsgpackFraming(0, 1, compression_threshold_bytes=2**31),
+        "+ batched": MsgpackFraming(interval, 100, compression_threshold_bytes=2**31),
+        "+ compressed": MsgpackFraming(interval, 100, args.compression_threshold),
+    }
+
+    print(  # noqa: T201
+        f"{args.sockets} sockets, {args.messages} messages in bursts of {args.burst}, "
+        f"batch interval {args.batch_interval_ms:g} ms, compression from "
+        f"{args.compression_threshold} bytes"
+    )
+    print(f"{'':>14}{'frames':>10}{'bytes/message':>16}{'CPU us/message':>17}")  # noqa: T201
+    for name, framing in variants.items():
+        frames, bytes_per_message, cpu_per_message = await run(
+            framing, args.sockets, args.messages, args.burst
+        )
+        print(  # noqa: T201
+            f"{name:>14}{frames:>10}{bytes_per_message:>16.1f}{cpu_per_message * 1e6:>17.2f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,7 +1,7 @@
 import os
 from pathlib import Path
 
-from pydantic import SecretStr
+from pydantic import Field, SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 env_path = Path(__file__).parent / "../.env"
@@ -15,6 +15,13 @@ class AppConfig(ConfigBase):
     SERVER_HOST: str
     PRODUCTION: bool = True
     NGINX_PORT: int = 8002
+    METRICS_TOKEN: SecretStr | None = None
+
+    # Production launcher, see serve.py.
+    BIND_HOST: str = "0.0.0.0"
+    BIND_PORT: int = 8000
+    WORKERS: int = Field(default_factory=lambda: os.cpu_count() or 1)
+    GRACEFUL_SHUTDOWN_SECONDS: float = 30
 
 
 class DatabaseConfig(ConfigBase):
@@ -27,10 +34,94 @@ class DatabaseConfig(ConfigBase):
 
     PORT_TEST: str | None = None
 
+    POOL_SIZE: int = 5
+    POOL_MAX_OVERFLOW: int = 10
+    POOL_TIMEOUT_SECONDS: float = 30
+    POOL_RECYCLE_SECONDS: int = 30 * 60
+    POOL_PRE_PING: bool = False
+    # Connections opened at startup, defaults to POOL_SIZE; 0 disables pre-warming.
+    POOL_PREWARM_SIZE: int | None = None
+    STATEMENT_TIMEOUT_MS: int = 30_000
+    APPLICATION_NAME: str = "tutor-lab"
+    READ_ONLY_AUTOCOMMIT: bool = False
+
+    # Comma-separated host:port of streaming replicas, with the credentials of the primary.
+    REPLICA_HOSTS: str = ""
+    REPLICA_SELECTION: str = "round_robin"
+    REPLICA_MAX_LAG_SECONDS: float = 5
+    REPLICA_LAG_CHECK_INTERVAL_SECONDS: float = 2
+    READ_YOUR_WRITES_SECONDS: float = 5
+
+    HEALTH_CHECK_INTERVAL_SECONDS: float = 5
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = 2
+    HEALTH_FAILURE_THRESHOLD: int = 2
+    HEALTH_RETRY_SECONDS: float = 1
+
 
 class AuthConfig(ConfigBase):
     VERIFYING_KEY: SecretStr
     JWT_ALGORITHM: str = "HS256"
+    JWT_LIFE_TIME_MINUTES: int = 24 * 60
+    JWT_EXPIRY_JITTER_MINUTES: int = 4 * 60
+    # Refreshing extends a session up to this long after the login, then it has to log in again.
+    JWT_MAX_SESSION_MINUTES: int = 30 * 24 * 60
+
+    IDENTITY_CACHE_MAX_SIZE: int = 10_000
+    IDENTITY_CACHE_TTL_SECONDS: float = 60
+
+    PASSWORD_SCRYPT_N: int = 2**14
+    PASSWORD_HASH_POOL: str = "thread"
+    PASSWORD_HASH_POOL_SIZE: int = 2
+    PASSWORD_HASH_QUEUE_SIZE: int = 32
+
+    STATELESS_AUTH: bool = False
+    TOKEN_REVOCATION_REFRESH_SECONDS: float = 30
+
+
+class RateLimitConfig(ConfigBase):
+    model_config = SettingsConfigDict(env_prefix="RATE_LIMIT_")
+    ENABLED: bool = True
+    MAX_KEYS: int = 100_000
+    # Comma-separated addresses or networks of reverse proxies, e.g. Nginx, whose
+    # X-Forwarded-For and X-Real-IP headers identify the client.
+    TRUSTED_PROXIES: str = ""
+
+    AUTH_IP_LIMIT: int = 60
+    AUTH_IP_PERIOD_SECONDS: float = 60
+    LOGIN_USERNAME_LIMIT: int = 20
+    LOGIN_USERNAME_PERIOD_SECONDS: float = 60
+    USERS_WRITE_IP_LIMIT: int = 120
+    USERS_WRITE_IP_PERIOD_SECONDS: float = 60
+
+
+class WebSocketConfig(ConfigBase):
+    model_config = SettingsConfigDict(env_prefix="WS_")
+    # Messages waiting to be sent per connection.
+    SEND_QUEUE_SIZE: int = 256
+    # What to do when the queue of a slow client is full: drop_oldest, drop_newest or disconnect.
+    OVERFLOW_POLICY: str = "drop_oldest"
+    # A client that does not accept a message for this long is disconnected.
+    SEND_TIMEOUT_SECONDS: float = 10
+    MAX_TOPICS_PER_CONNECTION: int = 100
+    # How messages reach the sockets of other workers: postgres (LISTEN/NOTIFY) or local,
+    # for a single worker.
+    FANOUT_BACKEND: str = "postgres"
+    FANOUT_CHANNEL: str = "ws_fanout"
+    FANOUT_BATCH_INTERVAL_SECONDS: float = 0.005
+    # Recent messages kept per user, topic and for broadcasts, for clients resuming a session.
+    REPLAY_BUFFER_SIZE: int = 100
+    REPLAY_MAX_STREAMS: int = 10_000
+    # A client that sent nothing for this long is pinged, 0 disables the heartbeat.
+    HEARTBEAT_INTERVAL_SECONDS: float = 25
+    # A pinged client that does not answer within this is evicted as half-open.
+    HEARTBEAT_TIMEOUT_SECONDS: float = 10
+    # A client that sent nothing but pongs for this long is evicted, 0 keeps listeners open.
+    IDLE_TIMEOUT_SECONDS: float = 0
+    # Clients negotiating the tutorlab.msgpack.v1 subprotocol get the messages queued within
+    # this interval in one binary frame, compressed from the threshold on.
+    BINARY_BATCH_INTERVAL_SECONDS: float = 0.01
+    BINARY_MAX_BATCH_MESSAGES: int = 100
+    BINARY_COMPRESSION_THRESHOLD_BYTES: int = 1024
 
 
 class MinioConfig(ConfigBase):
@@ -38,6 +129,22 @@ class MinioConfig(ConfigBase):
     MINIO_ROOT_USER: str
     MINIO_ROOT_PASSWORD: SecretStr
     MINIO_SECURE: bool
+    MINIO_BUCKET_NAME: str = "polyplan-configs-bucket"
+    # Storage calls of the async client run in this many threads, each with its connection.
+    MINIO_MAX_CONCURRENCY: int = 16
+    MINIO_CONNECT_TIMEOUT_SECONDS: float = 5
+    # Longest wait for data from MinIO within a call.
+    MINIO_READ_TIMEOUT_SECONDS: float = 30
+    # Longest wait for a whole call, including the wait for a free thread.
+    MINIO_CALL_TIMEOUT_SECONDS: float = 120
+    # Streaming uploads are sent in parts of this size, S3 requires at least 5 MiB. An upload
+    # holds about (MINIO_UPLOAD_MAX_CONCURRENT_PARTS + 2) parts in memory.
+    MINIO_UPLOAD_PART_SIZE_BYTES: int = Field(8 * 1024 * 1024, ge=5 * 1024 * 1024)
+    MINIO_UPLOAD_MAX_CONCURRENT_PARTS: int = 4
+    MINIO_UPLOAD_MAX_BYTES: int = 5 * 1024 * 1024 * 1024
+    # Multipart uploads left unfinished, e.g. by a killed worker, are aborted after this long.
+    MINIO_STALE_UPLOAD_SECONDS: float = 24 * 3600
+    MINIO_STALE_UPLOAD_CHECK_SECONDS: float = 3600
 
 
 def get_remote_minio_url(
@@ -83,9 +190,28 @@ def create_database_url(config: DatabaseConfig, test_port: bool = False) -> str
     return f"postgresql+asyncpg://{config.USER}:{config.PASS.get_secret_value()}@{config.HOST}:{port}/{config.NAME}"
 
 
+def create_replica_urls(config: DatabaseConfig) -> list[str]:
+    """Generates the connection URLs of the read replicas.
+
+    Args:
+        config (DatabaseConfig): The configuration with the database connection information.
+
+    Returns:
+        list[str]: One URL per entry of REPLICA_HOSTS, empty if no replicas are configured.
+    """
+    credentials = f"{config.USER}:{config.PASS.get_secret_value()}"
+    return [
+        f"postgresql+asyncpg://{credentials}@{host.strip()}/{config.NAME}"
+        for host in config.REPLICA_HOSTS.split(",")
+        if host.strip()
+    ]
+
+
 db_conf = DatabaseConfig()
 auth_config = AuthConfig()
+rate_limit_config = RateLimitConfig()
 minio_config = MinioConfig()
+ws_config = WebSocketConfig()
 app_config = AppConfig()
 REMOTE_MINIO_URL = get_remote_minio_url(
     app_config.PRODUCTION,
@@ -95,6 +221,7 @@ REMOTE_MINIO_URL = get_remote_minio_url(
 )
 DATABASE_URL = create_database_url(db_conf)
 DATABASE_URL_TEST = create_database_url(db_conf, test_port=True)
+DATABASE_REPLICA_URLS = create_replica_urls(db_conf)
 TEMP_FOLDER = "./temp"
 
 os.makedirs(TEMP_FOLDER, exist_ok=True)
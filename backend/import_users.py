@@ -0,0 +1,57 @@
+import argparse
+import asyncio
+import os
+
+from src.controllers.user.user_repository import UserService
+from src.db.session import db_connections
+from src.schemas import UserImportReport
+from src.service_layer.hashing_service import hashing_service
+from src.service_layer.unit_of_work import UnitOfWork
+from src.service_layer.user_import import IMPORT_FORMATS, detect_import_format, read_user_rows
+
+
+async def import_users(path: str, file_format: str, batch_size: int) -> UserImportReport:
+    """Creates users in bulk from a CSV or NDJSON file, see UserService.import_users.
+
+    Args:
+        path (str): Path to the file.
+        file_format (str): One of IMPORT_FORMATS.
+        batch_size (int): The number of rows loaded per transaction.
+
+    Returns:
+        UserImportReport: The number of created users, the conflicts and the invalid rows.
+    """
+    with open(path, encoding="utf-8-sig", newline="") as lines:
+        return await UserService.import_users(
+            UnitOfWork(db_connections.async_session),
+            read_user_rows(lines, file_format),
+            batch_size=batch_size,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Create users in bulk from a CSV or NDJSON file.")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, dest="file_format")
+    parser.add_argument("--batch-size", type=int, default=UserService.IMPORT_BATCH_SIZE)
+    parser.add_argument(
+        "--hash-workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of processes hashing passwords.",
+    )
+    args = parser.parse_args()
+
+    file_format = args.file_format or detect_import_format(args.path)
+    if file_format is None:
+        parser.error(f"Cannot detect the file format, pass --format {'/'.join(IMPORT_FORMATS)}")
+
+    hashing_service.pool_kind = "process"
+    hashing_service.pool_size = args.hash_workers
+
+    report = asyncio.run(import_users(args.path, file_format, args.batch_size))
+    print(report.model_dump_json(indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from typing import AsyncIterator
@@ -6,15 +7,47 @@ import uvicorn
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 
+from config import DATABASE_URL, app_config, auth_config
 from logging_setup import logging_setting
+from src.controllers.ws import ws_manager
+from src.db.health import db_health_monitor
+from src.db.session import db_connections
 from src.routes.api import api_router, tags_metadata
+from src.routes.dependensies import create_uow
 from src.routes.errors import base_http_exception_handler
+from src.routes.middleware import ReadYourWritesMiddleware, RoundTripsMiddleware
+from src.service_layer.hashing_service import hashing_service
+from src.service_layer.s3.async_s3_client import async_minio_client
+from src.service_layer.token_revocation import token_revocation_registry
 
 
 @asynccontextmanager
 async def lifespan(fastapi_app: FastAPI) -> AsyncIterator[None]:
     logging.info("Start Tutor Lab")
+    await db_connections.prewarm()
+    await db_health_monitor.start()
+    await db_connections.replica_set.start()
+    await ws_manager.start()
+    await async_minio_client.start()
+    if not app_config.PRODUCTION and db_health_monitor.is_available:
+        # Migrations run separately, see migrations.py; this only warns about a stale schema.
+        # Imported here so that production workers do not load alembic.
+        from src.db.migrations import check_schema_at_head
+
+        async with db_connections.engine.connect() as connection:
+            await check_schema_at_head(connection)
+    if auth_config.STATELESS_AUTH:
+        await token_revocation_registry.start(create_uow)
     yield
+    await ws_manager.close_all()
+    await ws_manager.stop()
+    await token_revocation_registry.stop()
+    await async_minio_client.stop()
+    await db_health_monitor.stop()
+    await db_connections.replica_set.stop()
+    await db_connections.dispose()
+    hashing_service.shutdown()
+    async_minio_client.shutdown()
     logging.info("Stop Tutro Lab")
 
 
@@ -23,6 +56,7 @@ app = FastAPI(
     docs_url="/api/docs",
     redoc_url="/api/redoc",
     openapi_url="/api/openapi.json",
+    lifespan=lifespan,
 )
 origins = ["*"]
 
@@ -35,6 +69,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+# Plain ASGI middleware, the last one added runs first.
+app.add_middleware(RoundTripsMiddleware)
+app.add_middleware(ReadYourWritesMiddleware)
+
+
 app.include_router(api_router)
 app.openapi_tags = tags_metadata
 app.add_exception_handler(HTTPException, base_http_exception_handler)
@@ -42,4 +82,7 @@ logging_setting()
 
 
 if __name__ == "__main__":
+    from src.db.migrations import run_migrations
+
+    asyncio.run(run_migrations(DATABASE_URL))
     uvicorn.run(app, host="0.0.0.0", port=8000, log_config=None, reload=False)
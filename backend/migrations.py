@@ -1,13 +1,33 @@
-from alembic import command
-from alembic.config import Config
+import argparse
+import asyncio
+import sys
+
 from config import DATABASE_URL
+from src.db.migrations import check_schema_at_head, run_migrations
+from src.db.session import db_connections
+
+
+async def check_migrations() -> bool:
+    async with db_connections.engine.connect() as connection:
+        return await check_schema_at_head(connection)
+
 
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Upgrade the database schema, run once per deploy before starting the app."
+    )
+    parser.add_argument("revision", nargs="?", default="head")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Only check that the schema is at head, exit with 1 if it is not.",
+    )
+    args = parser.parse_args()
 
-def run_migrations(script_location: str, dsn: str) -> None:
-    alembic_cfg = Config()
-    alembic_cfg.set_main_option("script_location", script_location)
-    alembic_cfg.set_main_option("sqlalchemy.url", dsn)
-    command.upgrade(alembic_cfg, "head")
+    if args.check:
+        sys.exit(0 if asyncio.run(check_migrations()) else 1)
+    asyncio.run(run_migrations(DATABASE_URL, args.revision))
 
 
-run_migrations("alembic", DATABASE_URL)
+if __name__ == "__main__":
+    main()
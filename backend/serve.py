@@ -0,0 +1,134 @@
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+from types import FrameType
+
+import uvicorn
+
+from config import app_config
+from main import app
+from src.db.session import db_connections
+
+# A worker that exits sooner than this after its start is respawned with a delay, so that a
+# worker failing at startup does not turn into a fork loop.
+MIN_WORKER_LIFETIME_SECONDS = 1
+# Time given to the workers on top of the graceful shutdown timeout before they are killed.
+KILL_GRACE_SECONDS = 5
+
+
+class Launcher:
+    """Production entry point running the app in several pre-forked uvicorn workers.
+
+    The app is imported and the socket bound once in the launcher, then the workers are
+    forked and share both, so the import work is done once and its memory pages are shared.
+    On SIGTERM or SIGINT the workers stop accepting connections, finish in-flight requests,
+    close websockets and dispose the engine (see ``lifespan``) within
+    ``graceful_shutdown_seconds``; the ones still running after that are killed. A worker
+    that exits unexpectedly is replaced.
+    """
+
+    def __init__(
+        self, workers: int, host: str, port: int, graceful_shutdown_seconds: float
+    ) -> None:
+        self.workers = workers
+        self.config = uvicorn.Config(
+            app,
+            host=host,
+            port=port,
+            log_config=None,
+            timeout_graceful_shutdown=round(graceful_shutdown_seconds),
+        )
+        self.graceful_shutdown_seconds = graceful_shutdown_seconds
+        self.children: dict[int, float] = {}
+        self.should_exit = False
+
+    def run(self) -> None:
+        sock = self.config.bind_socket()
+        # Objects created by the import are never freed, keep the collector from touching
+        # their pages, which would copy them into every worker.
+        gc.freeze()
+        signal.signal(signal.SIGTERM, self.handle_exit)
+        signal.signal(signal.SIGINT, self.handle_exit)
+        signal.signal(signal.SIGALRM, self.handle_kill)
+
+        logging.info(f"Starting {self.workers} workers on {self.config.host}:{self.config.port}")
+        for _ in range(self.workers):
+            self.spawn(sock)
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self.children.pop(pid, None)
+            if started is None or self.should_exit:
+                continue
+            logging.error(f"Worker {pid} exited with {os.waitstatus_to_exitcode(status)}")
+            if time.monotonic() - started < MIN_WORKER_LIFETIME_SECONDS:
+                time.sleep(MIN_WORKER_LIFETIME_SECONDS)
+            if not self.should_exit:
+                self.spawn(sock)
+        sock.close()
+        logging.info("All workers stopped")
+
+    def spawn(self, sock: socket.socket) -> None:
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return
+
+        # Worker: a terminal's Ctrl+C goes to the launcher only, which forwards a single
+        # SIGTERM; uvicorn treats a second signal as a forced exit without draining.
+        os.setpgid(0, 0)
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGALRM):
+            signal.signal(signum, signal.SIG_DFL)
+        exit_code = 1
+        try:
+            db_connections.reset_after_fork()
+            uvicorn.Server(self.config).run(sockets=[sock])
+            exit_code = 0
+        except BaseException:
+            logging.exception(f"Worker {os.getpid()} failed")
+        finally:
+            os._exit(exit_code)
+
+    def handle_exit(self, signum: int, frame: FrameType | None) -> None:
+        if self.should_exit:
+            return
+        logging.info(f"Received {signal.Signals(signum).name}, draining workers")
+        self.should_exit = True
+        self.signal_children(signal.SIGTERM)
+        signal.alarm(int(self.graceful_shutdown_seconds) + KILL_GRACE_SECONDS)
+
+    def handle_kill(self, signum: int, frame: FrameType | None) -> None:
+        logging.warning(f"Killing {len(self.children)} workers that did not stop in time")
+        self.signal_children(signal.SIGKILL)
+
+    def signal_children(self, signum: int) -> None:
+        for pid in self.children:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the app in several worker processes.")
+    parser.add_argument("--workers", type=int, default=app_config.WORKERS)
+    parser.add_argument("--host", default=app_config.BIND_HOST)
+    parser.add_argument("--port", type=int, default=app_config.BIND_PORT)
+    args = parser.parse_args()
+
+    Launcher(
+        workers=args.workers,
+        host=args.host,
+        port=args.port,
+        graceful_shutdown_seconds=app_config.GRACEFUL_SHUTDOWN_SECONDS,
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
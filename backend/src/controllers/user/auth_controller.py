@@ -1,16 +1,21 @@
+import random
 from datetime import datetime, timedelta, timezone
 from typing import Annotated, Callable, Dict, List, Optional
 
 import jwt
 from fastapi import Depends, HTTPException, Request, Response, status
-from jwt import PyJWTError
+from jwt import ExpiredSignatureError, PyJWTError
 from starlette.websockets import WebSocket, WebSocketDisconnect
 
 from config import auth_config
 from src.controllers.user.user_repository import UserService
+from src.db.exceptions.exceptions import DBNotFoundError
 from src.routes.dependensies import UOWDep
 from src.schemas.user_schemas import ShowUser, UserInDB
 from src.service_layer.hasher import Hasher
+from src.service_layer.hashing_service import HashingQueueFullError, hashing_service
+from src.service_layer.identity_cache import identity_cache
+from src.service_layer.token_revocation import token_revocation_registry
 from src.service_layer.unit_of_work import IUnitOfWork
 
 
@@ -31,7 +36,9 @@ def get_token_from_websocket(websocket: WebSocket) -> str:
 
 class AuthController:
     COOKIES_TOKEN_KEY = "access_token"
-    JWF_LIFE_TIME_minutes = 24 * 60
+    JWF_LIFE_TIME_minutes = auth_config.JWT_LIFE_TIME_MINUTES
+    JWT_EXPIRY_JITTER_minutes = auth_config.JWT_EXPIRY_JITTER_MINUTES
+    JWT_MAX_SESSION_minutes = auth_config.JWT_MAX_SESSION_MINUTES
 
     async def login(
         self, uow: IUnitOfWork, username: str, password: str, response: Response
@@ -48,18 +55,82 @@ class AuthController:
             Optional[Dict[str, str]]: The access token if login is successful, None otherwise.
         """
         async with uow:
-            user_model: UserInDB = await uow.user.find_one(username=username, disabled=False)
+            user_model = await uow.user.find_one_as(UserInDB, username=username, disabled=False)
 
-        if not Hasher.verify_password(Hasher.get_password_hash(password), user_model.password):
+        if not await hashing_service.verify_password(password, user_model.password):
             return None
 
-        access_token = self.__create_access_token({"username": user_model.username})
+        if Hasher.needs_rehash(user_model.password):
+            await self.__rehash_password(uow, user_model.id, password)
 
-        response.set_cookie(
-            key=self.COOKIES_TOKEN_KEY,
-            value=access_token,
-            httponly=True,
-        )
+        claims = self.__get_token_claims(user_model)
+        claims["auth_time"] = int(datetime.now(timezone.utc).timestamp())
+        access_token = self.__create_access_token(claims)
+        self.__set_token_cookie(response, access_token)
+
+        return {"access_token": access_token}
+
+    @staticmethod
+    async def __rehash_password(uow: IUnitOfWork, user_id: int, password: str) -> None:
+        """Upgrades a hash made by an outdated scheme after the password has been verified.
+
+        The upgrade is best effort: it is skipped when the hashing pool is overloaded.
+
+        Args:
+            uow (IUnitOfWork): The unit of work instance for database operations.
+            user_id (int): The id of the logged in user.
+            password (str): The verified plain password.
+        """
+        try:
+            hashed_password = await hashing_service.hash_password(password)
+        except HashingQueueFullError:
+            return
+
+        async with uow:
+            await uow.user.edit_one(row_id=user_id, data={"hashed_password": hashed_password})
+            await uow.commit()
+
+    async def refresh(self, token: str, response: Response, uow: IUnitOfWork) -> Dict[str, str]:
+        """Reissues a still valid access token with a new expiry time.
+
+        No password is needed, but a session cannot be extended past JWT_MAX_SESSION_MINUTES
+        after the login, and the user must still be active: in the stateless auth mode the
+        token must not be revoked, otherwise the user is checked like for any request.
+
+        Args:
+            token (str): The current JWT token.
+            response (Response): The HTTP response object for setting cookies.
+            uow (IUnitOfWork): The unit of work instance for database operations.
+
+        Returns:
+            Dict[str, str]: The new access token.
+
+        Raises:
+            HTTPException: If the token is invalid, expired or revoked, the session is too old
+                or the user is disabled.
+        """
+        payload = self.__decode_payload(token)
+        # Tokens issued before auth_time was added count from their own issue time.
+        auth_time = int(payload.get("auth_time", payload.get("iat", 0)))
+        session_age = datetime.now(timezone.utc) - datetime.fromtimestamp(auth_time, timezone.utc)
+        if session_age > timedelta(minutes=self.JWT_MAX_SESSION_minutes):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="The session has expired"
+            )
+
+        if auth_config.STATELESS_AUTH and "user_id" in payload:
+            self.__check_revocation(payload)
+        else:
+            user = await self.__get_user(payload.get("username"), uow)
+            if user.disabled:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED, detail="Inactive user"
+                )
+
+        claims = {key: value for key, value in payload.items() if key not in ("exp", "iat")}
+        claims["auth_time"] = auth_time
+        access_token = self.__create_access_token(claims)
+        self.__set_token_cookie(response, access_token)
 
         return {"access_token": access_token}
 
@@ -71,9 +142,39 @@ class AuthController:
         """
         response.delete_cookie(key=self.COOKIES_TOKEN_KEY)
 
+    def __set_token_cookie(self, response: Response, access_token: str) -> None:
+        response.set_cookie(
+            key=self.COOKIES_TOKEN_KEY,
+            value=access_token,
+            httponly=True,
+        )
+
+    @staticmethod
+    def __get_token_claims(user: UserInDB) -> dict:
+        """Builds the token payload that lets the stateless auth mode skip the user lookup.
+
+        Args:
+            user (UserInDB): The authenticated user.
+
+        Returns:
+            dict: The token claims.
+        """
+        return {
+            "username": user.username,
+            "user_id": user.id,
+            "email": user.email,
+            "fullname": user.fullname,
+            "disabled": user.disabled,
+            "roles": [role.value for role in user.roles],
+            "ver": user.token_version,
+        }
+
     def __create_access_token(self, data: dict) -> str:
         """Creates a JWT access token.
 
+        The lifetime is shortened by a random jitter, so tokens issued at the same time do not
+        all expire at the same instant, and it never extends past the maximum session age.
+
         Args:
             data (dict): The data to include in the token payload.
 
@@ -81,10 +182,15 @@ class AuthController:
             str: The encoded JWT access token.
         """
         to_encode = data.copy()
-        expire = datetime.now(timezone.utc).replace(hour=0) + timedelta(
-            minutes=self.JWF_LIFE_TIME_minutes
-        )
-        to_encode.update({"exp": expire})
+        issued_at = datetime.now(timezone.utc)
+        life_time = self.JWF_LIFE_TIME_minutes - random.uniform(0, self.JWT_EXPIRY_JITTER_minutes)
+        expire = issued_at + timedelta(minutes=life_time)
+        if "auth_time" in data:
+            session_end = datetime.fromtimestamp(data["auth_time"], timezone.utc) + timedelta(
+                minutes=self.JWT_MAX_SESSION_minutes
+            )
+            expire = min(expire, session_end)
+        to_encode.update({"iat": issued_at, "exp": expire})
         encode_jwt = jwt.encode(
             to_encode,
             auth_config.VERIFYING_KEY.get_secret_value(),
@@ -92,19 +198,18 @@ class AuthController:
         )
         return encode_jwt
 
-    @classmethod
-    async def __decode_token(cls, token: str, uow: IUnitOfWork) -> ShowUser:
-        """Decodes and verifies a JWT token.
+    @staticmethod
+    def __decode_payload(token: str) -> dict:
+        """Decodes a JWT token and verifies its signature and expiry time.
 
         Args:
             token (str): The JWT token.
-            uow (IUnitOfWork): The unit of work instance for database operations.
 
         Returns:
-            ShowUser: The user associated with the token.
+            dict: The token payload.
 
         Raises:
-            HTTPException: If the token is invalid, expired, or the user is not found.
+            HTTPException: If the token is invalid or expired.
         """
         try:
             payload = jwt.decode(
@@ -112,6 +217,10 @@ class AuthController:
                 auth_config.VERIFYING_KEY.get_secret_value(),
                 algorithms=auth_config.JWT_ALGORITHM,
             )
+        except ExpiredSignatureError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="The token has expired"
+            )
         except PyJWTError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -119,11 +228,29 @@ class AuthController:
             )
 
         expire = payload.get("exp")
-        expire_time = datetime.fromtimestamp(int(expire), tz=timezone.utc)
-        if (not expire) or (expire_time < datetime.now(timezone.utc)):
+        if (not expire) or (
+            datetime.fromtimestamp(int(expire), tz=timezone.utc) < datetime.now(timezone.utc)
+        ):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="The token has expired"
             )
+        return payload
+
+    @classmethod
+    async def __decode_token(cls, token: str, uow: IUnitOfWork) -> ShowUser:
+        """Decodes and verifies a JWT token.
+
+        Args:
+            token (str): The JWT token.
+            uow (IUnitOfWork): The unit of work instance for database operations.
+
+        Returns:
+            ShowUser: The user associated with the token.
+
+        Raises:
+            HTTPException: If the token is invalid, expired, or the user is not found.
+        """
+        payload = cls.__decode_payload(token)
 
         username = payload.get("username")
         if not username:
@@ -131,14 +258,72 @@ class AuthController:
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="The user was not found"
             )
 
-        user: ShowUser = await UserService.get_user_by_username(uow, username)
+        if auth_config.STATELESS_AUTH and "user_id" in payload:
+            return cls.__get_user_from_claims(payload)
+
+        return await cls.__get_user(username, uow)
+
+    @staticmethod
+    async def __get_user(username: str | None, uow: IUnitOfWork) -> ShowUser:
+        """Finds the user of a token in the identity cache or the database.
+
+        Args:
+            username (str | None): The username from the token payload.
+            uow (IUnitOfWork): The unit of work instance for database operations.
+
+        Returns:
+            ShowUser: The user.
+
+        Raises:
+            HTTPException: If the user is not found.
+        """
+        user: ShowUser | None = identity_cache.get(username) if username else None
+        if user is not None:
+            return user
+
+        try:
+            user = await UserService.get_user_by_username(uow, username) if username else None
+        except DBNotFoundError:
+            user = None
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid authentication credentials",
             )
+        identity_cache.set(user)
         return user
 
+    @staticmethod
+    def __check_revocation(payload: dict) -> None:
+        if token_revocation_registry.is_revoked(payload["user_id"], payload.get("ver", 0)):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="The token has been revoked"
+            )
+
+    @classmethod
+    def __get_user_from_claims(cls, payload: dict) -> ShowUser:
+        """Builds the user from the token claims without accessing the database.
+
+        Args:
+            payload (dict): The decoded token payload.
+
+        Returns:
+            ShowUser: The user described by the token.
+
+        Raises:
+            HTTPException: If the token was revoked by a later change of the user.
+        """
+        cls.__check_revocation(payload)
+
+        return ShowUser(
+            id=payload["user_id"],
+            username=payload["username"],
+            email=payload.get("email"),
+            fullname=payload.get("fullname"),
+            disabled=payload.get("disabled"),
+            roles=payload.get("roles", []),
+        )
+
     async def get_current_user(
         self,
         uow: UOWDep,
@@ -188,6 +373,8 @@ class AuthController:
             )
 
         user = await self.__decode_token(token, uow)
+        # The unit of work lives as long as the socket, do not hold the connection of the lookup.
+        await uow.rollback()
 
         return user
 
@@ -218,11 +405,18 @@ async def _check_active_user_roles(current_user: ShowUser, required_roles: List[
     return current_user
 
 
-def get_current_active_user(required_roles: List[str]) -> Callable:
+def get_current_active_user(
+    required_roles: List[str], release_connection: bool = False
+) -> Callable:
     """Returns a function to retrieve the current active user with role checking (for HTTP).
 
+    The user lookup leaves the transaction of the request open, so that the handler reuses its
+    connection. Handlers that run long without the database, e.g. uploads, release it instead.
+
     Args:
         required_roles (List[str]): List of required roles.
+        release_connection (bool): End the transaction of the lookup and return its connection
+            to the pool.
 
     Returns:
         Callable: A function to get the current active user.
@@ -230,7 +424,10 @@ def get_current_active_user(required_roles: List[str]) -> Callable:
 
     async def _get_current_active_user(
         current_user: Annotated[ShowUser, Depends(auth_controller.get_current_user)],
+        uow: UOWDep,
     ) -> ShowUser:
+        if release_connection:
+            await uow.rollback()
         return await _check_active_user_roles(current_user, required_roles)
 
     return _get_current_active_user
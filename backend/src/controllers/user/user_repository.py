@@ -1,61 +1,176 @@
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator
 
-from src.schemas import PortalRoleList, ShowUser, UserCreateRequest
-from src.schemas.user_schemas import UserInDB, UserPassword
-from src.service_layer.hasher import Hasher
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from src.db.exceptions.exceptions import DBNotFoundError
+from src.repositories.loader import get_repository_loader
+from src.repositories.user import UserRepository
+from src.schemas import PortalRoleList, ShowUser, UserCreateRequest, UserImportReport
+from src.schemas.user_schemas import (
+    UserImportConflict,
+    UserImportError,
+    UserImportRow,
+    UserPassword,
+)
+from src.service_layer.hashing_service import hashing_service
+from src.service_layer.identity_cache import identity_cache
+from src.service_layer.token_revocation import token_revocation_registry
 from src.service_layer.unit_of_work import IUnitOfWork
+from src.service_layer.user_import import batched
 
 
 class UserService:
+    STREAM_BATCH_SIZE = 1000
+    IMPORT_BATCH_SIZE = 5000
+    # Changes to what the stateless tokens carry revoke the tokens of the user, so no token keeps
+    # serving the old claims until it expires or copies them into a refreshed one.
+    REVOKING_FIELDS = frozenset({"username", "email", "fullname", "disabled", "roles"})
+
     @classmethod
     async def get_all_users(cls, uow: IUnitOfWork) -> list[ShowUser]:
         async with uow:
-            users: list[UserInDB] = await uow.user.find_all()
-            return [
-                ShowUser(
-                    id=user.id,
-                    username=user.username,
-                    fullname=user.fullname,
-                    email=user.email,
-                    disabled=user.disabled,
-                    roles=user.roles,
-                )
-                for user in users
-            ]
+            return await uow.user.find_all_as(ShowUser)
+
+    @classmethod
+    async def get_users_page(
+        cls, uow: IUnitOfWork, limit: int, after: int | None = None
+    ) -> list[ShowUser]:
+        async with uow:
+            return await uow.user.find_page_as(ShowUser, limit=limit, after=after)
+
+    @classmethod
+    async def stream_users(cls, uow: IUnitOfWork) -> AsyncIterator[str]:
+        """Streams all users as newline-delimited JSON.
+
+        Args:
+            uow (IUnitOfWork): The unit of work instance for database operations.
+
+        Yields:
+            str: One serialized ShowUser per line.
+        """
+        async with uow:
+            async for user in uow.user.stream_all_as(ShowUser, batch_size=cls.STREAM_BATCH_SIZE):
+                yield user.model_dump_json() + "\n"
 
     @classmethod
     async def create_user(cls, uow: IUnitOfWork, body: UserCreateRequest) -> int:
+        hashed_password = await hashing_service.hash_password(body.password)
         async with uow:
             user_id = await uow.user.add_one(
                 username=body.username,
                 fullname=body.fullname,
                 email=body.email,
-                hashed_password=Hasher.get_password_hash(body.password),
+                hashed_password=hashed_password,
                 disabled=body.disabled,
                 roles=[],
             )
             await uow.commit()
         return user_id
 
+    @classmethod
+    async def import_users(
+        cls,
+        uow: IUnitOfWork,
+        rows: Iterable[tuple[int, Any]],
+        batch_size: int = IMPORT_BATCH_SIZE,
+    ) -> UserImportReport:
+        """Creates users in bulk.
+
+        Rows are consumed lazily in batches. Each batch is read and validated off the event
+        loop, its passwords are hashed in parallel on the hashing pool, and it is loaded with
+        COPY and a single insert in its own transaction. Invalid and conflicting rows are
+        reported and skipped.
+
+        Args:
+            uow (IUnitOfWork): The unit of work instance for database operations.
+            rows (Iterable[tuple[int, Any]]): Row numbers with raw rows, see read_user_rows.
+            batch_size (int): The number of rows loaded per transaction.
+
+        Returns:
+            UserImportReport: The number of created users, the conflicts and the invalid rows.
+        """
+        report = UserImportReport()
+        seen: set[tuple[str, str]] = set()
+        batches = batched(rows, batch_size)
+
+        # Reading the rows, e.g. from a spooled upload, and validating them block, so each
+        # batch is read and validated in a thread.
+        while (batch := await run_in_threadpool(cls._read_import_batch, batches)) is not None:
+            valid_rows, errors = batch
+            report.errors.extend(errors)
+            if not valid_rows:
+                continue
+
+            hashed_passwords = await hashing_service.hash_passwords(
+                [row.password for _, row in valid_rows]
+            )
+            records = [
+                (
+                    row_number,
+                    row.username,
+                    row.fullname,
+                    row.email,
+                    hashed_password,
+                    row.disabled,
+                    [role.value for role in row.roles],
+                )
+                for (row_number, row), hashed_password in zip(valid_rows, hashed_passwords)
+            ]
+            async with uow:
+                inserted = await uow.user.copy_import(records)
+                await uow.commit()
+
+            report.created += len(inserted)
+            for row_number, row in valid_rows:
+                key = (row.username, row.email)
+                if key in inserted and key not in seen:
+                    seen.add(key)
+                    continue
+                reason = "duplicate in file" if key in seen else "already exists"
+                seen.add(key)
+                report.conflicts.append(
+                    UserImportConflict(
+                        row=row_number, username=row.username, email=row.email, reason=reason
+                    )
+                )
+
+        return report
+
     @classmethod
     async def delete_user(cls, uow: IUnitOfWork, user_id: int) -> int:
         async with uow:
             deleted_user_id = await uow.user.edit_one(row_id=user_id, data={"disabled": True})
+            token_version = await uow.user.bump_token_version(user_id)
             await uow.commit()
+        cls._forget_user(user_id, token_version)
         return deleted_user_id
 
     @classmethod
     async def get_user_by_username(cls, uow: IUnitOfWork, username: str) -> ShowUser:
-        async with uow:
-            user: UserInDB = await uow.user.find_one(username=username)
-        return ShowUser(
-            id=user.id,
-            username=user.username,
-            fullname=user.fullname,
-            email=user.email,
-            disabled=user.disabled,
-            roles=user.roles,
-        )
+        """Finds a user by username.
+
+        Concurrent lookups, e.g. by the auth dependency of many requests, are coalesced into a
+        single query by a shared loader. The query runs in the session of the unit of work
+        without a block of its own, so the transaction stays open and the next block of the
+        unit of work, e.g. the one of the request handler, reuses the connection.
+
+        Args:
+            uow (IUnitOfWork): The unit of work instance for database operations, entered by
+                the caller.
+            username (str): The username of the user.
+
+        Returns:
+            ShowUser: The user.
+
+        Raises:
+            DBNotFoundError: If no user with the username exists.
+        """
+        loader = get_repository_loader(uow.session_factory, UserRepository, ShowUser, "username")
+        user = await loader.load(username, uow.session)
+        if user is None:
+            raise DBNotFoundError(UserRepository.model.__tablename__, username)
+        return user
 
     @classmethod
     async def update_user(
@@ -64,47 +179,159 @@ class UserService:
         user_id: int,
         updated_user_params: Dict[str, Any],
     ) -> int:
+        token_version = None
         async with uow:
             updated_user_id = await uow.user.edit_one(row_id=user_id, data=updated_user_params)
+            if cls.REVOKING_FIELDS.intersection(updated_user_params):
+                token_version = await uow.user.bump_token_version(user_id)
             await uow.commit()
+        if token_version is None:
+            identity_cache.invalidate(user_id)
+        else:
+            cls._forget_user(user_id, token_version)
         return updated_user_id
 
     @classmethod
     async def add_portal_role(
         cls, uow: IUnitOfWork, user_id: int, portal_role: PortalRoleList
     ) -> int:
-        async with uow:
-            user_in_db: UserInDB = await uow.user.find_one(id=user_id)
-            merged_roles = list(set(portal_role.roles).union(set(user_in_db.roles)))
-
-            updated_user_id = await uow.user.edit_one(row_id=user_id, data={"roles": merged_roles})
-            await uow.commit()
-        return updated_user_id
+        await cls.add_portal_role_bulk(uow, [user_id], portal_role, must_exist=True)
+        return user_id
 
     @classmethod
     async def remove_portal_role(
         cls, uow: IUnitOfWork, user_id: int, portal_role: PortalRoleList
     ) -> int:
+        await cls.remove_portal_role_bulk(uow, [user_id], portal_role, must_exist=True)
+        return user_id
+
+    @classmethod
+    async def add_portal_role_bulk(
+        cls,
+        uow: IUnitOfWork,
+        user_ids: list[int],
+        portal_role: PortalRoleList,
+        must_exist: bool = False,
+    ) -> list[int]:
+        """Grants roles to many users in one statement.
+
+        Args:
+            uow (IUnitOfWork): The unit of work instance for database operations.
+            user_ids (list[int]): The IDs of the users.
+            portal_role (PortalRoleList): The roles to grant.
+            must_exist (bool): Whether to raise if a user does not exist.
+
+        Returns:
+            list[int]: The IDs of the users that did not have all the roles yet.
+
+        Raises:
+            DBNotFoundError: If must_exist is set and one of the users does not exist.
+        """
+        roles = [role.value for role in portal_role.roles]
         async with uow:
-            user_in_db: UserInDB = await uow.user.find_one(id=user_id)
+            token_versions = await uow.user.add_roles(user_ids, roles)
+            if must_exist:
+                await cls._check_users_exist(uow, user_ids, token_versions)
+            await uow.commit()
+        for user_id, token_version in token_versions.items():
+            cls._forget_user(user_id, token_version)
+        return list(token_versions)
 
-            user_role = set(user_in_db.roles)
-            portal_role = set(portal_role.roles)
-            merged_roles = list(user_role.difference(portal_role))
+    @classmethod
+    async def remove_portal_role_bulk(
+        cls,
+        uow: IUnitOfWork,
+        user_ids: list[int],
+        portal_role: PortalRoleList,
+        must_exist: bool = False,
+    ) -> list[int]:
+        """Revokes roles from many users in one statement.
+
+        Args:
+            uow (IUnitOfWork): The unit of work instance for database operations.
+            user_ids (list[int]): The IDs of the users.
+            portal_role (PortalRoleList): The roles to revoke.
+            must_exist (bool): Whether to raise if a user does not exist.
 
-            updated_user_id = await uow.user.edit_one(row_id=user_id, data={"roles": merged_roles})
+        Returns:
+            list[int]: The IDs of the users that had any of the roles.
+
+        Raises:
+            DBNotFoundError: If must_exist is set and one of the users does not exist.
+        """
+        roles = [role.value for role in portal_role.roles]
+        async with uow:
+            token_versions = await uow.user.remove_roles(user_ids, roles)
+            if must_exist:
+                await cls._check_users_exist(uow, user_ids, token_versions)
             await uow.commit()
-        return updated_user_id
+        for user_id, token_version in token_versions.items():
+            cls._forget_user(user_id, token_version)
+        return list(token_versions)
 
     @classmethod
     async def update_user_password(
         cls, uow: IUnitOfWork, user_id: int, new_password: UserPassword
     ) -> int:
-        password_in_db = Hasher.get_password_hash(new_password.password)
+        password_in_db = await hashing_service.hash_password(new_password.password)
         async with uow:
             updated_user_id: int = await uow.user.edit_one(
                 row_id=user_id, data={"hashed_password": password_in_db}
             )
+            token_version = await uow.user.bump_token_version(user_id)
             await uow.commit()
+        cls._forget_user(user_id, token_version)
 
         return updated_user_id
+
+    @classmethod
+    def _read_import_batch(
+        cls, batches: Iterator[list[tuple[int, Any]]]
+    ) -> tuple[list[tuple[int, UserImportRow]], list[UserImportError]] | None:
+        """Reads and validates the next batch of rows, None when there are no more rows.
+
+        Args:
+            batches (Iterator[list[tuple[int, Any]]]): Batches of row numbers with raw rows.
+
+        Returns:
+            tuple[list[tuple[int, UserImportRow]], list[UserImportError]] | None: The valid
+                rows and the errors of the invalid ones.
+        """
+        batch = next(batches, None)
+        if batch is None:
+            return None
+        valid_rows: list[tuple[int, UserImportRow]] = []
+        errors: list[UserImportError] = []
+        for row_number, data in batch:
+            try:
+                valid_rows.append((row_number, UserImportRow.model_validate(data)))
+            except ValidationError as e:
+                detail = "; ".join(cls._format_import_error(error) for error in e.errors())
+                errors.append(UserImportError(row=row_number, detail=detail))
+        return valid_rows, errors
+
+    @staticmethod
+    def _format_import_error(error: Dict[str, Any]) -> str:
+        if not error["loc"]:
+            return error["msg"]
+        return f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}"
+
+    @staticmethod
+    async def _check_users_exist(
+        uow: IUnitOfWork, user_ids: list[int], changed_user_ids: Dict[int, int]
+    ) -> None:
+        """Tells unchanged users apart from missing ones, which an UPDATE does not."""
+        for user_id in user_ids:
+            if user_id not in changed_user_ids and not await uow.user.exist(id=user_id):
+                raise DBNotFoundError(uow.user.model.__tablename__, user_id)
+
+    @staticmethod
+    def _forget_user(user_id: int, token_version: int) -> None:
+        """Drops everything this worker remembers about the tokens of a changed user.
+
+        Args:
+            user_id (int): The id of the changed user.
+            token_version (int): The new token version of the user.
+        """
+        identity_cache.invalidate(user_id)
+        token_revocation_registry.revoke(user_id, token_version)
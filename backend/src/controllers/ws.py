@@ -1,29 +1,528 @@
-from fastapi import WebSocket
+import asyncio
+import json
+import logging
+from typing import Any, Callable, Hashable, Iterable
+
+from fastapi import WebSocket, status
+from pydantic import ValidationError
+
+from config import ws_config
+from src.controllers.ws_fanout import FanoutBackend, create_fanout_backend
+from src.controllers.ws_framing import OutgoingMessage, TextFraming, create_framings
+from src.controllers.ws_heartbeat import Heartbeat
+from src.controllers.ws_replay import Cursor, ReplayStore
+from src.schemas import WsClientRequest
+from src.schemas.user_schemas import PortalRole
+from src.service_layer.metrics import metrics_registry
+
+
+class ClientConnection:
+    """A websocket with a bounded queue of outgoing messages and a task writing them.
+
+    Sending only queues the message, so a slow client delays nobody but itself. When its
+    queue is full the manager's overflow policy applies. The writer sends the messages in the
+    ``framing`` negotiated with the client, which may batch several into one frame.
+    """
+
+    def __init__(
+        self,
+        manager: "ConnectionManager",
+        user_id: int,
+        websocket: WebSocket,
+        framing: TextFraming,
+        roles: Iterable[str] = (),
+    ) -> None:
+        self.manager = manager
+        self.user_id = user_id
+        self.roles = frozenset(roles)
+        self.websocket = websocket
+        self.framing = framing
+        self.queue: asyncio.Queue[OutgoingMessage] = asyncio.Queue(maxsize=manager.queue_size)
+        self.topics: set[str] = set()
+        self.closed = False
+        # Event loop times of the last message, of the last one other than a pong and of the
+        # unanswered ping, see Heartbeat.
+        self.last_seen = self.last_active = asyncio.get_running_loop().time()
+        self.ping_sent_at: float | None = None
+        self._writer = asyncio.create_task(self._write())
+
+    def send(self, message: str | OutgoingMessage) -> bool:
+        """Queues the message without waiting.
+
+        Returns:
+            bool: Whether the message was queued.
+        """
+        if self.closed:
+            return False
+        if isinstance(message, str):
+            message = OutgoingMessage(message)
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        self.manager.dropped_messages += 1
+        if self.manager.overflow_policy == ConnectionManager.DROP_OLDEST:
+            self.queue.get_nowait()
+            self.queue.put_nowait(message)
+            return True
+        if self.manager.overflow_policy == ConnectionManager.DISCONNECT:
+            logging.warning(f"Disconnecting slow websocket client of user {self.user_id}")
+            self.manager.slow_disconnects += 1
+            self.manager.remove(self, status.WS_1013_TRY_AGAIN_LATER)
+        return False
+
+    def touch(self, active: bool = True) -> None:
+        """Records a message from the client, ``active`` unless it is a pong."""
+        self.last_seen = asyncio.get_running_loop().time()
+        self.ping_sent_at = None
+        if active:
+            self.last_active = self.last_seen
+
+    def stop(self) -> None:
+        """Stops the writer, dropping the queued messages."""
+        self.closed = True
+        if self._writer is not asyncio.current_task():
+            self._writer.cancel()
+
+    async def close(self, code: int) -> None:
+        """Stops the writer and closes the websocket."""
+        self.stop()
+        try:
+            await self.websocket.close(code)
+        except Exception:
+            # The client may already be gone.
+            pass
+
+    async def _write(self) -> None:
+        framing = self.framing
+        while True:
+            messages = [await self.queue.get()]
+            if framing.max_batch_messages > 1:
+                if framing.batch_interval_seconds > 0:
+                    await asyncio.sleep(framing.batch_interval_seconds)
+                while len(messages) < framing.max_batch_messages and not self.queue.empty():
+                    messages.append(self.queue.get_nowait())
+            try:
+                async with asyncio.timeout(self.manager.send_timeout_seconds):
+                    await framing.send(self.websocket, messages)
+            except TimeoutError:
+                logging.warning(f"Websocket client of user {self.user_id} is not reading, closing")
+                self.manager.slow_disconnects += 1
+                self.manager.remove(self, status.WS_1013_TRY_AGAIN_LATER)
+                return
+            except Exception:
+                self.manager.send_failures += 1
+                self.manager.remove(self, status.WS_1011_INTERNAL_ERROR)
+                return
+            self.manager.sent_messages += len(messages)
+
+
+TopicAuthorizer = Callable[[ClientConnection, str], bool]
+
+
+def authorize_dashboard(connection: ClientConnection, topic: str) -> bool:
+    """``dashboard:<role>`` is open to the users with the role."""
+    return topic.partition(":")[2].upper() in connection.roles
+
+
+def authorize_room(connection: ClientConnection, topic: str) -> bool:
+    """``room:<id>`` is open to the staff: there is no class membership to check students by."""
+    return not connection.roles.isdisjoint({PortalRole.TUTOR.value, PortalRole.USER_ADMIN.value})
+
+
+DEFAULT_TOPIC_AUTHORIZERS: dict[str, TopicAuthorizer] = {
+    "dashboard": authorize_dashboard,
+    "room": authorize_room,
+}
 
 
 class ConnectionManager:
-    def __init__(self) -> None:
-        self.active_connections: dict[int, WebSocket] = {}
+    """Keeps the websockets of connected users and their topic subscriptions, sends messages.
+
+    A user may hold several connections, e.g. one per browser tab. Connections subscribe to
+    topics (class rooms, dashboards); an index from topic to its subscribers makes
+    ``publish`` cost O(subscribers) rather than O(connections).
+
+    Every connection has its own queue of at most ``queue_size`` messages and a writer task,
+    so sending only enqueues and never waits for a client. When the queue of a slow client is
+    full, ``overflow_policy`` decides: ``drop_oldest`` makes room by dropping the oldest queued
+    message, ``drop_newest`` drops the new one and ``disconnect`` closes the connection. A
+    client that does not accept a message within ``send_timeout_seconds`` is disconnected
+    as well.
+
+    With several workers each one only holds its own sockets. Messages are delivered to the
+    local sockets right away and handed to the ``fanout`` backend, which delivers them on the
+    other workers, see ``deliver``.
+
+    Every message is sent as ``{"type": "message", "origin", "seq", "topic"?, "data"}`` and
+    kept in the replay buffer of its user, topic or of the broadcasts. ``origin`` is the
+    worker that published it and ``seq`` its number among the messages of that worker, see
+    ReplayStore. Clients start every connection with ``resume``: a new client gets the current
+    cursor, a client that reconnects, to any worker, sends the cursor it kept and gets the
+    messages it missed, or learns that it has to reload its state because they are no longer
+    buffered.
+
+    Clients may only subscribe to topics their ``topic_authorizers`` allow. The authorizer is
+    picked by the topic prefix before the first ``:``, topics without one are refused.
+    ``subscribe`` itself does not check, the server may subscribe connections to anything.
+
+    Half-open and idle connections are found by ``heartbeat`` and evicted.
+
+    Messages are text frames of JSON unless the client negotiates another framing, one of
+    ``framings``, with a websocket subprotocol. The callers of the manager never see frames.
+    """
+
+    BROADCAST = "broadcast"
+    USER = "user"
+    TOPIC = "topic"
+
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    DISCONNECT = "disconnect"
+    OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST, DISCONNECT)
+
+    def __init__(
+        self,
+        queue_size: int = ws_config.SEND_QUEUE_SIZE,
+        overflow_policy: str = ws_config.OVERFLOW_POLICY,
+        send_timeout_seconds: float = ws_config.SEND_TIMEOUT_SECONDS,
+        max_topics_per_connection: int = ws_config.MAX_TOPICS_PER_CONNECTION,
+        fanout: FanoutBackend | None = None,
+        replay_buffer_size: int = ws_config.REPLAY_BUFFER_SIZE,
+        replay_max_streams: int = ws_config.REPLAY_MAX_STREAMS,
+        heartbeat_interval_seconds: float = ws_config.HEARTBEAT_INTERVAL_SECONDS,
+        heartbeat_timeout_seconds: float = ws_config.HEARTBEAT_TIMEOUT_SECONDS,
+        idle_timeout_seconds: float = ws_config.IDLE_TIMEOUT_SECONDS,
+        framings: dict[str, TextFraming] | None = None,
+        topic_authorizers: dict[str, TopicAuthorizer] | None = None,
+    ) -> None:
+        if overflow_policy not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown websocket overflow policy: {overflow_policy}")
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.send_timeout_seconds = send_timeout_seconds
+        self.max_topics_per_connection = max_topics_per_connection
+        self.fanout = fanout or FanoutBackend()
+        self.replay = ReplayStore(replay_buffer_size, replay_max_streams)
+        self.text_framing = TextFraming()
+        self.framings = create_framings() if framings is None else framings
+        self.topic_authorizers = (
+            DEFAULT_TOPIC_AUTHORIZERS if topic_authorizers is None else topic_authorizers
+        )
+        self.heartbeat = Heartbeat(
+            heartbeat_interval_seconds, heartbeat_timeout_seconds, idle_timeout_seconds
+        )
+        self.active_connections: dict[int, set[ClientConnection]] = {}
+        self.topic_subscribers: dict[str, set[ClientConnection]] = {}
+        self.sent_messages = 0
+        self.dropped_messages = 0
+        self.slow_disconnects = 0
+        self.send_failures = 0
+        self.denied_subscriptions = 0
+        self._closing: set[asyncio.Task] = set()
+
+    async def connect(
+        self, user_id: int, websocket: WebSocket, roles: Iterable[str] = ()
+    ) -> ClientConnection:
+        """Accepts the websocket in the first framing among the subprotocols the client offers.
+
+        Args:
+            user_id (int): The id of the authenticated user.
+            websocket (WebSocket): The websocket.
+            roles (Iterable[str]): The roles of the user, see PortalRole, for the topic
+                authorizers.
+        """
+        framing = next(
+            (
+                self.framings[subprotocol]
+                for subprotocol in websocket.scope.get("subprotocols", [])
+                if subprotocol in self.framings
+            ),
+            self.text_framing,
+        )
+        await websocket.accept(subprotocol=framing.subprotocol)
+        connection = ClientConnection(self, user_id, websocket, framing, roles)
+        self.active_connections.setdefault(user_id, set()).add(connection)
+        self.heartbeat.watch(connection)
+        return connection
+
+    def disconnect(self, connection: ClientConnection) -> None:
+        """Forgets the connection after the client disconnected."""
+        self._forget(connection)
+        connection.stop()
+
+    def remove(self, connection: ClientConnection, code: int) -> None:
+        """Forgets the connection and closes it in the background."""
+        self._forget(connection)
+        if connection.closed:
+            return
+        connection.stop()
+        task = asyncio.create_task(connection.close(code))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    def subscribe(self, connection: ClientConnection, topic: str) -> None:
+        """Subscribes the connection to the topic.
+
+        Raises:
+            ValueError: The connection is subscribed to too many topics.
+        """
+        if topic in connection.topics or connection.closed:
+            return
+        if len(connection.topics) >= self.max_topics_per_connection:
+            raise ValueError(
+                f"A connection can subscribe to at most {self.max_topics_per_connection} topics"
+            )
+        connection.topics.add(topic)
+        self.topic_subscribers.setdefault(topic, set()).add(connection)
+
+    def authorize(self, connection: ClientConnection, topic: str) -> None:
+        """Checks that the client of the connection may subscribe to the topic.
+
+        Raises:
+            PermissionError: The topic has no authorizer or its authorizer refuses.
+        """
+        authorizer = self.topic_authorizers.get(topic.partition(":")[0])
+        if authorizer is None or not authorizer(connection, topic):
+            self.denied_subscriptions += 1
+            raise PermissionError(f"Not allowed to subscribe to {topic}")
+
+    def unsubscribe(self, connection: ClientConnection, topic: str) -> None:
+        connection.topics.discard(topic)
+        subscribers = self.topic_subscribers.get(topic)
+        if subscribers is None:
+            return
+        subscribers.discard(connection)
+        if not subscribers:
+            del self.topic_subscribers[topic]
+
+    def resume(
+        self, connection: ClientConnection, cursor: Cursor | None, topics: list[str]
+    ) -> None:
+        """Subscribes the connection to the topics and sends it the messages it missed.
+
+        Replies with ``{"type": "resumed", "complete": bool, "replayed": int, "cursor": {...}}``
+        followed by the missed messages of the user, the broadcasts and the topics of the
+        connection. When ``complete`` is false some of them are no longer buffered and none
+        are sent; the client has to reload its state. Either way the client continues from
+        the returned cursor. A new client, without a cursor, has missed nothing.
+
+        Raises:
+            ValueError: The connection would be subscribed to too many topics.
+            PermissionError: The client may not subscribe to one of the topics.
+        """
+        if len(connection.topics.union(topics)) > self.max_topics_per_connection:
+            raise ValueError(
+                f"A connection can subscribe to at most {self.max_topics_per_connection} topics"
+            )
+        for topic in topics:
+            self.authorize(connection, topic)
+        for topic in topics:
+            self.subscribe(connection, topic)
+        messages: list[str] = []
+        complete = True
+        if cursor is not None:
+            keys: list[Hashable] = [(self.USER, connection.user_id), (self.BROADCAST, None)]
+            keys.extend((self.TOPIC, topic) for topic in connection.topics)
+            messages, complete = self.replay.replay(keys, cursor)
+        # Replaying more than the queue holds would drop messages or disconnect, reload instead.
+        if not complete or len(messages) >= self.queue_size - connection.queue.qsize():
+            messages, complete = [], False
+
+        connection.send(
+            json.dumps(
+                {
+                    "type": "resumed",
+                    "complete": complete,
+                    "replayed": len(messages),
+                    "cursor": self.replay.cursor(),
+                }
+            )
+        )
+        for message in messages:
+            connection.send(OutgoingMessage(message))
+
+    def handle_message(self, connection: ClientConnection, text: str) -> None:
+        """Handles a message the client sent.
+
+        JSON objects are commands, see WsSubscriptionRequest, WsResumeRequest and WsPongRequest.
+        Subscriptions are answered with ``{"type": "subscribed" | "unsubscribed", "topic":
+        ...}``, a resume as described in ``resume`` and invalid or unauthorized commands with
+        ``{"type": "error", "detail": ...}``. Pongs are not answered. Any other text is echoed
+        back as a pong.
+        """
+        if not text.lstrip().startswith("{"):
+            connection.touch()
+            connection.send(f"WS Pong: {text}")
+            return
+        try:
+            request = WsClientRequest.validate_json(text)
+            connection.touch(active=request.action != "pong")
+            if request.action == "pong":
+                return
+            if request.action == "resume":
+                self.resume(connection, request.cursor, request.topics)
+                return
+            if request.action == "subscribe":
+                self.authorize(connection, request.topic)
+                self.subscribe(connection, request.topic)
+            else:
+                self.unsubscribe(connection, request.topic)
+        except ValidationError as e:
+            connection.touch()
+            connection.send(json.dumps({"type": "error", "detail": e.errors(include_url=False)}))
+            return
+        except (ValueError, PermissionError) as e:
+            connection.send(json.dumps({"type": "error", "detail": str(e)}))
+            return
+        connection.send(json.dumps({"type": f"{request.action}d", "topic": request.topic}))
+
+    def publish(self, topic: str, data: Any) -> int:
+        """Sends ``{"type": "message", "origin", "seq", "topic", "data"}`` to the subscribers
+        on all workers.
+
+        Args:
+            topic (str): The topic.
+            data (Any): A JSON-serializable payload, serialized once for all subscribers.
+
+        Returns:
+            int: The number of connections of this worker the message was queued for.
+        """
+        return self._publish({"kind": self.TOPIC, "topic": topic}, {"topic": topic, "data": data})
+
+    def send_personal_message(self, user_id: int, message: str) -> int:
+        """Sends ``{"type": "message", "origin", "seq", "data": message}`` to every connection
+        of the user, on all workers.
+
+        Returns:
+            int: The number of connections of this worker the message was queued for.
+        """
+        return self._publish({"kind": self.USER, "user_id": user_id}, {"data": message})
+
+    def broadcast(self, message: str, local: bool = False) -> int:
+        """Sends ``{"type": "message", "origin", "seq", "data": message}`` to every
+        connection, on all workers.
+
+        Args:
+            message (str): The message text.
+            local (bool): Only send ``{"type": "message", "data": message}`` to the connections
+                of this worker, e.g. for events every worker detects by itself. Such messages
+                are not replayed.
+
+        Returns:
+            int: The number of connections of this worker the message was queued for.
+        """
+        if local:
+            message = json.dumps({"type": "message", "data": message})
+            return self.deliver({"kind": self.BROADCAST, "message": message})
+        return self._publish({"kind": self.BROADCAST}, {"data": message})
+
+    def deliver(self, event: dict[str, Any]) -> int:
+        """Buffers an event for replay and sends it to the connections of this worker.
+
+        Called for the events published here and for the ones the fanout receives from the
+        other workers.
+
+        Returns:
+            int: The number of connections the message was queued for.
+        """
+        key: Hashable
+        if event["kind"] == self.TOPIC:
+            key = (self.TOPIC, event["topic"])
+            connections = list(self.topic_subscribers.get(event["topic"], ()))
+        elif event["kind"] == self.USER:
+            key = (self.USER, event["user_id"])
+            connections = list(self.active_connections.get(event["user_id"], ()))
+        elif event["kind"] == self.BROADCAST:
+            key = (self.BROADCAST, None)
+            connections = self._connections()
+        else:
+            return 0
+        if "seq" in event:
+            self.replay.record(key, event["origin"], event["seq"], event["message"])
+        # Shared by the connections, so that it is encoded once per framing.
+        message = OutgoingMessage(event["message"])
+        return sum(connection.send(message) for connection in connections)
+
+    async def start(self) -> None:
+        self.replay.start()
+        await self.fanout.start(self.deliver)
+
+    async def stop(self) -> None:
+        await self.fanout.stop()
+
+    async def close_all(self, code: int = status.WS_1001_GOING_AWAY) -> None:
+        """Closes all connections on shutdown, clients are expected to reconnect elsewhere."""
+        self.heartbeat.stop()
+        connections = self._connections()
+        self.active_connections.clear()
+        self.topic_subscribers.clear()
+        await asyncio.gather(*(connection.close(code) for connection in connections))
+        await asyncio.gather(*self._closing, return_exceptions=True)
 
-    async def connect(self, user_id: int, websocket: WebSocket) -> None:
-        await websocket.accept()
-        self.active_connections[user_id] = websocket
+    def stats(self) -> dict[str, Any]:
+        connections = self._connections()
+        depths = [connection.queue.qsize() for connection in connections]
+        return {
+            "connections": len(depths),
+            "binary_connections": sum(
+                connection.framing is not self.text_framing for connection in connections
+            ),
+            "users": len(self.active_connections),
+            "topics": len(self.topic_subscribers),
+            "subscriptions": sum(len(s) for s in self.topic_subscribers.values()),
+            "queue_size": self.queue_size,
+            "overflow_policy": self.overflow_policy,
+            "queued_messages": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "sent_messages": self.sent_messages,
+            "dropped_messages": self.dropped_messages,
+            "slow_disconnects": self.slow_disconnects,
+            "send_failures": self.send_failures,
+            "denied_subscriptions": self.denied_subscriptions,
+            "fanout": self.fanout.stats(),
+            "replay": self.replay.stats(),
+            "heartbeat": self.heartbeat.stats(),
+        }
 
-    def disconnect(self, user_id: int) -> None:
-        self.active_connections.pop(user_id, None)
+    def _publish(self, event: dict[str, Any], fields: dict[str, Any]) -> int:
+        origin, seq = self.replay.origin, self.replay.next_seq()
+        event.update(
+            origin=origin,
+            seq=seq,
+            message=json.dumps({"type": "message", "origin": origin, "seq": seq, **fields}),
+        )
+        self.fanout.publish(event)
+        return self.deliver(event)
 
-    async def send_personal_message(self, user_id: int, message: str) -> None:
-        websocket = self.active_connections.get(user_id)
-        if websocket:
-            await websocket.send_text(message)
+    def _connections(self) -> list[ClientConnection]:
+        return [
+            connection
+            for connections in self.active_connections.values()
+            for connection in connections
+        ]
 
-    async def broadcast(self, message: str) -> None:
-        for connection in self.active_connections.values():
-            await connection.send_text(message)
+    def _forget(self, connection: ClientConnection) -> None:
+        for topic in list(connection.topics):
+            self.unsubscribe(connection, topic)
+        connections = self.active_connections.get(connection.user_id)
+        if connections is None:
+            return
+        connections.discard(connection)
+        if not connections:
+            del self.active_connections[connection.user_id]
 
 
-ws_manager = ConnectionManager()
+ws_manager = ConnectionManager(fanout=create_fanout_backend())
+metrics_registry.register("websockets", ws_manager.stats)
 
 __all__ = [
+    "ClientConnection",
+    "ConnectionManager",
+    "TopicAuthorizer",
+    "authorize_dashboard",
+    "authorize_room",
     "ws_manager",
 ]
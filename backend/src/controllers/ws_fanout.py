@@ -0,0 +1,292 @@
+import asyncio
+import base64
+import itertools
+import json
+import logging
+import time
+import uuid
+from typing import Any, Callable, cast
+
+import asyncpg
+from sqlalchemy import make_url
+
+from config import DATABASE_URL, WebSocketConfig, ws_config
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more.
+MAX_NOTIFY_PAYLOAD_BYTES = 7900
+# Partially received chunked events are dropped after this long.
+CHUNK_TTL_SECONDS = 30
+
+Deliver = Callable[[dict[str, Any]], None]
+
+
+class FanoutBackend:
+    """Carries websocket events to the other workers.
+
+    ConnectionManager delivers every event to its own sockets first, then hands it to the
+    backend, which calls ``deliver`` on every other worker so that they deliver it to theirs.
+    This base backend is in-process only: there are no other workers to reach.
+    """
+
+    name = "local"
+
+    async def start(self, deliver: Deliver) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def publish(self, event: dict[str, Any]) -> None:
+        pass
+
+    def stats(self) -> dict[str, Any]:
+        return {"backend": self.name}
+
+
+class PostgresFanout(FanoutBackend):
+    """Fanout through Postgres ``LISTEN/NOTIFY`` on a dedicated connection per worker.
+
+    Published events are queued and sent by a background task, which packs the events
+    queued within ``batch_interval_seconds`` into as few notifications as fit the payload
+    limit and sends them in one round-trip. An event too large for one notification is sent
+    in base64 chunks and reassembled by the receivers. Notifications carry the id of the
+    sending worker, which ignores its own. While the connection is down events only reach
+    the local sockets; the listener reconnects in the background.
+    """
+
+    name = "postgres"
+
+    def __init__(
+        self,
+        dsn: str,
+        channel: str,
+        batch_interval_seconds: float,
+        outbox_size: int = 10_000,
+        max_payload_bytes: int = MAX_NOTIFY_PAYLOAD_BYTES,
+        reconnect_seconds: float = 1,
+    ) -> None:
+        self.dsn = dsn
+        self.channel = channel
+        self.batch_interval_seconds = batch_interval_seconds
+        self.outbox_size = outbox_size
+        self.max_payload_bytes = max_payload_bytes
+        self.reconnect_seconds = reconnect_seconds
+        self.origin = ""
+        self.connection: asyncpg.Connection | None = None
+        self._deliver: Deliver | None = None
+        self._outbox: asyncio.Queue[str] | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._chunks: dict[tuple[str, str], tuple[float, list[str | None]]] = {}
+        self._sequence = itertools.count()
+        self.published_events = 0
+        self.sent_notifications = 0
+        self.received_events = 0
+        self.dropped_events = 0
+        self.reconnects = 0
+
+    async def start(self, deliver: Deliver) -> None:
+        # Set here rather than in __init__: workers are forked after the import.
+        self.origin = uuid.uuid4().hex[:12]
+        self._deliver = deliver
+        self._outbox = asyncio.Queue(maxsize=self.outbox_size)
+        connected = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._listen(connected)),
+            asyncio.create_task(self._send()),
+        ]
+        # Wait briefly so that the first events of a healthy worker are not lost.
+        try:
+            await asyncio.wait_for(connected.wait(), timeout=self.reconnect_seconds)
+        except TimeoutError:
+            logging.warning("Websocket fanout is not connected yet, delivering locally")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.connection is not None:
+            await self.connection.close(timeout=self.reconnect_seconds)
+            self.connection = None
+
+    def publish(self, event: dict[str, Any]) -> None:
+        if self._outbox is None:
+            return
+        try:
+            self._outbox.put_nowait(json.dumps(event))
+            self.published_events += 1
+        except asyncio.QueueFull:
+            self.dropped_events += 1
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "backend": self.name,
+            "connected": self.connection is not None and not self.connection.is_closed(),
+            "outbox": self._outbox.qsize() if self._outbox is not None else 0,
+            "published_events": self.published_events,
+            "sent_notifications": self.sent_notifications,
+            "received_events": self.received_events,
+            "dropped_events": self.dropped_events,
+            "pending_chunked_events": len(self._chunks),
+            "reconnects": self.reconnects,
+        }
+
+    def encode(self, events: list[str]) -> list[str]:
+        """Packs encoded events into notification payloads within ``max_payload_bytes``.
+
+        Events are JSON with ASCII escapes, so their length in characters is their size in
+        bytes.
+
+        Returns:
+            list[str]: The payloads, ``{"o": origin, "n": seq, "e": [event, ...]}`` or, for an
+                event too large for one payload, ``{"o", "n", "c": id, "i": index, "k": count,
+                "d": base64 part}``.
+        """
+        payloads: list[str] = []
+        batch: list[str] = []
+        overhead = len(self._batch_payload([], sequence=10**12))
+        size = overhead
+        for event in events:
+            too_large = overhead + len(event) > self.max_payload_bytes
+            # The event and its separating comma.
+            if batch and (too_large or size + len(event) + 1 > self.max_payload_bytes):
+                payloads.append(self._batch_payload(batch, next(self._sequence)))
+                batch, size = [], overhead
+            if too_large:
+                payloads.extend(self._chunk_payloads(event))
+                continue
+            size += len(event) + bool(batch)
+            batch.append(event)
+        if batch:
+            payloads.append(self._batch_payload(batch, next(self._sequence)))
+        return payloads
+
+    def receive(self, payload: str) -> None:
+        """Delivers the events of a notification sent by another worker."""
+        try:
+            message = json.loads(payload)
+            if message["o"] == self.origin:
+                return
+            if "e" in message:
+                events = message["e"]
+            else:
+                event = self._reassemble(message)
+                events = [] if event is None else [event]
+        except (ValueError, KeyError, IndexError, TypeError):
+            logging.warning(f"Ignoring a malformed websocket fanout notification: {payload[:100]}")
+            return
+        assert self._deliver is not None, "The fanout receives only once started"
+        for event in events:
+            self.received_events += 1
+            try:
+                self._deliver(event)
+            except Exception:
+                logging.exception("Failed to deliver a websocket fanout event")
+
+    def _batch_payload(self, events: list[str], sequence: int) -> str:
+        # Postgres delivers identical payloads sent in one transaction once, "n" keeps every
+        # payload of the worker distinct.
+        return f'{{"o":"{self.origin}","n":{sequence},"e":[{",".join(events)}]}}'
+
+    def _chunk_payloads(self, event: str) -> list[str]:
+        data = base64.b64encode(event.encode()).decode()
+        chunk_id = uuid.uuid4().hex[:12]
+        overhead = len(
+            json.dumps(
+                {"o": self.origin, "n": 10**12, "c": chunk_id, "i": 10**6, "k": 10**6, "d": ""},
+                separators=(",", ":"),
+            )
+        )
+        part_size = self.max_payload_bytes - overhead
+        parts = [data[i : i + part_size] for i in range(0, len(data), part_size)]
+        return [
+            json.dumps(
+                {
+                    "o": self.origin,
+                    "n": next(self._sequence),
+                    "c": chunk_id,
+                    "i": i,
+                    "k": len(parts),
+                    "d": part,
+                },
+                separators=(",", ":"),
+            )
+            for i, part in enumerate(parts)
+        ]
+
+    def _reassemble(self, message: dict[str, Any]) -> dict[str, Any] | None:
+        now = time.monotonic()
+        for key in [
+            key for key, (started, _) in self._chunks.items() if now - started > CHUNK_TTL_SECONDS
+        ]:
+            del self._chunks[key]
+        key = (message["o"], message["c"])
+        started, parts = self._chunks.setdefault(key, (now, [None] * message["k"]))
+        parts[message["i"]] = message["d"]
+        if any(part is None for part in parts):
+            return None
+        del self._chunks[key]
+        return json.loads(base64.b64decode("".join(cast(list[str], parts))))
+
+    async def _listen(self, connected: asyncio.Event) -> None:
+        while True:
+            lost = asyncio.Event()
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                connection.add_termination_listener(lambda _: lost.set())
+                await connection.add_listener(
+                    self.channel, lambda _connection, _pid, _channel, payload: self.receive(payload)
+                )
+            except Exception as e:
+                logging.warning(f"Websocket fanout cannot connect to the database: {e!r}")
+                await asyncio.sleep(self.reconnect_seconds)
+                continue
+            self.connection = connection
+            connected.set()
+            await lost.wait()
+            self.connection = None
+            self.reconnects += 1
+            logging.warning("Websocket fanout lost its database connection, reconnecting")
+
+    async def _send(self) -> None:
+        outbox = self._outbox
+        assert outbox is not None, "The sender runs only once started"
+        while True:
+            events = [await outbox.get()]
+            await asyncio.sleep(self.batch_interval_seconds)
+            while not outbox.empty():
+                events.append(outbox.get_nowait())
+
+            connection = self.connection
+            if connection is None or connection.is_closed():
+                self.dropped_events += len(events)
+                continue
+            payloads = self.encode(events)
+            try:
+                await connection.executemany(
+                    "SELECT pg_notify($1, $2)", [(self.channel, payload) for payload in payloads]
+                )
+            except Exception as e:
+                self.dropped_events += len(events)
+                logging.warning(f"Websocket fanout failed to notify: {e!r}")
+                continue
+            self.sent_notifications += len(payloads)
+
+
+def create_fanout_backend(config: WebSocketConfig = ws_config) -> FanoutBackend:
+    if config.FANOUT_BACKEND == FanoutBackend.name:
+        return FanoutBackend()
+    if config.FANOUT_BACKEND == PostgresFanout.name:
+        return PostgresFanout(
+            dsn=make_url(DATABASE_URL).set(drivername="postgresql").render_as_string(False),
+            channel=config.FANOUT_CHANNEL,
+            batch_interval_seconds=config.FANOUT_BATCH_INTERVAL_SECONDS,
+        )
+    raise ValueError(f"Unknown websocket fanout backend: {config.FANOUT_BACKEND}")
+
+
+__all__ = [
+    "FanoutBackend",
+    "PostgresFanout",
+    "create_fanout_backend",
+]
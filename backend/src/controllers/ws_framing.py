@@ -0,0 +1,111 @@
+import json
+import zlib
+from typing import Any
+
+import msgpack
+from fastapi import WebSocket
+
+from config import WebSocketConfig, ws_config
+
+MSGPACK_SUBPROTOCOL = "tutorlab.msgpack.v1"
+# First byte of a binary frame: how the rest of it is encoded.
+FRAME_PLAIN = 0
+FRAME_DEFLATE = 1
+
+
+class OutgoingMessage:
+    """A message queued for one or many connections, encoded at most once per framing."""
+
+    __slots__ = ("text", "_packed")
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self._packed: bytes | None = None
+
+    @property
+    def packed(self) -> bytes:
+        """The message as msgpack: the JSON value, or the text if it is not JSON."""
+        if self._packed is None:
+            try:
+                value: Any = json.loads(self.text)
+            except ValueError:
+                value = self.text
+            self._packed = msgpack.packb(value)
+        return self._packed
+
+
+class TextFraming:
+    """The default framing: every message is a text frame of its own."""
+
+    subprotocol: str | None = None
+    max_batch_messages = 1
+    batch_interval_seconds = 0.0
+
+    async def send(self, websocket: WebSocket, messages: list[OutgoingMessage]) -> None:
+        for message in messages:
+            await websocket.send_text(message.text)
+
+
+class MsgpackFraming(TextFraming):
+    """Binary framing for clients that receive many small messages, e.g. dashboards.
+
+    Negotiated with the ``tutorlab.msgpack.v1`` websocket subprotocol. The messages queued
+    for a connection within ``batch_interval_seconds``, at most ``max_batch_messages``, are
+    sent in one binary frame: a byte telling the encoding followed by a msgpack array of the
+    messages, each one the value the text framing sends as JSON. Frames of at least
+    ``compression_threshold_bytes`` are compressed with zlib (``FRAME_DEFLATE``), smaller
+    ones are sent as they are (``FRAME_PLAIN``). Commands from the client stay JSON text.
+    """
+
+    subprotocol = MSGPACK_SUBPROTOCOL
+
+    def __init__(
+        self,
+        batch_interval_seconds: float,
+        max_batch_messages: int,
+        compression_threshold_bytes: int,
+        compression_level: int = 6,
+    ) -> None:
+        self.batch_interval_seconds = batch_interval_seconds
+        self.max_batch_messages = max_batch_messages
+        self.compression_threshold_bytes = compression_threshold_bytes
+        self.compression_level = compression_level
+
+    async def send(self, websocket: WebSocket, messages: list[OutgoingMessage]) -> None:
+        await websocket.send_bytes(self.encode(messages))
+
+    def encode(self, messages: list[OutgoingMessage]) -> bytes:
+        # An array is its header followed by the elements, so the messages packed once for
+        # all connections are concatenated instead of packing the whole batch again.
+        header = msgpack.Packer().pack_array_header(len(messages))
+        body = b"".join([header, *(message.packed for message in messages)])
+        if len(body) >= self.compression_threshold_bytes:
+            return bytes([FRAME_DEFLATE]) + zlib.compress(body, self.compression_level)
+        return bytes([FRAME_PLAIN]) + body
+
+
+def decode_frame(frame: bytes) -> list[Any]:
+    """Decodes a binary frame of MsgpackFraming, as a client does."""
+    body = zlib.decompress(frame[1:]) if frame[0] == FRAME_DEFLATE else frame[1:]
+    return msgpack.unpackb(body)
+
+
+def create_framings(config: WebSocketConfig = ws_config) -> dict[str, TextFraming]:
+    """Returns the framings clients may negotiate, by subprotocol."""
+    return {
+        MSGPACK_SUBPROTOCOL: MsgpackFraming(
+            batch_interval_seconds=config.BINARY_BATCH_INTERVAL_SECONDS,
+            max_batch_messages=config.BINARY_MAX_BATCH_MESSAGES,
+            compression_threshold_bytes=config.BINARY_COMPRESSION_THRESHOLD_BYTES,
+        )
+    }
+
+
+__all__ = [
+    "MSGPACK_SUBPROTOCOL",
+    "MsgpackFraming",
+    "OutgoingMessage",
+    "TextFraming",
+    "create_framings",
+    "decode_frame",
+]
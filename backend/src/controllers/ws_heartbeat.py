@@ -0,0 +1,114 @@
+import asyncio
+import heapq
+import itertools
+import json
+from typing import TYPE_CHECKING, Any
+
+from fastapi import status
+
+if TYPE_CHECKING:
+    from src.controllers.ws import ClientConnection
+
+PING = json.dumps({"type": "ping"})
+
+
+class Heartbeat:
+    """Pings quiet websocket clients and evicts the unresponsive and idle ones.
+
+    A client that sent nothing for ``interval_seconds`` gets ``{"type": "ping"}`` and has to
+    send something, e.g. ``{"action": "pong"}``, within ``timeout_seconds``, otherwise the
+    connection is considered half-open and evicted. With ``idle_timeout_seconds`` a client
+    that sent nothing but pongs for that long is evicted as well.
+
+    The deadlines of all connections are kept in one heap served by a single event loop
+    timer instead of a sleeping task per connection. A received message only updates the
+    timestamps of its connection; when the heap entry of the connection comes due it is
+    pushed back with the new deadline if that moved, so every connection has one entry.
+    """
+
+    def __init__(
+        self, interval_seconds: float, timeout_seconds: float, idle_timeout_seconds: float
+    ) -> None:
+        self.interval_seconds = interval_seconds
+        self.timeout_seconds = timeout_seconds
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self._heap: list[tuple[float, int, "ClientConnection"]] = []
+        # Breaks deadline ties, connections are not comparable.
+        self._counter = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+        self.pings_sent = 0
+        self.unresponsive_evictions = 0
+        self.idle_evictions = 0
+
+    def watch(self, connection: "ClientConnection") -> None:
+        """Starts tracking a new connection, disabled when ``interval_seconds`` is not positive."""
+        if self.interval_seconds <= 0:
+            return
+        heapq.heappush(self._heap, (self.deadline(connection), next(self._counter), connection))
+        if self._heap[0][2] is connection:
+            self._arm()
+
+    def deadline(self, connection: "ClientConnection") -> float:
+        """Returns the loop time at which the connection is pinged or evicted."""
+        if connection.ping_sent_at is None:
+            deadline = connection.last_seen + self.interval_seconds
+        else:
+            deadline = connection.ping_sent_at + self.timeout_seconds
+        if self.idle_timeout_seconds > 0:
+            deadline = min(deadline, connection.last_active + self.idle_timeout_seconds)
+        return deadline
+
+    def stop(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._heap.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "interval_seconds": self.interval_seconds,
+            "scheduled": len(self._heap),
+            "pings_sent": self.pings_sent,
+            "unresponsive_evictions": self.unresponsive_evictions,
+            "idle_evictions": self.idle_evictions,
+        }
+
+    def _arm(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = None
+        if self._heap:
+            self._timer = asyncio.get_running_loop().call_at(self._heap[0][0], self._expire)
+
+    def _expire(self) -> None:
+        now = asyncio.get_running_loop().time()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, connection = heapq.heappop(self._heap)
+            if connection.closed:
+                continue
+            deadline = self.deadline(connection)
+            if deadline > now:
+                # The client sent something since the entry was pushed.
+                heapq.heappush(self._heap, (deadline, next(self._counter), connection))
+            elif (
+                self.idle_timeout_seconds > 0
+                and now >= connection.last_active + self.idle_timeout_seconds
+            ):
+                self.idle_evictions += 1
+                connection.manager.remove(connection, status.WS_1001_GOING_AWAY)
+            elif connection.ping_sent_at is not None:
+                self.unresponsive_evictions += 1
+                connection.manager.remove(connection, status.WS_1001_GOING_AWAY)
+            else:
+                connection.ping_sent_at = now
+                connection.send(PING)
+                self.pings_sent += 1
+                heapq.heappush(
+                    self._heap, (self.deadline(connection), next(self._counter), connection)
+                )
+        self._arm()
+
+
+__all__ = [
+    "Heartbeat",
+]
@@ -0,0 +1,152 @@
+import itertools
+import uuid
+from collections import OrderedDict, deque
+from typing import Hashable, Iterable
+
+# The replay position of a client: origin -> the sequence number of the last message of the
+# origin it received.
+Cursor = dict[str, int]
+
+
+class _Stream:
+    __slots__ = ("messages", "dropped")
+
+    def __init__(self, size: int) -> None:
+        # (arrival, origin, seq, message)
+        self.messages: deque[tuple[int, str, int, str]] = deque(maxlen=size)
+        # origin -> the highest sequence number of the origin pushed out of the buffer.
+        self.dropped: Cursor = {}
+
+
+class ReplayStore:
+    """Keeps the latest messages of every stream so that reconnecting clients get the gap.
+
+    Every worker is an origin with an id of its own and numbers the messages it publishes
+    1, 2, 3... with ``next_seq``. The fanout keeps the messages of one origin in order, so
+    every worker receives them in that order, while the messages of different origins may
+    interleave differently on every worker. Clients therefore keep a cursor with the last
+    sequence number they received per origin, see ``cursor``, and resume from it on any
+    worker. A skipped number means the messages in between never reached this worker.
+
+    A stream is a user, a topic or the broadcasts. Each one keeps its last ``buffer_size``
+    messages and at most ``max_streams`` streams are kept, the least recently written one is
+    dropped first. ``replay`` tells whether it could return the whole gap: not when a message
+    the client has not seen was dropped or never reached this worker, e.g. because the worker
+    started after it, or when the cursor has an origin this worker never received from.
+    Messages of an origin the cursor does not know are all new to the client.
+    """
+
+    def __init__(self, buffer_size: int, max_streams: int) -> None:
+        self.buffer_size = buffer_size
+        self.max_streams = max_streams
+        self.origin = uuid.uuid4().hex[:12]
+        self._sequence = itertools.count(1)
+        self._arrivals = itertools.count()
+        self._streams: OrderedDict[Hashable, _Stream] = OrderedDict()
+        self._last_seqs: Cursor = {self.origin: 0}
+        # origin -> messages of the origin up to this number may be missing from every stream.
+        self._floors: Cursor = {}
+        self.replays = 0
+        self.incomplete_replays = 0
+        self.replayed_messages = 0
+        self.evicted_streams = 0
+        self.lost_messages = 0
+
+    def start(self) -> None:
+        """Starts a new origin: workers are forked after the store is created."""
+        if self._last_seqs.get(self.origin) == 0:
+            del self._last_seqs[self.origin]
+        self.origin = uuid.uuid4().hex[:12]
+        self._sequence = itertools.count(1)
+        self._last_seqs[self.origin] = 0
+
+    def next_seq(self) -> int:
+        """Numbers a message published by this worker, see ``origin``."""
+        return next(self._sequence)
+
+    def cursor(self) -> Cursor:
+        """Returns the position after the last message of every origin received so far."""
+        return dict(self._last_seqs)
+
+    def record(self, key: Hashable, origin: str, seq: int, message: str) -> None:
+        """Stores the message of the stream, dropping the oldest one when the buffer is full."""
+        last_seq = self._last_seqs.get(origin)
+        if last_seq is None or seq > last_seq + 1:
+            # The first message of an origin started before this worker, or a lost one.
+            self._raise_floor(origin, seq - 1)
+            if last_seq is not None:
+                self.lost_messages += seq - last_seq - 1
+        self._last_seqs[origin] = max(seq, last_seq or 0)
+
+        stream = self._streams.get(key)
+        if stream is None:
+            stream = self._streams[key] = _Stream(self.buffer_size)
+            while len(self._streams) > self.max_streams:
+                _, evicted = self._streams.popitem(last=False)
+                for _, evicted_origin, evicted_seq, _ in evicted.messages:
+                    self._raise_floor(evicted_origin, evicted_seq)
+                for evicted_origin, evicted_seq in evicted.dropped.items():
+                    self._raise_floor(evicted_origin, evicted_seq)
+                self.evicted_streams += 1
+        else:
+            self._streams.move_to_end(key)
+        if stream.messages and len(stream.messages) == stream.messages.maxlen:
+            _, dropped_origin, dropped_seq, _ = stream.messages[0]
+            stream.dropped[dropped_origin] = max(stream.dropped.get(dropped_origin, 0), dropped_seq)
+        stream.messages.append((next(self._arrivals), origin, seq, message))
+
+    def replay(self, keys: Iterable[Hashable], cursor: Cursor) -> tuple[list[str], bool]:
+        """Returns the messages of the streams after the cursor, in the order they arrived.
+
+        Args:
+            keys (Iterable[Hashable]): The streams the client receives.
+            cursor (Cursor): The last sequence number per origin the client received.
+
+        Returns:
+            tuple[list[str], bool]: The messages and whether they are the whole gap.
+        """
+        # An origin this worker never heard of may have sent messages before the worker started.
+        complete = self._last_seqs.keys() >= cursor.keys() and self._covers(cursor, self._floors)
+        missed: list[tuple[int, str]] = []
+        for key in keys:
+            stream = self._streams.get(key)
+            if stream is None:
+                continue
+            complete = complete and self._covers(cursor, stream.dropped)
+            missed.extend(
+                (arrival, message)
+                for arrival, origin, seq, message in stream.messages
+                if seq > cursor.get(origin, 0)
+            )
+        missed.sort(key=lambda item: item[0])
+
+        self.replays += 1
+        self.incomplete_replays += not complete
+        self.replayed_messages += len(missed)
+        return [message for _, message in missed], complete
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "streams": len(self._streams),
+            "buffered_messages": sum(len(s.messages) for s in self._streams.values()),
+            "origins": len(self._last_seqs),
+            "replays": self.replays,
+            "incomplete_replays": self.incomplete_replays,
+            "replayed_messages": self.replayed_messages,
+            "evicted_streams": self.evicted_streams,
+            "lost_messages": self.lost_messages,
+        }
+
+    def _raise_floor(self, origin: str, seq: int) -> None:
+        if seq > self._floors.get(origin, 0):
+            self._floors[origin] = seq
+
+    @staticmethod
+    def _covers(cursor: Cursor, seqs: Cursor) -> bool:
+        return all(cursor.get(origin, 0) >= seq for origin, seq in seqs.items())
+
+
+__all__ = [
+    "Cursor",
+    "ReplayStore",
+]
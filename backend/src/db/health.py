@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import time
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config import db_conf
+from src.controllers.ws import ws_manager
+from src.db.session import db_connections
+from src.service_layer.metrics import metrics_registry
+
+
+class DatabaseHealthMonitor:
+    """Checks the database in the background and keeps a circuit breaker for requests.
+
+    A ``SELECT 1`` probe runs every ``interval_seconds``. After ``failure_threshold`` failed
+    probes in a row the circuit opens: ``is_available`` turns False, so requests fail fast
+    instead of waiting for connection timeouts, and the probe is retried every
+    ``retry_seconds``. The first successful probe closes the circuit again. Requests never
+    probe the database themselves, they only read the cached state.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        interval_seconds: float,
+        timeout_seconds: float,
+        failure_threshold: int,
+        retry_seconds: float,
+    ) -> None:
+        self.engine = engine
+        self.interval_seconds = interval_seconds
+        self.timeout_seconds = timeout_seconds
+        self.failure_threshold = failure_threshold
+        self.retry_seconds = retry_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.last_error: str | None = None
+        self.last_checked_at: float | None = None
+        self.last_latency_seconds: float | None = None
+        self.opened_at: float | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def is_available(self) -> bool:
+        return self.state == self.CLOSED
+
+    async def check(self) -> bool:
+        """Probes the database once and updates the circuit state.
+
+        Returns:
+            bool: Whether the probe succeeded.
+        """
+        started = time.monotonic()
+        try:
+            async with asyncio.timeout(self.timeout_seconds):
+                async with self.engine.connect() as connection:
+                    await connection.execute(text("SELECT 1"))
+        except Exception as e:
+            self._record_failure(e)
+            return False
+        finally:
+            self.last_checked_at = time.monotonic()
+
+        self.last_latency_seconds = self.last_checked_at - started
+        self._record_success()
+        return True
+
+    async def start(self) -> None:
+        """Runs the first probe and starts probing in the background."""
+        if self._task is not None:
+            return
+        await self.check()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def snapshot(self) -> dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "available": self.is_available,
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+            "last_check_seconds_ago": (
+                round(now - self.last_checked_at, 3) if self.last_checked_at is not None else None
+            ),
+            "last_latency_ms": (
+                round(self.last_latency_seconds * 1000, 3)
+                if self.last_latency_seconds is not None
+                else None
+            ),
+            "open_for_seconds": (
+                round(now - self.opened_at, 3) if self.opened_at is not None else None
+            ),
+        }
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds if self.is_available else self.retry_seconds)
+            await self.check()
+
+    def _record_failure(self, error: Exception) -> None:
+        self.consecutive_failures += 1
+        self.last_error = repr(error)
+        if self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            logging.error(f"Database is unavailable, failing requests fast: {error!r}")
+            # Every worker runs its own monitor and tells its own clients.
+            ws_manager.broadcast(f"Database connection failed: {error}", local=True)
+
+    def _record_success(self) -> None:
+        if self.state == self.OPEN:
+            logging.info("Database is available again")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.last_error = None
+        self.opened_at = None
+
+
+db_health_monitor = DatabaseHealthMonitor(
+    engine=db_connections.engine,
+    interval_seconds=db_conf.HEALTH_CHECK_INTERVAL_SECONDS,
+    timeout_seconds=db_conf.HEALTH_CHECK_TIMEOUT_SECONDS,
+    failure_threshold=db_conf.HEALTH_FAILURE_THRESHOLD,
+    retry_seconds=db_conf.HEALTH_RETRY_SECONDS,
+)
+metrics_registry.register("db_health", db_health_monitor.snapshot)
+
+__all__ = [
+    "DatabaseHealthMonitor",
+    "db_health_monitor",
+]
@@ -0,0 +1,90 @@
+import logging
+from pathlib import Path
+
+from sqlalchemy import Connection, func, select
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+
+SCRIPT_LOCATION = Path(__file__).resolve().parents[2] / "alembic"
+# Key of the session-level advisory lock held while migrating, any bigint shared by all migrators.
+MIGRATIONS_LOCK_KEY = 7_204_115_903_219_817_042
+
+
+def alembic_config() -> Config:
+    alembic_cfg = Config()
+    alembic_cfg.set_main_option("script_location", str(SCRIPT_LOCATION))
+    return alembic_cfg
+
+
+async def run_migrations(database_url: str, revision: str = "head") -> None:
+    """Upgrades the database to the revision under a Postgres advisory lock.
+
+    Concurrent migrators, e.g. several deploy jobs, wait for the lock and then find the schema
+    already upgraded, so migrations run once.
+
+    Args:
+        database_url (str): The database to upgrade.
+        revision (str): The target revision.
+    """
+    engine = create_async_engine(database_url, poolclass=NullPool)
+    try:
+        async with engine.connect() as connection:
+            await connection.execute(select(func.pg_advisory_lock(MIGRATIONS_LOCK_KEY)))
+            await connection.commit()
+            try:
+                await connection.run_sync(_upgrade, alembic_config(), revision)
+                await connection.commit()
+            finally:
+                await connection.rollback()
+                await connection.execute(select(func.pg_advisory_unlock(MIGRATIONS_LOCK_KEY)))
+                await connection.commit()
+    finally:
+        await engine.dispose()
+
+
+async def get_schema_revisions(connection: AsyncConnection) -> tuple[set[str], set[str]]:
+    """Reads the revisions applied to the database and the head revisions of the scripts.
+
+    Returns:
+        tuple[set[str], set[str]]: The current revisions and the head revisions.
+    """
+    script = ScriptDirectory.from_config(alembic_config())
+    current = await connection.run_sync(
+        lambda sync_connection: MigrationContext.configure(sync_connection).get_current_heads()
+    )
+    return set(current), set(script.get_heads())
+
+
+async def check_schema_at_head(connection: AsyncConnection) -> bool:
+    """Logs an error when the database schema is not at the head revision.
+
+    Returns:
+        bool: Whether the schema is at head.
+    """
+    current, heads = await get_schema_revisions(connection)
+    if current != heads:
+        logging.error(
+            f"Database schema is at {sorted(current) or 'no revision'}, head is {sorted(heads)}. "
+            "Run `python migrations.py` to upgrade it."
+        )
+        return False
+    return True
+
+
+def _upgrade(connection: Connection, alembic_cfg: Config, revision: str) -> None:
+    alembic_cfg.attributes["connection"] = connection
+    command.upgrade(alembic_cfg, revision)
+
+
+__all__ = [
+    "MIGRATIONS_LOCK_KEY",
+    "alembic_config",
+    "check_schema_at_head",
+    "get_schema_revisions",
+    "run_migrations",
+]
@@ -1,4 +1,6 @@
-from sqlalchemy import String, UniqueConstraint
+from datetime import datetime
+
+from sqlalchemy import DateTime, String, UniqueConstraint
 from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -13,9 +15,12 @@ class User(Base):
     username: Mapped[str] = mapped_column(String(30))
     fullname: Mapped[str | None] = mapped_column(String(30))
     email: Mapped[str] = mapped_column(String(30))
-    hashed_password: Mapped[str] = mapped_column(String(64))
+    hashed_password: Mapped[str] = mapped_column(String(128))
     disabled: Mapped[bool] = mapped_column()
     roles: Mapped[list[str]] = mapped_column(ARRAY(String), nullable=False)
+    token_version: Mapped[int] = mapped_column(default=0, server_default="0")
+    # When token_version was last bumped, tokens of older versions expire within a token lifetime.
+    token_revoked_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), index=True)
 
     __table_args__ = (UniqueConstraint("username", "email", name="uq_username_email"),)
 
@@ -27,6 +32,7 @@ class User(Base):
             disabled=self.disabled,
             roles=[PortalRole(role_str) for role_str in self.roles],
             password=self.hashed_password,
+            token_version=self.token_version,
         )
 
     def __repr__(self) -> str:
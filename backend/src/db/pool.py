@@ -0,0 +1,77 @@
+import time
+from typing import Any
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.service_layer.metrics import Histogram
+
+
+class PoolMetrics:
+    """Checkout statistics of a connection pool, kept across pool re-creation."""
+
+    def __init__(self) -> None:
+        self.wait_histogram = Histogram()
+        self.connect_histogram = Histogram()
+        self.checkouts = 0
+        self.timeouts = 0
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait for a connection and how often they time out.
+
+    Opening a new connection is timed separately: the wait only covers the time spent queueing
+    for a free connection, so a slow database does not look like an exhausted pool.
+
+    Use ``instrumented_pool_class`` to get a subclass bound to a PoolMetrics instance. The
+    metrics live on the class because SQLAlchemy re-creates the pool from its class, e.g. on
+    ``engine.dispose()``.
+    """
+
+    metrics: PoolMetrics
+
+    def _do_get(self) -> Any:
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.timeouts += 1
+            self.metrics.wait_histogram.observe(time.perf_counter() - started)
+            raise
+        # The record remembers its connect time only until the checkout that created it.
+        connect_seconds = record.__dict__.pop("_connect_seconds", 0.0)
+        self.metrics.wait_histogram.observe(time.perf_counter() - started - connect_seconds)
+        self.metrics.checkouts += 1
+        return record
+
+    def _create_connection(self) -> Any:
+        started = time.perf_counter()
+        record = super()._create_connection()
+        record._connect_seconds = time.perf_counter() - started
+        self.metrics.connect_histogram.observe(record._connect_seconds)
+        return record
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "timeout_seconds": self.timeout(),
+            "checkouts": self.metrics.checkouts,
+            "timeouts": self.metrics.timeouts,
+            "wait": self.metrics.wait_histogram.stats(),
+            "connect": self.metrics.connect_histogram.stats(),
+        }
+
+
+def instrumented_pool_class(metrics: PoolMetrics) -> type[InstrumentedPool]:
+    return type("InstrumentedPool", (InstrumentedPool,), {"metrics": metrics})
+
+
+__all__ = [
+    "PoolMetrics",
+    "InstrumentedPool",
+    "instrumented_pool_class",
+]
@@ -0,0 +1,188 @@
+import asyncio
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+from sqlalchemy import Engine, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery() THEN 0"
+    " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+    " END"
+)
+READ_YOUR_WRITES_COOKIE = "primary_until"
+
+_pinned_to_primary: ContextVar[bool] = ContextVar("db_pinned_to_primary", default=False)
+
+
+class Replica:
+    def __init__(self, name: str, engine: AsyncEngine) -> None:
+        self.name = name
+        self.engine = engine
+        self.in_rotation = True
+        self.lag_seconds: float | None = None
+        self.last_error: str | None = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "in_rotation": self.in_rotation,
+            "lag_seconds": self.lag_seconds,
+            "last_error": self.last_error,
+            "pool": self.engine.pool.stats(),
+        }
+
+
+class ReplicaSet:
+    """Streaming replicas that serve read-only sessions.
+
+    Replicas are picked round-robin or by the fewest checked-out connections (least busy).
+    A background task measures the replay lag of every replica and takes replicas that lag
+    more than ``max_lag_seconds`` or cannot be reached out of rotation until they catch up.
+    When no replica is in rotation, reads go to the primary.
+    """
+
+    SELECTIONS = ("round_robin", "least_busy")
+
+    def __init__(
+        self,
+        replicas: list[Replica],
+        selection: str,
+        max_lag_seconds: float,
+        check_interval_seconds: float,
+    ) -> None:
+        if selection not in self.SELECTIONS:
+            raise ValueError(f"Unknown replica selection: {selection}")
+        self.replicas = replicas
+        self.selection = selection
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval_seconds = check_interval_seconds
+        self._round_robin = itertools.count()
+        self._task: asyncio.Task | None = None
+        self.primary_reads = 0
+
+    def choose(self) -> AsyncEngine | None:
+        """Returns the engine of the replica to read from, None to read from the primary."""
+        candidates = [replica for replica in self.replicas if replica.in_rotation]
+        if not candidates:
+            self.primary_reads += 1
+            return None
+        if self.selection == "least_busy":
+            return min(candidates, key=lambda replica: replica.engine.pool.checkedout()).engine
+        return candidates[next(self._round_robin) % len(candidates)].engine
+
+    async def check_lag(self) -> None:
+        await asyncio.gather(*(self._check_replica(replica) for replica in self.replicas))
+
+    async def start(self) -> None:
+        if self._task is not None or not self.replicas:
+            return
+        await self.check_lag()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "selection": self.selection,
+            "primary_reads": self.primary_reads,
+            "replicas": {replica.name: replica.stats() for replica in self.replicas},
+        }
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval_seconds)
+            await self.check_lag()
+
+    async def _check_replica(self, replica: Replica) -> None:
+        try:
+            async with asyncio.timeout(self.check_interval_seconds):
+                async with replica.engine.connect() as connection:
+                    lag = float((await connection.execute(REPLICA_LAG_QUERY)).scalar_one())
+        except Exception as e:
+            replica.lag_seconds = None
+            replica.last_error = repr(e)
+            self._set_in_rotation(replica, False)
+            return
+
+        replica.lag_seconds = lag
+        replica.last_error = None
+        self._set_in_rotation(replica, lag <= self.max_lag_seconds)
+
+    @staticmethod
+    def _set_in_rotation(replica: Replica, in_rotation: bool) -> None:
+        if replica.in_rotation != in_rotation:
+            logging.warning(
+                f"Replica {replica.name} {'back in' if in_rotation else 'taken out of'} rotation, "
+                f"lag: {replica.lag_seconds}, error: {replica.last_error}"
+            )
+        replica.in_rotation = in_rotation
+
+
+class ReplicaRoutingSession(Session):
+    """Session that reads from a replica when its sessionmaker has a ReplicaSet in ``info``.
+
+    The replica is chosen on the first query and kept for the whole session. While the context
+    is pinned to the primary, see ``pin_to_primary``, queries go to the primary.
+    """
+
+    def get_bind(self, mapper: Any = None, *, clause: Any = None, **kw: Any) -> Engine:
+        replica_set: ReplicaSet | None = self.info.get("replica_set")
+        if replica_set is None or _pinned_to_primary.get():
+            return super().get_bind(mapper, clause=clause, **kw)
+        if "replica_engine" not in self.info:
+            replica_engine = replica_set.choose()
+            self.info["replica_engine"] = replica_engine.sync_engine if replica_engine else None
+        return self.info["replica_engine"] or super().get_bind(mapper, clause=clause, **kw)
+
+
+@contextmanager
+def pin_to_primary(pinned: bool = True) -> Iterator[None]:
+    """Makes the queries made in this context read from the primary.
+
+    Used for a window after a client wrote, so that it reads its own writes even if the
+    replicas have not replayed them yet.
+    """
+    token = _pinned_to_primary.set(pinned)
+    try:
+        yield
+    finally:
+        _pinned_to_primary.reset(token)
+
+
+def is_pinned_to_primary() -> bool:
+    """Checks whether the queries of this context read from the primary, see pin_to_primary."""
+    return _pinned_to_primary.get()
+
+
+def is_read_your_writes_window(cookie: str | None) -> bool:
+    """Checks whether the read-your-writes cookie of a client is still valid."""
+    try:
+        return cookie is not None and float(cookie) > time.time()
+    except ValueError:
+        return False
+
+
+__all__ = [
+    "READ_YOUR_WRITES_COOKIE",
+    "Replica",
+    "ReplicaSet",
+    "ReplicaRoutingSession",
+    "is_pinned_to_primary",
+    "is_read_your_writes_window",
+    "pin_to_primary",
+]
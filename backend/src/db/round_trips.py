@@ -0,0 +1,124 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+from sqlalchemy import Engine, event
+
+from src.service_layer.metrics import metrics_registry
+
+
+class RoundTripCounter:
+    """Number of database round-trips made on behalf of one request."""
+
+    def __init__(self) -> None:
+        self.count = 0
+
+
+class RoundTripStats:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.round_trips = 0
+        self.max_round_trips = 0
+
+    def record(self, counter: RoundTripCounter) -> None:
+        self.requests += 1
+        self.round_trips += counter.count
+        self.max_round_trips = max(self.max_round_trips, counter.count)
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "requests": self.requests,
+            "round_trips": self.round_trips,
+            "max_round_trips_per_request": self.max_round_trips,
+            "avg_round_trips_per_request": (
+                round(self.round_trips / self.requests, 3) if self.requests else 0
+            ),
+        }
+
+
+_current_counter: ContextVar[RoundTripCounter | None] = ContextVar(
+    "db_round_trip_counter", default=None
+)
+round_trip_stats = RoundTripStats()
+
+
+@contextmanager
+def track_round_trips() -> Iterator[RoundTripCounter]:
+    """Counts the round-trips of the database calls made in this context, e.g. one request.
+
+    Tasks started inside the context share the counter, since they copy the context.
+
+    Yields:
+        RoundTripCounter: The counter, complete once the context exits.
+    """
+    with count_round_trips() as counter:
+        try:
+            yield counter
+        finally:
+            round_trip_stats.record(counter)
+
+
+@contextmanager
+def count_round_trips() -> Iterator[RoundTripCounter]:
+    """Counts the round-trips made in this context apart from the request, see add_round_trips.
+
+    Yields:
+        RoundTripCounter: The counter, complete once the context exits.
+    """
+    counter = RoundTripCounter()
+    token = _current_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _current_counter.reset(token)
+
+
+def add_round_trips(count: int) -> None:
+    """Counts round-trips made for the current request by work shared with other requests.
+
+    Args:
+        count (int): The round-trips of the shared work, e.g. one batched query.
+    """
+    counter = _current_counter.get()
+    if counter is not None:
+        counter.count += count
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Counts statements and transaction control commands of the engine as round-trips.
+
+    ``BEGIN``, ``COMMIT`` and ``ROLLBACK`` are not sent on autocommit connections, so they are
+    only counted for transactional ones.
+
+    Args:
+        engine: The sync engine, ``AsyncEngine.sync_engine`` for async engines.
+    """
+    event.listen(engine, "before_cursor_execute", _count_statement)
+    for name in ("begin", "commit", "rollback"):
+        event.listen(engine, name, _count_transaction_command)
+
+
+def _count_statement(*args: Any) -> None:
+    counter = _current_counter.get()
+    if counter is not None:
+        counter.count += 1
+
+
+def _count_transaction_command(connection: Any) -> None:
+    counter = _current_counter.get()
+    if counter is None:
+        return
+    if connection.get_execution_options().get("isolation_level") != "AUTOCOMMIT":
+        counter.count += 1
+
+
+metrics_registry.register("db_round_trips", round_trip_stats.stats)
+
+__all__ = [
+    "RoundTripCounter",
+    "add_round_trips",
+    "count_round_trips",
+    "instrument_engine",
+    "round_trip_stats",
+    "track_round_trips",
+]
@@ -1,33 +1,63 @@
 import asyncio
-from typing import AsyncGenerator
+import logging
+from typing import Any, AsyncGenerator
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-from sqlalchemy.future import select
+from sqlalchemy import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 
-from alembic import command
-from alembic.config import Config
-from config import DATABASE_URL
-from src.controllers.ws import ws_manager
+from config import DATABASE_REPLICA_URLS, DATABASE_URL, DatabaseConfig, db_conf
+from src.db.pool import PoolMetrics, instrumented_pool_class
+from src.db.replicas import Replica, ReplicaRoutingSession, ReplicaSet
+from src.db.round_trips import instrument_engine
+from src.service_layer.metrics import metrics_registry
 
 
 class Database:
-    __RETRY_COUNT = 30
-    __RETRY_DELAY_IN_SECONDS = 20
-
-    def __init__(self, database_url: str):
-        self.engine = create_async_engine(database_url, future=True, echo=False)
+    def __init__(
+        self,
+        database_url: str,
+        config: DatabaseConfig = db_conf,
+        replica_urls: list[str] | None = None,
+    ):
+        self.config = config
+        self.pool_metrics = PoolMetrics()
+        self.engine = self.__create_engine(database_url, config, self.pool_metrics)
         self.async_session = async_sessionmaker(self.engine, expire_on_commit=False)
-        self.__run_migrations("alembic", database_url)
+        # Reads run in BEGIN READ ONLY transactions, or without BEGIN/COMMIT at all in
+        # autocommit mode, which saves two round-trips but rules out server-side cursors.
+        read_only_options = (
+            {"isolation_level": "AUTOCOMMIT"}
+            if config.READ_ONLY_AUTOCOMMIT
+            else {"postgresql_readonly": True}
+        )
+        self.replica_set = ReplicaSet(
+            replicas=[
+                Replica(
+                    name=make_url(url).render_as_string(hide_password=True),
+                    engine=self.__create_engine(url, config, PoolMetrics()).execution_options(
+                        **read_only_options
+                    ),
+                )
+                for url in replica_urls or []
+            ],
+            selection=config.REPLICA_SELECTION,
+            max_lag_seconds=config.REPLICA_MAX_LAG_SECONDS,
+            check_interval_seconds=config.REPLICA_LAG_CHECK_INTERVAL_SECONDS,
+        )
+        self.read_only_session = async_sessionmaker(
+            self.engine.execution_options(**read_only_options),
+            expire_on_commit=False,
+            sync_session_class=ReplicaRoutingSession,
+            info={"replica_set": self.replica_set} if self.replica_set.replicas else None,
+        )
 
     async def get_db(self) -> AsyncGenerator[AsyncSession, None]:
         """Dependency for getting async session."""
-        for attempt in range(self.__RETRY_COUNT):
-            if await self.__check_db_connection():
-                break
-            await asyncio.sleep(self.__RETRY_DELAY_IN_SECONDS)
-        else:
-            raise RuntimeError("Failed to connect to the database after several attempts")
-
         async with self.async_session() as session:
             try:
                 yield session
@@ -38,24 +68,79 @@ class Database:
             finally:
                 await session.close()
 
+    def pool_stats(self) -> dict[str, Any]:
+        return self.engine.pool.stats()
+
+    @property
+    def engines(self) -> list[AsyncEngine]:
+        return [self.engine, *(replica.engine for replica in self.replica_set.replicas)]
+
+    async def prewarm(self) -> None:
+        """Opens pool connections ahead of the first requests, so that a new worker does not
+        pay for connecting on its first requests.
+
+        Connects ``POOL_PREWARM_SIZE`` (by default ``POOL_SIZE``) connections of every engine
+        concurrently and returns them to the pool. Failures are logged, not raised, the
+        database may come up later.
+        """
+        size = self.config.POOL_PREWARM_SIZE
+        size = min(self.config.POOL_SIZE if size is None else size, self.config.POOL_SIZE)
+        if size <= 0:
+            return
+        connections = await asyncio.gather(
+            *(engine.connect().start() for engine in self.engines for _ in range(size)),
+            return_exceptions=True,
+        )
+        errors = [connection for connection in connections if isinstance(connection, BaseException)]
+        await asyncio.gather(
+            *(
+                connection.close()
+                for connection in connections
+                if not isinstance(connection, BaseException)
+            )
+        )
+        if errors:
+            logging.warning(f"Failed to pre-warm {len(errors)} database connections: {errors[0]!r}")
+
+    async def dispose(self) -> None:
+        """Closes the pooled connections of all engines, on shutdown."""
+        await asyncio.gather(*(engine.dispose() for engine in self.engines))
+
+    def reset_after_fork(self) -> None:
+        """Drops the pools inherited from the parent process without closing their connections,
+        which still belong to the parent. Call in a forked worker before using the database.
+        """
+        for engine in self.engines:
+            engine.sync_engine.dispose(close=False)
+
     @staticmethod
-    def __run_migrations(script_location: str, dsn: str) -> None:
-        alembic_cfg = Config()
-        alembic_cfg.set_main_option("script_location", script_location)
-        alembic_cfg.set_main_option("sqlalchemy.url", dsn)
-        command.upgrade(alembic_cfg, "head")
-
-    async def __check_db_connection(self) -> bool:
-        try:
-            async with self.async_session() as session:
-                result = await session.execute(select(1))
-                return result.scalar() == 1
-        except Exception as e:
-            await ws_manager.broadcast(f"Database connection failed: {e}")
-            return False
-
-
-db_connections = Database(DATABASE_URL)
+    def __create_engine(
+        database_url: str, config: DatabaseConfig, pool_metrics: PoolMetrics
+    ) -> AsyncEngine:
+        engine = create_async_engine(
+            database_url,
+            future=True,
+            echo=False,
+            poolclass=instrumented_pool_class(pool_metrics),
+            pool_size=config.POOL_SIZE,
+            max_overflow=config.POOL_MAX_OVERFLOW,
+            pool_timeout=config.POOL_TIMEOUT_SECONDS,
+            pool_recycle=config.POOL_RECYCLE_SECONDS,
+            pool_pre_ping=config.POOL_PRE_PING,
+            connect_args={
+                "server_settings": {
+                    "application_name": config.APPLICATION_NAME,
+                    "statement_timeout": str(config.STATEMENT_TIMEOUT_MS),
+                }
+            },
+        )
+        instrument_engine(engine.sync_engine)
+        return engine
+
+
+db_connections = Database(DATABASE_URL, replica_urls=DATABASE_REPLICA_URLS)
+metrics_registry.register("db_pool", db_connections.pool_stats)
+metrics_registry.register("db_replicas", db_connections.replica_set.stats)
 
 
 __all__ = ["db_connections"]
@@ -1,9 +1,9 @@
 from abc import ABC, abstractmethod
-from typing import Any, TypeVar
+from typing import Any, AsyncIterator, TypeVar
 from uuid import UUID
 
-from pydantic import BaseModel
-from sqlalchemy import and_, delete, exists, insert, select, update
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import ARRAY, Select, and_, any_, bindparam, delete, exists, insert, select, update
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -12,6 +12,17 @@ from src.db.exceptions.exceptions import DBNotFoundError
 BaseModeGeneric = TypeVar("BaseModeGeneric", bound=BaseModel)
 
 
+_list_adapters: dict[type[BaseModel], TypeAdapter] = {}
+
+
+def _list_adapter(schema: type[BaseModeGeneric]) -> "TypeAdapter[list[BaseModeGeneric]]":
+    """Returns the adapter validating a list of the schema, cached as building one is slow."""
+    adapter = _list_adapters.get(schema)
+    if adapter is None:
+        adapter = _list_adapters[schema] = TypeAdapter(list[schema])  # type: ignore[valid-type]
+    return adapter
+
+
 class AbstractRepository(ABC):
     @abstractmethod
     async def add_one(self, **kwargs: Any) -> int | UUID:
@@ -41,6 +52,7 @@ class AbstractRepository(ABC):
 
 class SQLAlchemyRepository(AbstractRepository):
     model: Any
+    projection_aliases: dict[str, str] = {}
 
     def __init__(self, session: AsyncSession) -> None:
         """Initialize the repository with a database session.
@@ -131,6 +143,142 @@ class SQLAlchemyRepository(AbstractRepository):
             raise DBNotFoundError(self.model.__tablename__, filter_by.get("id", "Some Id"))
         return res
 
+    async def find_all_as(
+        self, schema: type[BaseModeGeneric], **filter_by: Any
+    ) -> list[BaseModeGeneric]:
+        """Find all records based on specific conditions, selecting only the schema's columns.
+
+        Unlike find_all_with_conditional, no ORM instances are created: the selected rows are
+        validated into the schema in a single pass.
+
+        Args:
+            schema: The pydantic class to read the records as.
+            filter_by: Arbitrary keyword arguments to filter the records by.
+
+        Returns:
+            A list of records that match the conditions, represented as instances of schema.
+        """
+        res = await self.session.execute(self._projection(schema).filter_by(**filter_by))
+        return _list_adapter(schema).validate_python(res.mappings().all())
+
+    async def find_one_as(self, schema: type[BaseModeGeneric], **filter_by: Any) -> BaseModeGeneric:
+        """Find a single record based on specific conditions, selecting only the schema's columns.
+
+        Args:
+            schema: The pydantic class to read the record as.
+            filter_by: Arbitrary keyword arguments to filter the record by.
+
+        Returns:
+            The record that matches the conditions, represented as an instance of schema.
+
+        Raises:
+            DBNotFoundError: If no record matching the conditions is found.
+        """
+        res = await self.session.execute(self._projection(schema).filter_by(**filter_by))
+        try:
+            row = res.mappings().one()
+        except NoResultFound:
+            raise DBNotFoundError(self.model.__tablename__, filter_by.get("id", "Some Id"))
+        return schema.model_validate(row)
+
+    async def find_many_as(
+        self, schema: type[BaseModeGeneric], field_name: str, values: list[Any]
+    ) -> list[BaseModeGeneric]:
+        """Find the records whose field has one of the values, selecting only the schema's columns.
+
+        The values are sent as a single array parameter, ``WHERE <column> = ANY(:values)``, so
+        the statement is the same whatever the number of values.
+
+        Args:
+            schema: The pydantic class to read the records as.
+            field_name: The schema field to filter by.
+            values: The values to look up.
+
+        Returns:
+            A list of matching records ordered by ID, represented as instances of schema.
+        """
+        column = self.model.__table__.columns[self.projection_aliases.get(field_name, field_name)]
+        values_param = bindparam("values", values, type_=ARRAY(column.type))
+        stmt = self._projection(schema).where(column == any_(values_param)).order_by(self.model.id)
+        res = await self.session.execute(stmt)
+        return _list_adapter(schema).validate_python(res.mappings().all())
+
+    async def find_page_as(
+        self,
+        schema: type[BaseModeGeneric],
+        limit: int,
+        after: int | None = None,
+        **filter_by: Any,
+    ) -> list[BaseModeGeneric]:
+        """Find a page of records ordered by ID, selecting only the schema's columns.
+
+        Args:
+            schema: The pydantic class to read the records as.
+            limit: The maximum number of records in the page.
+            after: The ID of the last record of the previous page, None for the first page.
+            filter_by: Arbitrary keyword arguments to filter the records by.
+
+        Returns:
+            A list of records with IDs greater than ``after``, represented as instances of schema.
+        """
+        stmt = self._projection(schema).filter_by(**filter_by).order_by(self.model.id).limit(limit)
+        if after is not None:
+            stmt = stmt.where(self.model.id > after)
+        res = await self.session.execute(stmt)
+        return _list_adapter(schema).validate_python(res.mappings().all())
+
+    async def stream_all_as(
+        self, schema: type[BaseModeGeneric], batch_size: int = 1000, **filter_by: Any
+    ) -> AsyncIterator[BaseModeGeneric]:
+        """Stream all records ordered by ID, selecting only the schema's columns.
+
+        Rows are fetched through a server-side cursor and validated ``batch_size`` at a time.
+
+        Args:
+            schema: The pydantic class to read the records as.
+            batch_size: The number of rows fetched per round-trip.
+            filter_by: Arbitrary keyword arguments to filter the records by.
+
+        Yields:
+            The records represented as instances of schema.
+        """
+        stmt = (
+            self._projection(schema)
+            .filter_by(**filter_by)
+            .order_by(self.model.id)
+            .execution_options(yield_per=batch_size)
+        )
+        adapter = _list_adapter(schema)
+        result = await self.session.stream(stmt)
+        async for partition in result.mappings().partitions():
+            for item in adapter.validate_python(partition):
+                yield item
+
+    def _projection(self, schema: type[BaseModel]) -> Select:
+        """Builds a select of the model columns backing the schema fields.
+
+        A field is read from the model column of the same name, unless projection_aliases maps
+        it to another column.
+
+        Args:
+            schema: The pydantic class to select the columns for.
+
+        Returns:
+            The select statement with one column per schema field, labeled with the field name.
+
+        Raises:
+            ValueError: If a field has no backing column in the model.
+        """
+        columns = []
+        for field_name in schema.model_fields:
+            column_name = self.projection_aliases.get(field_name, field_name)
+            if column_name not in self.model.__table__.columns:
+                raise ValueError(
+                    f"{schema.__name__}.{field_name} has no column in {self.model.__tablename__}"
+                )
+            columns.append(getattr(self.model, column_name).label(field_name))
+        return select(*columns)
+
     async def exist(self, **filter_by: Any) -> bool:
         """Check if any record exists in the database based on specific conditions.
 
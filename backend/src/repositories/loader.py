@@ -0,0 +1,205 @@
+import asyncio
+import weakref
+from typing import Any, Awaitable, Callable, Generic, Hashable, TypeVar
+
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.db.replicas import is_pinned_to_primary
+from src.db.round_trips import add_round_trips, count_round_trips
+from src.repositories.base_repository import SQLAlchemyRepository
+
+KeyGeneric = TypeVar("KeyGeneric", bound=Hashable)
+ValueGeneric = TypeVar("ValueGeneric")
+
+
+class _Batch:
+    def __init__(self, owner: Any) -> None:
+        self.owner = owner
+        self.keys: list[Any] = []
+        self.task: asyncio.Task | None = None
+
+
+class _LoopState:
+    def __init__(self) -> None:
+        # (partition, key) -> the future of the pending load.
+        self.futures: dict[tuple[Hashable, Any], asyncio.Future] = {}
+        self.batches: dict[Hashable, _Batch] = {}
+        self.tasks: set[asyncio.Task] = set()
+
+
+class BatchLoader(Generic[KeyGeneric, ValueGeneric]):
+    """Coalesces concurrent lookups by key into batched calls.
+
+    Keys requested during the same event loop tick are collected and passed to ``batch_fn`` in
+    a single call once the tick is over. A key that is already queued or being loaded is not
+    requested again: its callers share the pending result (single-flight). Nothing is cached
+    after a batch completes, so every tick reads fresh data.
+
+    Callers are only batched with callers of the same ``partition``, e.g. only requests pinned
+    to the primary database with each other. A batch runs in the context of its first caller,
+    the owner, and gets the ``owner`` value the owner passed to ``load``, e.g. its database
+    session. The owner waits until the whole batch is done, so the value outlives the batch.
+    Batches larger than ``max_batch_size`` are loaded in chunks one after another, since
+    resources such as a session cannot be used concurrently. The database round-trips of a
+    chunk are counted for every request waiting for it rather than for the owner only.
+
+    The state is kept per event loop, so one loader can be shared by the whole process.
+
+    Args:
+        batch_fn: Loads the values for a list of unique keys with the owner value and returns
+            them by key. Keys missing from the result resolve to None.
+        max_batch_size: The maximum number of keys passed to one ``batch_fn`` call.
+        partition: Returns the partition of the calling context, all callers share one if None.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[list[KeyGeneric], Any], Awaitable[dict[KeyGeneric, ValueGeneric]]],
+        max_batch_size: int = 1000,
+        partition: Callable[[], Hashable] | None = None,
+    ) -> None:
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.partition = partition
+        self._states: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState] = (
+            weakref.WeakKeyDictionary()
+        )
+        self.loads = 0
+        self.batches = 0
+
+    async def load(self, key: KeyGeneric, owner: Any = None) -> ValueGeneric | None:
+        """Loads the value for a key, batched with the other keys of the current tick.
+
+        Args:
+            key: The key to load.
+            owner: Passed to ``batch_fn`` if this call starts a batch, e.g. the session of the
+                caller. It must stay usable until the call returns.
+
+        Returns:
+            The loaded value, None if ``batch_fn`` did not return one for the key.
+
+        Raises:
+            Exception: Whatever ``batch_fn`` raised for the batch of the key.
+        """
+        loop = asyncio.get_running_loop()
+        state = self._states.get(loop)
+        if state is None:
+            state = self._states[loop] = _LoopState()
+
+        self.loads += 1
+        partition = self.partition() if self.partition is not None else None
+        owned_batch = None
+        future = state.futures.get((partition, key))
+        if future is None:
+            future = state.futures[(partition, key)] = loop.create_future()
+            batch = state.batches.get(partition)
+            if batch is None:
+                # Started from the context of this caller, it runs once the tick is over.
+                batch = owned_batch = state.batches[partition] = _Batch(owner)
+                batch.task = asyncio.create_task(self._load_batch(state, partition, batch))
+                state.tasks.add(batch.task)
+                batch.task.add_done_callback(state.tasks.discard)
+            batch.keys.append(key)
+
+        if owned_batch is not None:
+            assert owned_batch.task is not None
+            try:
+                # A cancelled owner must not cancel the load the other callers are waiting for.
+                await asyncio.shield(owned_batch.task)
+            except asyncio.CancelledError:
+                # The batch still uses the owner value, release it only once the batch is done.
+                await asyncio.wait({owned_batch.task})
+                raise
+        value, round_trips = await asyncio.shield(future)
+        add_round_trips(round_trips.count)
+        return value
+
+    async def _load_batch(self, state: _LoopState, partition: Hashable, batch: _Batch) -> None:
+        del state.batches[partition]
+        keys = batch.keys
+        try:
+            for start in range(0, len(keys), self.max_batch_size):
+                await self._load_chunk(
+                    state, partition, keys[start : start + self.max_batch_size], batch.owner
+                )
+        finally:
+            for key in keys:
+                future = state.futures.pop((partition, key), None)
+                if future is not None and not future.done():
+                    future.cancel()
+
+    async def _load_chunk(
+        self, state: _LoopState, partition: Hashable, keys: list[KeyGeneric], owner: Any
+    ) -> None:
+        self.batches += 1
+        futures = [state.futures[(partition, key)] for key in keys]
+        try:
+            with count_round_trips() as round_trips:
+                values = await self.batch_fn(keys, owner)
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+                    # Retrieve it here, callers that were cancelled will never do it.
+                    future.exception()
+        else:
+            for key, future in zip(keys, futures):
+                if not future.done():
+                    future.set_result((values.get(key), round_trips))
+
+    def stats(self) -> dict[str, int]:
+        return {"loads": self.loads, "batches": self.batches}
+
+
+_repository_loaders: weakref.WeakKeyDictionary[
+    async_sessionmaker, dict[tuple[type, type, str], BatchLoader]
+] = weakref.WeakKeyDictionary()
+
+
+def get_repository_loader(
+    session_factory: async_sessionmaker,
+    repository_cls: type[SQLAlchemyRepository],
+    schema: type[BaseModel],
+    field_name: str,
+) -> BatchLoader[Any, Any]:
+    """Returns the shared loader reading ``schema`` records by one of their fields.
+
+    Pass the session of the caller to ``load``: each batch runs
+    ``SQLAlchemyRepository.find_many_as`` in the session of its first caller, so the lookups of
+    many requests end up in one ``WHERE <column> = ANY(...)`` query and no request checks out
+    a connection just for the lookup. Requests pinned to the primary, see pin_to_primary, are
+    batched apart from the others, so that they still read their own writes. If several
+    records have the same key, the one with the lowest ID is returned.
+
+    Args:
+        session_factory: The session factory of the callers, sessions of different factories
+            may read from different databases.
+        repository_cls: The repository of the records.
+        schema: The pydantic class to read the records as.
+        field_name: The schema field to look the records up by.
+
+    Returns:
+        BatchLoader: The loader, one per session factory and lookup.
+    """
+    loaders = _repository_loaders.setdefault(session_factory, {})
+    loader = loaders.get((repository_cls, schema, field_name))
+    if loader is None:
+
+        async def batch_fn(keys: list[Any], session: AsyncSession) -> dict[Any, Any]:
+            records = await repository_cls(session).find_many_as(schema, field_name, keys)
+            values: dict[Any, Any] = {}
+            for record in records:
+                values.setdefault(getattr(record, field_name), record)
+            return values
+
+        loader = loaders[(repository_cls, schema, field_name)] = BatchLoader(
+            batch_fn, partition=is_pinned_to_primary
+        )
+    return loader
+
+
+__all__ = [
+    "BatchLoader",
+    "get_repository_loader",
+]
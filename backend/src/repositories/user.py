@@ -1,6 +1,182 @@
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import (
+    ARRAY,
+    Boolean,
+    Column,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    all_,
+    bindparam,
+    func,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.schema import CreateTable
+
+from src.db.exceptions.exceptions import DBNotFoundError
 from src.db.models.user import User
 from src.repositories.base_repository import SQLAlchemyRepository
 
 
 class UserRepository(SQLAlchemyRepository):
     model = User
+    projection_aliases = {"password": "hashed_password"}
+
+    IMPORT_COLUMNS = ("username", "fullname", "email", "hashed_password", "disabled", "roles")
+    import_staging_table = Table(
+        "user_accounts_import",
+        MetaData(),
+        Column("row_number", Integer),
+        Column("username", String(30)),
+        Column("fullname", String(30)),
+        Column("email", String(30)),
+        Column("hashed_password", String(128)),
+        Column("disabled", Boolean),
+        Column("roles", ARRAY(String)),
+        prefixes=["TEMPORARY"],
+        postgresql_on_commit="DROP",
+    )
+
+    async def copy_import(self, records: list[tuple[Any, ...]]) -> set[tuple[str, str]]:
+        """Loads users with COPY into a staging table and inserts them with a single statement.
+
+        Rows that conflict with existing users on ``uq_username_email`` or repeat a
+        username/email pair of the same batch are skipped instead of aborting the batch.
+        The staging table is dropped on commit.
+
+        Args:
+            records: Tuples of ``row_number`` followed by the IMPORT_COLUMNS values.
+
+        Returns:
+            The (username, email) pairs that were inserted.
+        """
+        staging = self.import_staging_table
+        await self.session.execute(CreateTable(staging))
+
+        connection = await self.session.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            staging.name, records=records, columns=["row_number", *self.IMPORT_COLUMNS]
+        )
+
+        columns = [staging.c[name] for name in self.IMPORT_COLUMNS]
+        first_rows = (
+            select(*columns)
+            .distinct(staging.c.username, staging.c.email)
+            .order_by(staging.c.username, staging.c.email, staging.c.row_number)
+        )
+        stmt = (
+            insert(self.model)
+            .from_select(list(self.IMPORT_COLUMNS), first_rows)
+            .on_conflict_do_nothing(constraint="uq_username_email")
+            .returning(self.model.username, self.model.email)
+        )
+        res = await self.session.execute(stmt)
+        return {(username, email) for username, email in res.all()}
+
+    async def add_roles(self, user_ids: list[int], roles: list[str]) -> dict[int, int]:
+        """Grants roles to users with a single ``UPDATE ... RETURNING``.
+
+        The missing roles are appended to the ``roles`` array by the database, so concurrent
+        role changes cannot overwrite each other. Users that already have all the roles are left
+        untouched, the others get their token version bumped in the same statement.
+
+        Args:
+            user_ids: The IDs of the users.
+            roles: The roles to grant.
+
+        Returns:
+            The new token versions of the changed users by user ID.
+        """
+        new_roles = bindparam("new_roles", list(dict.fromkeys(roles)), type_=ARRAY(String))
+        role = func.unnest(new_roles).column_valued("role")
+        missing_roles = select(func.array_agg(role)).where(role != all_(self.model.roles))
+        return await self._update_roles(
+            user_ids,
+            roles=func.array_cat(self.model.roles, missing_roles.scalar_subquery()),
+            changed=~self.model.roles.contains(new_roles),
+        )
+
+    async def remove_roles(self, user_ids: list[int], roles: list[str]) -> dict[int, int]:
+        """Revokes roles from users with a single ``UPDATE ... RETURNING``.
+
+        Args:
+            user_ids: The IDs of the users.
+            roles: The roles to revoke.
+
+        Returns:
+            The new token versions of the changed users by user ID.
+        """
+        removed_roles = bindparam("removed_roles", roles, type_=ARRAY(String))
+        role = func.unnest(self.model.roles).column_valued("role")
+        kept_roles = select(func.array_agg(role)).where(role != all_(removed_roles))
+        return await self._update_roles(
+            user_ids,
+            roles=func.coalesce(
+                kept_roles.scalar_subquery(), bindparam("no_roles", [], type_=ARRAY(String))
+            ),
+            changed=self.model.roles.overlap(removed_roles),
+        )
+
+    async def _update_roles(self, user_ids: list[int], roles: Any, changed: Any) -> dict[int, int]:
+        stmt = (
+            update(self.model)
+            .where(self.model.id.in_(user_ids), changed)
+            .values(
+                roles=roles,
+                token_version=self.model.token_version + 1,
+                token_revoked_at=func.now(),
+            )
+            .returning(self.model.id, self.model.token_version)
+        )
+        res = await self.session.execute(stmt)
+        return {user_id: token_version for user_id, token_version in res.all()}
+
+    async def bump_token_version(self, row_id: int) -> int:
+        """Increments the token version of the user, revoking all previously issued tokens.
+
+        Args:
+            row_id: The ID of the user.
+
+        Returns:
+            The new token version.
+
+        Raises:
+            DBNotFoundError: If no user with the given ID is found.
+        """
+        stmt = (
+            update(self.model)
+            .values(token_version=self.model.token_version + 1, token_revoked_at=func.now())
+            .filter_by(id=row_id)
+            .returning(self.model.token_version)
+        )
+        res = await self.session.execute(stmt)
+        token_version = res.scalar_one_or_none()
+        if token_version is None:
+            raise DBNotFoundError(self.model.__tablename__, row_id)
+        return token_version
+
+    async def find_token_versions(self, revoked_after: datetime) -> dict[int, tuple[int, datetime]]:
+        """Returns the token versions of the users whose tokens were revoked after the given time.
+
+        Tokens revoked earlier have expired anyway, so the result stays small even after bulk
+        changes of many users.
+
+        Args:
+            revoked_after: The time of the oldest revocation of interest.
+
+        Returns:
+            The token versions and revocation times by user ID.
+        """
+        stmt = select(self.model.id, self.model.token_version, self.model.token_revoked_at).where(
+            self.model.token_revoked_at > revoked_after
+        )
+        res = await self.session.execute(stmt)
+        return {
+            user_id: (token_version, revoked_at) for user_id, token_version, revoked_at in res.all()
+        }
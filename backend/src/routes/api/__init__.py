@@ -1,13 +1,17 @@
 from typing import Any
 
 from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse
 
 from src.controllers.ws import ws_manager
+from src.db.health import db_health_monitor
 
 from ...controllers.user.auth_controller import get_current_active_user_from_websocket
 from ...db.models.user import PortalRole
 from ...schemas import ShowUser
 from .auth import auth_router
+from .files import files_router
+from .internal import internal_router
 from .localization import localization_router
 from .user import user_router
 
@@ -30,10 +34,22 @@ def ping() -> str:
     return "pong"
 
 
+@api_router.get("/ready", responses={503: {"description": "The database is unavailable."}})
+def ready() -> JSONResponse:
+    """Reports whether the service can serve requests, from the cached database health state."""
+    database = db_health_monitor.snapshot()
+    return JSONResponse(
+        status_code=200 if database["available"] else 503,
+        content={"ready": database["available"], "database": database},
+    )
+
+
 routers = [
     auth_router,
     user_router,
+    files_router,
     localization_router,
+    internal_router,
 ]
 
 for router in routers:
@@ -48,13 +64,16 @@ async def websocket_endpoint(
         get_current_active_user_from_websocket(required_roles=PortalRole.all_roles())
     ),
 ) -> None:
-    await ws_manager.connect(current_user.id, websocket)
+    connection = await ws_manager.connect(
+        current_user.id, websocket, [role.value for role in current_user.roles]
+    )
     try:
         while True:
-            data = await websocket.receive_text()
-            await ws_manager.send_personal_message(f"WS Pong: {data}", websocket)
+            ws_manager.handle_message(connection, await websocket.receive_text())
     except WebSocketDisconnect:
-        ws_manager.disconnect(current_user.id)
+        pass
+    finally:
+        ws_manager.disconnect(connection)
 
 
 __all__ = [
@@ -3,13 +3,23 @@ from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException, Response
 from fastapi.security import OAuth2PasswordRequestForm
 
-from src.controllers.user.auth_controller import auth_controller, get_current_active_user
+from src.controllers.user.auth_controller import (
+    auth_controller,
+    get_current_active_user,
+    get_token,
+)
 from src.db.exceptions.exceptions import DBNotFoundError
 from src.db.models.user import PortalRole
 from src.routes.dependensies import UOWDep
+from src.routes.rate_limit import RateLimit, auth_ip_limiter, limit_login_by_username
 from src.schemas import ShowUser
+from src.service_layer.hashing_service import HashingQueueFullError
 
-auth_router = APIRouter(prefix="/auth", tags=["Authorization"])
+auth_router = APIRouter(
+    prefix="/auth",
+    tags=["Authorization"],
+    dependencies=[Depends(RateLimit(auth_ip_limiter, methods=("POST",)))],
+)
 auth_router.tags_metadata = [
     {
         "name": "Authorization",
@@ -18,7 +28,11 @@ auth_router.tags_metadata = [
 ]
 
 
-@auth_router.post("/token", description="User authorization and token receipt.")
+@auth_router.post(
+    "/token",
+    dependencies=[Depends(limit_login_by_username)],
+    description="User authorization and token receipt.",
+)
 async def login(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()], response: Response, uow: UOWDep
 ) -> dict[str, str] | None:
@@ -43,9 +57,32 @@ async def login(
         )
     except DBNotFoundError:
         raise HTTPException(status_code=400, detail="Incorrect username or password")
+    except HashingQueueFullError:
+        raise HTTPException(status_code=503, detail="Too many login attempts, try again later.")
     return user_token
 
 
+@auth_router.post("/refresh", description="Reissue a still valid token with a new expiry time.")
+async def refresh_token(
+    response: Response, uow: UOWDep, token: str = Depends(get_token)
+) -> dict[str, str]:
+    """Extends the session of an authenticated user without asking for the password again.
+
+    Args:
+        response (Response): The response object for setting cookies.
+        uow (UOWDep): Unit of Work dependency for handling database operations.
+        token (str): The current token, provided by dependency injection.
+
+    Returns:
+        dict[str, str]: The new user token.
+
+    Raises:
+        HTTPException: If the token is invalid, expired or revoked, the session is older than
+            JWT_MAX_SESSION_MINUTES or the user is disabled.
+    """
+    return await auth_controller.refresh(token=token, response=response, uow=uow)
+
+
 @auth_router.post(
     "/logout",
     dependencies=[Depends(get_current_active_user(required_roles=PortalRole.all_roles()))],
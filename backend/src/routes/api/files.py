@@ -0,0 +1,87 @@
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+
+from config import minio_config
+from src.controllers.user.auth_controller import get_current_active_user
+from src.db.models.user import PortalRole
+from src.schemas import ShowUser, UploadedFile
+from src.service_layer.s3.async_s3_client import UPLOADS_PREFIX, StorageError, async_minio_client
+
+files_router = APIRouter(
+    prefix="/files",
+    tags=["Files"],
+)
+files_router.tags_metadata = [
+    {
+        "name": "Files",
+        "description": "Operations with files in the object storage.",
+    }
+]
+
+
+@files_router.post(
+    "/",
+    status_code=201,
+    response_model=UploadedFile,
+    description="Upload a file sent as the raw request body, streamed to the object storage.",
+    responses={
+        413: {"description": "The file is too large."},
+        502: {"description": "The object storage failed."},
+        504: {"description": "The object storage did not answer in time."},
+    },
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/octet-stream": {"schema": {"type": "string"}}},
+        }
+    },
+)
+async def upload_file(
+    request: Request,
+    filename: str = Query(min_length=1, max_length=255, pattern=r"^[^/\\]+$"),
+    sha256: str | None = Query(
+        None,
+        pattern=r"^[0-9a-fA-F]{64}$",
+        description="The hex sha256 of the file, the upload is rejected if it differs.",
+    ),
+    # The upload may take long, do not hold a connection of the pool meanwhile.
+    current_user: ShowUser = Depends(
+        get_current_active_user(required_roles=PortalRole.all_roles(), release_connection=True)
+    ),
+) -> UploadedFile:
+    """Streams the request body to MinIO without holding the file in memory.
+
+    Args:
+        request (Request): The request, its body is the file.
+        filename (str): The name of the file.
+        sha256 (str | None): The expected hex sha256 of the file.
+        current_user (ShowUser): The uploading user.
+
+    Returns:
+        UploadedFile: The stored object with its size and sha256.
+    """
+    max_size = minio_config.MINIO_UPLOAD_MAX_BYTES
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit() and int(content_length) > max_size:
+        raise HTTPException(status_code=413, detail=f"The file is larger than {max_size} bytes")
+
+    try:
+        return await async_minio_client.put_stream(
+            object_name=f"{UPLOADS_PREFIX}{current_user.id}/{uuid.uuid4().hex}/{filename}",
+            chunks=request.stream(),
+            content_type=request.headers.get("content-type", "application/octet-stream"),
+            max_size=max_size,
+            expected_sha256=sha256,
+        )
+    except StorageError as e:
+        if e.status_code < 500:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        raise HTTPException(status_code=502, detail=f"Storage error: {e.detail}")
+    except TimeoutError:
+        raise HTTPException(status_code=504, detail="The storage did not answer in time.")
+
+
+__all__ = [
+    "files_router",
+]
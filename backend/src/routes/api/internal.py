@@ -0,0 +1,31 @@
+import secrets
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from config import app_config
+from src.service_layer.metrics import metrics_registry
+
+
+def verify_metrics_token(x_metrics_token: Annotated[str | None, Header()] = None) -> None:
+    """Allows access with the METRICS_TOKEN, hides the endpoints if no token is configured."""
+    expected = app_config.METRICS_TOKEN
+    if expected is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_metrics_token is None or not secrets.compare_digest(
+        x_metrics_token, expected.get_secret_value()
+    ):
+        raise HTTPException(status_code=403, detail="Forbidden.")
+
+
+internal_router = APIRouter(
+    prefix="/internal",
+    include_in_schema=False,
+    dependencies=[Depends(verify_metrics_token)],
+)
+
+
+@internal_router.get("/metrics")
+def get_metrics() -> dict[str, Any]:
+    """Returns the stats of the connection pool, caches, rate limiters and hashing pool."""
+    return metrics_registry.collect()
@@ -1,21 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException
+import io
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, UploadFile
+from fastapi.responses import StreamingResponse
 from sqlalchemy.exc import IntegrityError
 
 from src.controllers.user.auth_controller import get_current_active_user
 from src.controllers.user.user_repository import UserService
 from src.db.exceptions.exceptions import DBNotFoundError
 from src.db.models.user import PortalRole
-from src.routes.dependensies import UOWDep
+from src.routes.dependensies import StreamUOWDep, UOWDep
+from src.routes.rate_limit import WRITE_METHODS, RateLimit, users_write_ip_limiter
 from src.schemas.user_schemas import (
+    BulkPortalRoleRequest,
+    BulkUpdatedUsersResponse,
     PortalRoleList,
     ShowUser,
     UpdatedUserResponse,
     UpdateUserRequest,
     UserCreateRequest,
+    UserImportReport,
     UserPassword,
 )
+from src.service_layer.hashing_service import HashingQueueFullError
+from src.service_layer.user_import import IMPORT_FORMATS, detect_import_format, read_user_rows
 
-user_router = APIRouter(prefix="/users", tags=["Users"])
+user_router = APIRouter(
+    prefix="/users",
+    tags=["Users"],
+    dependencies=[Depends(RateLimit(users_write_ip_limiter, methods=WRITE_METHODS))],
+)
 user_router.tags_metadata = [
     {
         "name": "Users",
@@ -28,11 +41,45 @@ user_router.tags_metadata = [
     "/",
     response_model=list[ShowUser],
     dependencies=[Depends(get_current_active_user(required_roles=PortalRole.all_roles()))],
-    description="Get all users.",
+    description="Get all users or, when `limit` is given, one page of users ordered by id.",
+)
+async def get_all_users(
+    uow: UOWDep,
+    response: Response,
+    limit: int | None = Query(None, ge=1, le=1000),
+    after: int | None = Query(None, description="Id of the last user of the previous page."),
+) -> list[ShowUser]:
+    """Retrieves users, optionally paginated with a keyset cursor on the user id.
+
+    When the page is full, the cursor for the next page is returned in the X-Next-Cursor header.
+
+    Args:
+        uow (UOWDep): Unit of Work dependency for handling database operations.
+        response (Response): The response object for setting the cursor header.
+        limit (int | None): Page size. Without it all users are returned.
+        after (int | None): Id of the last user of the previous page.
+
+    Returns:
+        list[ShowUser]: The users.
+    """
+    if limit is None:
+        list_show_user: list[ShowUser] = await UserService.get_all_users(uow)
+        return list_show_user
+
+    page: list[ShowUser] = await UserService.get_users_page(uow, limit=limit, after=after)
+    if len(page) == limit:
+        response.headers["X-Next-Cursor"] = str(page[-1].id)
+    return page
+
+
+@user_router.get(
+    "/stream",
+    response_class=StreamingResponse,
+    dependencies=[Depends(get_current_active_user(required_roles=PortalRole.all_roles()))],
+    description="Stream all users as newline-delimited JSON.",
 )
-async def get_all_users(uow: UOWDep) -> list[ShowUser]:
-    list_show_user: list[ShowUser] = await UserService.get_all_users(uow)
-    return list_show_user
+async def stream_all_users(uow: StreamUOWDep) -> StreamingResponse:
+    return StreamingResponse(UserService.stream_users(uow), media_type="application/x-ndjson")
 
 
 @user_router.get(
@@ -58,6 +105,55 @@ async def create_user(body: UserCreateRequest, uow: UOWDep) -> int:
             )
         else:
             raise HTTPException(status_code=503, detail=f"Database error: {e}")
+    except HashingQueueFullError:
+        raise HTTPException(status_code=503, detail="Server is busy, try again later.")
+
+
+@user_router.post(
+    "/import",
+    response_model=UserImportReport,
+    dependencies=[Depends(get_current_active_user(required_roles=[PortalRole.USER_ADMIN]))],
+    description="Create users in bulk from a CSV or NDJSON file.",
+)
+async def import_users(
+    file: UploadFile,
+    uow: UOWDep,
+    file_format: str | None = Query(None, description=f"One of {', '.join(IMPORT_FORMATS)}."),
+) -> UserImportReport:
+    """Creates users in bulk from an uploaded file.
+
+    CSV files need a header with the columns username, email, password and optionally fullname,
+    disabled and roles (separated by ``;``). NDJSON files contain one such object per line.
+
+    Args:
+        file (UploadFile): The uploaded file.
+        uow (UOWDep): Unit of Work dependency for handling database operations.
+        file_format (str | None): The file format, detected from the file name if omitted.
+
+    Returns:
+        UserImportReport: The number of created users, the conflicts and the invalid rows.
+    """
+    file_format = file_format or detect_import_format(file.filename)
+    if file_format not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown file format, expected one of {', '.join(IMPORT_FORMATS)}.",
+        )
+
+    # The upload is spooled to a temporary file, its lines are decoded while the rows are read.
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        return await UserService.import_users(uow, read_user_rows(lines, file_format))
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=422,
+            detail="The file must be UTF-8 encoded, rows before the invalid bytes may be imported.",
+        )
+    except HashingQueueFullError:
+        raise HTTPException(status_code=503, detail="Server is busy, try again later.")
+    finally:
+        # Leaves the spooled file to the UploadFile, which closes it.
+        lines.detach()
 
 
 @user_router.delete(
@@ -107,6 +203,42 @@ async def update_user_by_id(
     return UpdatedUserResponse(updated_user_id=updated_user_id)
 
 
+@user_router.post(
+    "/roles",
+    response_model=BulkUpdatedUsersResponse,
+    dependencies=[Depends(get_current_active_user(required_roles=[PortalRole.USER_ADMIN]))],
+    description="Grant roles to many users at once, e.g. to enroll a class as students.",
+)
+async def add_portal_role_bulk(
+    body: BulkPortalRoleRequest, uow: UOWDep
+) -> BulkUpdatedUsersResponse:
+    try:
+        updated_user_ids = await UserService.add_portal_role_bulk(
+            uow=uow, user_ids=body.user_ids, portal_role=body
+        )
+    except IntegrityError as err:
+        raise HTTPException(status_code=503, detail=f"Database error: {err}")
+    return BulkUpdatedUsersResponse(updated_user_ids=updated_user_ids)
+
+
+@user_router.delete(
+    "/roles",
+    response_model=BulkUpdatedUsersResponse,
+    dependencies=[Depends(get_current_active_user(required_roles=[PortalRole.USER_ADMIN]))],
+    description="Revoke roles from many users at once.",
+)
+async def remove_portal_role_bulk(
+    body: BulkPortalRoleRequest, uow: UOWDep
+) -> BulkUpdatedUsersResponse:
+    try:
+        updated_user_ids = await UserService.remove_portal_role_bulk(
+            uow=uow, user_ids=body.user_ids, portal_role=body
+        )
+    except IntegrityError as err:
+        raise HTTPException(status_code=503, detail=f"Database error: {err}")
+    return BulkUpdatedUsersResponse(updated_user_ids=updated_user_ids)
+
+
 @user_router.post(
     "/{user_id}/roles",
     dependencies=[Depends(get_current_active_user(required_roles=[PortalRole.USER_ADMIN]))],
@@ -172,3 +304,5 @@ async def change_password(
         )
     except IntegrityError as err:
         raise HTTPException(status_code=503, detail=f"Database error: {err}")
+    except HashingQueueFullError:
+        raise HTTPException(status_code=503, detail="Server is busy, try again later.")
@@ -1,13 +1,71 @@
-from typing import Annotated
+import math
+from typing import Annotated, AsyncIterator
 
-from fastapi import Depends
+from fastapi import Depends, HTTPException, status
+from starlette.requests import HTTPConnection
 
+from src.db.health import db_health_monitor
 from src.db.session import db_connections
 from src.service_layer.unit_of_work import IUnitOfWork, UnitOfWork
 
+READ_ONLY_METHODS = ("GET", "HEAD", "OPTIONS")
 
-def get_uow() -> IUnitOfWork:
-    return UnitOfWork(db_connections.async_session)
+
+def _check_database_available() -> None:
+    if not db_health_monitor.is_available:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database is unavailable, try again later.",
+            headers={"Retry-After": str(math.ceil(db_health_monitor.retry_seconds))},
+        )
+
+
+def create_uow(read_only: bool = False) -> IUnitOfWork:
+    """Creates a unit of work outside of a request, e.g. for background tasks.
+
+    Args:
+        read_only (bool): Whether the unit of work refuses to commit. It still runs in read-write
+            transactions, so it can be used for server-side cursors.
+
+    Returns:
+        IUnitOfWork: The unit of work.
+    """
+    return UnitOfWork(db_connections.async_session, read_only=read_only)
+
+
+async def get_uow(connection: HTTPConnection) -> AsyncIterator[IUnitOfWork]:
+    """Provides the unit of work of the request.
+
+    FastAPI resolves the dependency once per request, so the auth dependencies and the handler
+    share one unit of work and its session. Every ``async with uow`` block inside the request
+    is a transaction of its own: the connection is only held within the block and anything
+    not committed is rolled back when the block exits. The session is closed at the end of
+    the request. Requests with safe methods and websockets get a read-only unit of work.
+
+    Args:
+        connection (HTTPConnection): The request or websocket.
+
+    Yields:
+        IUnitOfWork: The unit of work of the request.
+    """
+    _check_database_available()
+    if connection.scope["type"] == "websocket" or connection.scope["method"] in READ_ONLY_METHODS:
+        uow = UnitOfWork(db_connections.read_only_session, read_only=True)
+    else:
+        uow = UnitOfWork(db_connections.async_session)
+    async with uow:
+        yield uow
+
+
+def get_stream_uow() -> IUnitOfWork:
+    """Provides a unit of work for responses that keep reading after the request scope ends.
+
+    Streaming responses outlive the request-scoped unit of work, and server-side cursors need
+    a transaction, which read-only autocommit sessions do not have.
+    """
+    _check_database_available()
+    return create_uow(read_only=True)
 
 
 UOWDep = Annotated[IUnitOfWork, Depends(get_uow)]
+StreamUOWDep = Annotated[IUnitOfWork, Depends(get_stream_uow)]
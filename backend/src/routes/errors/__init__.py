@@ -31,6 +31,7 @@ async def base_http_exception_handler(
                         "details": exc.detail,
                     },
                     status_code=exc.status_code,
+                    headers=exc.headers,
                 )
 
     return JSONResponse(status_code=500, content=exc)
@@ -0,0 +1,82 @@
+import time
+from http.cookies import SimpleCookie
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import app_config, db_conf
+from src.db.replicas import READ_YOUR_WRITES_COOKIE, is_read_your_writes_window, pin_to_primary
+from src.db.round_trips import track_round_trips
+from src.db.session import db_connections
+from src.routes.dependensies import READ_ONLY_METHODS
+
+
+class RoundTripsMiddleware:
+    """Counts the database round-trips of every request, outside production also in a header.
+
+    A plain ASGI middleware: the endpoint runs in the task of the request, so the counter in
+    the context is visible to it and the response body is not piped through another task.
+    """
+
+    HEADER = "X-DB-Round-Trips"
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_round_trips() as round_trips:
+
+            async def send_with_round_trips(message: Message) -> None:
+                if message["type"] == "http.response.start" and not app_config.PRODUCTION:
+                    MutableHeaders(scope=message)[self.HEADER] = str(round_trips.count)
+                await send(message)
+
+            await self.app(scope, receive, send_with_round_trips)
+
+
+class ReadYourWritesMiddleware:
+    """Reads from the primary for a while after the client wrote, replicas may lag behind.
+
+    Successful writes set a cookie with the end of the window, requests within the window
+    are pinned to the primary.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not db_connections.replica_set.replicas:
+            await self.app(scope, receive, send)
+            return
+
+        cookies = HTTPConnection(scope).cookies
+        is_write = scope["method"] not in READ_ONLY_METHODS
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and is_write and message["status"] < 400:
+                MutableHeaders(scope=message).append("set-cookie", self._window_cookie())
+            await send(message)
+
+        with pin_to_primary(is_read_your_writes_window(cookies.get(READ_YOUR_WRITES_COOKIE))):
+            await self.app(scope, receive, send_with_cookie)
+
+    @staticmethod
+    def _window_cookie() -> str:
+        cookie: SimpleCookie = SimpleCookie()
+        cookie[READ_YOUR_WRITES_COOKIE] = str(time.time() + db_conf.READ_YOUR_WRITES_SECONDS)
+        cookie[READ_YOUR_WRITES_COOKIE]["max-age"] = int(db_conf.READ_YOUR_WRITES_SECONDS) + 1
+        cookie[READ_YOUR_WRITES_COOKIE]["path"] = "/"
+        cookie[READ_YOUR_WRITES_COOKIE]["httponly"] = True
+        cookie[READ_YOUR_WRITES_COOKIE]["samesite"] = "lax"
+        return cookie.output(header="").strip()
+
+
+__all__ = [
+    "RoundTripsMiddleware",
+    "ReadYourWritesMiddleware",
+]
@@ -0,0 +1,152 @@
+import ipaddress
+import math
+from typing import Annotated, Sequence
+
+from fastapi import Form, HTTPException, Request, status
+
+from config import rate_limit_config
+from src.service_layer.metrics import metrics_registry
+from src.service_layer.rate_limiter import RateLimiter
+
+
+def _raise_too_many_requests(retry_after: float) -> None:
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many requests, try again later.",
+        headers={"Retry-After": str(math.ceil(retry_after))},
+    )
+
+
+IPNetwork = ipaddress.IPv4Network | ipaddress.IPv6Network
+
+
+def parse_trusted_proxies(value: str) -> list[IPNetwork]:
+    """Parses a comma-separated list of proxy addresses or networks.
+
+    Args:
+        value (str): E.g. ``"10.0.0.0/8, 127.0.0.1"``.
+
+    Returns:
+        list[IPNetwork]: The networks, a single address is a network of one.
+    """
+    return [
+        ipaddress.ip_network(item.strip(), strict=False)
+        for item in value.split(",")
+        if item.strip()
+    ]
+
+
+def _is_trusted(host: str, trusted_proxies: Sequence[IPNetwork]) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in trusted_proxies)
+
+
+def get_client_ip(request: Request, trusted_proxies: Sequence[IPNetwork] | None = None) -> str:
+    """Returns the address of the client, seen through the trusted reverse proxies.
+
+    The forwarding headers are only read from a trusted proxy, otherwise any client could
+    pick the key it is throttled by. X-Forwarded-For is read from the right, each proxy
+    appends the address it received the request from, so the first untrusted address is the
+    client.
+
+    Args:
+        request (Request): The request.
+        trusted_proxies (Sequence[IPNetwork] | None): Defaults to RATE_LIMIT_TRUSTED_PROXIES.
+
+    Returns:
+        str: The client IP address, "unknown" if the server does not know the peer.
+    """
+    if trusted_proxies is None:
+        trusted_proxies = TRUSTED_PROXIES
+    host = request.client.host if request.client else "unknown"
+    if not _is_trusted(host, trusted_proxies):
+        return host
+
+    forwarded_for = [
+        address.strip()
+        for header in request.headers.getlist("x-forwarded-for")
+        for address in header.split(",")
+        if address.strip()
+    ]
+    for address in reversed(forwarded_for):
+        if not _is_trusted(address, trusted_proxies):
+            return address
+    if forwarded_for:
+        return forwarded_for[0]
+    return request.headers.get("x-real-ip", host).strip()
+
+
+class RateLimit:
+    """Router dependency that throttles requests per client IP before any other work is done.
+
+    Behind a reverse proxy the client IP is taken from the forwarding headers, see
+    get_client_ip.
+
+    Args:
+        limiter (RateLimiter): The limiter holding the state of this router.
+        methods (tuple[str, ...] | None): HTTP methods to throttle, all methods if None.
+    """
+
+    def __init__(self, limiter: RateLimiter, methods: tuple[str, ...] | None = None) -> None:
+        self.limiter = limiter
+        self.methods = methods
+
+    async def __call__(self, request: Request) -> None:
+        if not rate_limit_config.ENABLED:
+            return
+        if self.methods is not None and request.method not in self.methods:
+            return
+
+        retry_after = self.limiter.hit(get_client_ip(request))
+        if retry_after:
+            _raise_too_many_requests(retry_after)
+
+
+async def limit_login_by_username(username: Annotated[str, Form()]) -> None:
+    """Throttles login attempts per username, independently of the client IP."""
+    if not rate_limit_config.ENABLED:
+        return
+
+    retry_after = login_username_limiter.hit(username.lower())
+    if retry_after:
+        _raise_too_many_requests(retry_after)
+
+
+TRUSTED_PROXIES = parse_trusted_proxies(rate_limit_config.TRUSTED_PROXIES)
+
+auth_ip_limiter = RateLimiter(
+    limit=rate_limit_config.AUTH_IP_LIMIT,
+    period_seconds=rate_limit_config.AUTH_IP_PERIOD_SECONDS,
+    max_keys=rate_limit_config.MAX_KEYS,
+)
+login_username_limiter = RateLimiter(
+    limit=rate_limit_config.LOGIN_USERNAME_LIMIT,
+    period_seconds=rate_limit_config.LOGIN_USERNAME_PERIOD_SECONDS,
+    max_keys=rate_limit_config.MAX_KEYS,
+)
+users_write_ip_limiter = RateLimiter(
+    limit=rate_limit_config.USERS_WRITE_IP_LIMIT,
+    period_seconds=rate_limit_config.USERS_WRITE_IP_PERIOD_SECONDS,
+    max_keys=rate_limit_config.MAX_KEYS,
+)
+rate_limiters = [auth_ip_limiter, login_username_limiter, users_write_ip_limiter]
+metrics_registry.register("rate_limit_auth_ip", auth_ip_limiter.stats)
+metrics_registry.register("rate_limit_login_username", login_username_limiter.stats)
+metrics_registry.register("rate_limit_users_write_ip", users_write_ip_limiter.stats)
+
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+__all__ = [
+    "RateLimit",
+    "get_client_ip",
+    "parse_trusted_proxies",
+    "limit_login_by_username",
+    "auth_ip_limiter",
+    "login_username_limiter",
+    "users_write_ip_limiter",
+    "rate_limiters",
+    "WRITE_METHODS",
+]
@@ -1,10 +1,15 @@
+from .file_schemas import UploadedFile
 from .user_schemas import (
+    BulkPortalRoleRequest,
+    BulkUpdatedUsersResponse,
     PortalRoleList,
     ShowUser,
     UpdatedUserResponse,
     UpdateUserRequest,
     UserCreateRequest,
+    UserImportReport,
 )
+from .ws_schemas import WsClientRequest, WsPongRequest, WsResumeRequest, WsSubscriptionRequest
 
 __all__ = [
     "ShowUser",
@@ -12,4 +17,12 @@ __all__ = [
     "UpdateUserRequest",
     "UpdatedUserResponse",
     "PortalRoleList",
+    "BulkPortalRoleRequest",
+    "BulkUpdatedUsersResponse",
+    "UserImportReport",
+    "UploadedFile",
+    "WsSubscriptionRequest",
+    "WsResumeRequest",
+    "WsPongRequest",
+    "WsClientRequest",
 ]
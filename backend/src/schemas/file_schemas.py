@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+
+
+class UploadedFile(BaseModel):
+    object_name: str
+    size: int
+    sha256: str
+    etag: str
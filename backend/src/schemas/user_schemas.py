@@ -1,6 +1,6 @@
 from enum import Enum
 
-from pydantic import BaseModel, EmailStr, field_validator
+from pydantic import BaseModel, EmailStr, Field, field_validator
 
 
 class PortalRole(str, Enum):
@@ -43,7 +43,7 @@ class UserPassword(BaseModel):
 
 
 class UserInDB(ShowUser, UserPassword):
-    pass
+    token_version: int = 0
 
 
 class UserCreateRequest(UserPassword):
@@ -71,3 +71,37 @@ class UpdatedUserResponse(BaseModel):
 
 class PortalRoleList(BaseModel):
     roles: list[PortalRole]
+
+
+class BulkPortalRoleRequest(PortalRoleList):
+    user_ids: list[int] = Field(min_length=1, max_length=10_000)
+
+
+class BulkUpdatedUsersResponse(BaseModel):
+    updated_user_ids: list[int]
+
+
+class UserImportRow(UserPassword):
+    username: str = Field(min_length=1, max_length=30)
+    email: str = Field(min_length=1, max_length=30)
+    fullname: str | None = Field(None, max_length=30)
+    disabled: bool = False
+    roles: list[PortalRole] = []
+
+
+class UserImportConflict(BaseModel):
+    row: int
+    username: str
+    email: str
+    reason: str
+
+
+class UserImportError(BaseModel):
+    row: int
+    detail: str
+
+
+class UserImportReport(BaseModel):
+    created: int = 0
+    conflicts: list[UserImportConflict] = []
+    errors: list[UserImportError] = []
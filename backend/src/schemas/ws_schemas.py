@@ -0,0 +1,43 @@
+from typing import Annotated, Literal
+
+from pydantic import BaseModel, Field, TypeAdapter
+
+TOPIC_PATTERN = r"^[A-Za-z0-9_.:-]+$"
+
+Topic = Annotated[str, Field(min_length=1, max_length=100, pattern=TOPIC_PATTERN)]
+Origin = Annotated[str, Field(min_length=1, max_length=32)]
+
+
+class WsSubscriptionRequest(BaseModel):
+    """A command sent by a client over ``/api/ws``.
+
+    Example: ``{"action": "subscribe", "topic": "room:1"}``.
+    """
+
+    action: Literal["subscribe", "unsubscribe"]
+    topic: Topic
+
+
+class WsResumeRequest(BaseModel):
+    """Sent first on every connection, by a reconnecting client to receive what it missed.
+
+    Example: ``{"action": "resume", "cursor": {"3f9a0c1d2e4b": 42}, "topics": ["room:1"]}``.
+    """
+
+    action: Literal["resume"]
+    # The ``seq`` of the last message the client received per ``origin``, None for a new client.
+    cursor: dict[Origin, Annotated[int, Field(ge=0)]] | None = Field(None, max_length=1000)
+    topics: list[Topic] = Field(default_factory=list, max_length=100)
+
+
+class WsPongRequest(BaseModel):
+    """The answer of a client to ``{"type": "ping"}``: ``{"action": "pong"}``."""
+
+    action: Literal["pong"]
+
+
+WsClientRequest = TypeAdapter(
+    Annotated[
+        WsSubscriptionRequest | WsResumeRequest | WsPongRequest, Field(discriminator="action")
+    ]
+)
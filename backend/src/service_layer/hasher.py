@@ -1,14 +1,69 @@
+import base64
 import hashlib
 import secrets
 
+from config import auth_config
+
 
 class Hasher:
+    """Password hashing with versioned hash formats.
+
+    New hashes use scrypt and are stored as ``$scrypt$n=<n>,r=<r>,p=<p>$<salt>$<hash>``.
+    Hashes without a prefix are legacy unsalted SHA-256 hex digests. They are still accepted
+    and reported by ``needs_rehash`` so that they are upgraded on the next successful login.
+    """
+
+    SCRYPT_PREFIX = "$scrypt$"
+    SCRYPT_N = auth_config.PASSWORD_SCRYPT_N
+    SCRYPT_R = 8
+    SCRYPT_P = 1
+    SALT_SIZE = 16
+
     @staticmethod
-    def verify_password(plain_password: str, hashed_password: str) -> bool | None:
-        if secrets.compare_digest(hashed_password, plain_password):
-            return True
-        return False
+    def verify_password(plain_password: str, hashed_password: str) -> bool:
+        if hashed_password.startswith(Hasher.SCRYPT_PREFIX):
+            params, salt, expected = hashed_password[len(Hasher.SCRYPT_PREFIX) :].split("$")
+            n, r, p = (int(param.split("=")[1]) for param in params.split(","))
+            password_hash = Hasher._scrypt(plain_password, base64.b64decode(salt), n, r, p)
+            return secrets.compare_digest(password_hash, base64.b64decode(expected))
+
+        legacy_hash = hashlib.sha256(bytes(plain_password, "utf-8")).hexdigest()
+        return secrets.compare_digest(hashed_password, legacy_hash)
 
     @staticmethod
     def get_password_hash(password: str) -> str:
-        return hashlib.sha256(bytes(password, "utf-8")).hexdigest()
+        salt = secrets.token_bytes(Hasher.SALT_SIZE)
+        password_hash = Hasher._scrypt(
+            password, salt, Hasher.SCRYPT_N, Hasher.SCRYPT_R, Hasher.SCRYPT_P
+        )
+        return "{}n={},r={},p={}${}${}".format(
+            Hasher.SCRYPT_PREFIX,
+            Hasher.SCRYPT_N,
+            Hasher.SCRYPT_R,
+            Hasher.SCRYPT_P,
+            base64.b64encode(salt).decode(),
+            base64.b64encode(password_hash).decode(),
+        )
+
+    @staticmethod
+    def get_password_hashes(passwords: list[str]) -> list[str]:
+        return [Hasher.get_password_hash(password) for password in passwords]
+
+    @staticmethod
+    def needs_rehash(hashed_password: str) -> bool:
+        """Checks whether the hash was made by an outdated scheme or with outdated parameters.
+
+        Args:
+            hashed_password (str): The stored password hash.
+
+        Returns:
+            bool: True if the password should be hashed again.
+        """
+        current_params = f"n={Hasher.SCRYPT_N},r={Hasher.SCRYPT_R},p={Hasher.SCRYPT_P}$"
+        return not hashed_password.startswith(Hasher.SCRYPT_PREFIX + current_params)
+
+    @staticmethod
+    def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+        return hashlib.scrypt(
+            bytes(password, "utf-8"), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r, dklen=32
+        )
@@ -0,0 +1,117 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
+from config import auth_config
+from src.service_layer.hasher import Hasher
+from src.service_layer.metrics import metrics_registry
+
+
+class HashingQueueFullError(Exception):
+    """Raised when too many password hashing jobs are already waiting for the pool."""
+
+
+class HashingService:
+    """Runs password hashing off the event loop on a bounded thread or process pool.
+
+    At most ``pool_size`` jobs run at once and at most ``queue_size`` more may wait for a free
+    worker. Further jobs are rejected with ``HashingQueueFullError`` instead of piling up.
+    """
+
+    # Passwords hashed per pool job by hash_passwords: a login queued behind a bulk job waits
+    # for at most this many hashes, about 0.5 s with the default scrypt cost.
+    BULK_CHUNK_SIZE = 8
+
+    def __init__(self, pool_kind: str, pool_size: int, queue_size: int) -> None:
+        if pool_kind not in ("thread", "process"):
+            raise ValueError(f"Unknown hashing pool kind: {pool_kind}")
+        self.pool_kind = pool_kind
+        self.pool_size = pool_size
+        self.queue_size = queue_size
+        self._executor: Executor | None = None
+        self._in_flight = 0
+        self.rejected = 0
+
+    async def hash_password(self, password: str) -> str:
+        return await self._run(Hasher.get_password_hash, password)
+
+    async def hash_passwords(self, passwords: list[str]) -> list[str]:
+        """Hashes many passwords, e.g. of an import, without starving logins.
+
+        The passwords are hashed in jobs of BULK_CHUNK_SIZE. At most ``pool_size - 1`` jobs
+        (at least one) run at a time, and the next one is only submitted when one finishes,
+        so jobs of logins queued in the meantime run first.
+
+        Args:
+            passwords (list[str]): The plain passwords.
+
+        Returns:
+            list[str]: The hashes in the same order.
+        """
+        chunks = [
+            passwords[i : i + self.BULK_CHUNK_SIZE]
+            for i in range(0, len(passwords), self.BULK_CHUNK_SIZE)
+        ]
+        hashed_chunks: list[list[str]] = [[] for _ in chunks]
+        pending = iter(enumerate(chunks))
+
+        async def hash_chunks() -> None:
+            for index, chunk in pending:
+                hashed_chunks[index] = await self._run(Hasher.get_password_hashes, chunk)
+
+        workers = min(len(chunks), max(1, self.pool_size - 1))
+        await asyncio.gather(*(hash_chunks() for _ in range(workers)))
+        return [password_hash for chunk in hashed_chunks for password_hash in chunk]
+
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(Hasher.verify_password, plain_password, hashed_password)
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self._in_flight >= self.pool_size + self.queue_size:
+            self.rejected += 1
+            raise HashingQueueFullError()
+
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self._in_flight -= 1
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.pool_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.pool_size)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.pool_size, thread_name_prefix="password-hasher"
+                )
+        return self._executor
+
+    def stats(self) -> dict[str, int | str]:
+        return {
+            "pool_kind": self.pool_kind,
+            "pool_size": self.pool_size,
+            "queue_size": self.queue_size,
+            "in_flight": self._in_flight,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+hashing_service = HashingService(
+    pool_kind=auth_config.PASSWORD_HASH_POOL,
+    pool_size=auth_config.PASSWORD_HASH_POOL_SIZE,
+    queue_size=auth_config.PASSWORD_HASH_QUEUE_SIZE,
+)
+metrics_registry.register("password_hashing", hashing_service.stats)
+
+__all__ = [
+    "HashingQueueFullError",
+    "HashingService",
+    "hashing_service",
+]
@@ -0,0 +1,140 @@
+import time
+from collections import OrderedDict
+
+from config import DATABASE_REPLICA_URLS, auth_config, db_conf
+from src.schemas.user_schemas import ShowUser
+from src.service_layer.metrics import metrics_registry
+
+
+class IdentityCache:
+    """Bounded in-process cache of authenticated users keyed by username.
+
+    Entries expire after ``ttl_seconds`` and the least recently used entry is evicted once
+    ``max_size`` is reached. A secondary ``user_id -> username`` index allows invalidation
+    from the service layer, where mutations only know the user id.
+
+    Reads may come from replicas that have not replayed a change yet, so a user is not cached
+    again for ``stale_window_seconds`` after it was invalidated. Otherwise another request
+    could put the old user back for the whole TTL.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float, stale_window_seconds: float = 0) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.stale_window_seconds = stale_window_seconds
+        self._entries: OrderedDict[str, tuple[float, ShowUser]] = OrderedDict()
+        self._usernames_by_id: dict[int, str] = {}
+        # user_id -> end of the stale window, ordered by the end of the window.
+        self._invalidated_until: OrderedDict[int, float] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale_skips = 0
+
+    def get(self, username: str) -> ShowUser | None:
+        """Returns the cached user or None if it is missing or expired.
+
+        Args:
+            username (str): The username from the token payload.
+
+        Returns:
+            ShowUser | None: The cached user.
+        """
+        entry = self._entries.get(username)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del self._entries[username]
+            self._drop_index(user)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(username)
+        self.hits += 1
+        return user
+
+    def set(self, user: ShowUser) -> None:
+        """Stores the user, evicting the least recently used entries when full.
+
+        Args:
+            user (ShowUser): The user to cache.
+        """
+        if self.max_size <= 0:
+            return
+        if self._is_stale(user.id):
+            self.stale_skips += 1
+            return
+
+        self._entries[user.username] = (time.monotonic() + self.ttl_seconds, user)
+        self._entries.move_to_end(user.username)
+        self._usernames_by_id[user.id] = user.username
+
+        while len(self._entries) > self.max_size:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._drop_index(evicted)
+            self.evictions += 1
+
+    def invalidate(self, user_id: int) -> None:
+        """Removes the cached entry of the user with the given id.
+
+        Args:
+            user_id (int): The id of the changed user.
+        """
+        username = self._usernames_by_id.pop(user_id, None)
+        if username is not None:
+            self._entries.pop(username, None)
+        if self.stale_window_seconds > 0:
+            self._invalidated_until.pop(user_id, None)
+            self._invalidated_until[user_id] = time.monotonic() + self.stale_window_seconds
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._usernames_by_id.clear()
+        self._invalidated_until.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        """Returns the counters used for sizing the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "stale_skips": self.stale_skips,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _is_stale(self, user_id: int) -> bool:
+        now = time.monotonic()
+        while self._invalidated_until:
+            oldest_id, until = next(iter(self._invalidated_until.items()))
+            if until >= now:
+                break
+            del self._invalidated_until[oldest_id]
+        return user_id in self._invalidated_until
+
+    def _drop_index(self, user: ShowUser) -> None:
+        if self._usernames_by_id.get(user.id) == user.username:
+            del self._usernames_by_id[user.id]
+
+
+identity_cache = IdentityCache(
+    max_size=auth_config.IDENTITY_CACHE_MAX_SIZE,
+    ttl_seconds=auth_config.IDENTITY_CACHE_TTL_SECONDS,
+    # A replica stays in rotation until a lag check finds it more than the maximum lag behind.
+    stale_window_seconds=(
+        db_conf.REPLICA_MAX_LAG_SECONDS + db_conf.REPLICA_LAG_CHECK_INTERVAL_SECONDS
+        if DATABASE_REPLICA_URLS
+        else 0
+    ),
+)
+metrics_registry.register("identity_cache", identity_cache.stats)
+
+__all__ = [
+    "IdentityCache",
+    "identity_cache",
+]
@@ -0,0 +1,68 @@
+import bisect
+import logging
+from typing import Any, Callable
+
+DEFAULT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    """Cumulative histogram of durations with fixed upper bounds in milliseconds.
+
+    ``observe`` is O(log buckets) and the memory does not grow with the number of samples.
+    """
+
+    def __init__(self, buckets_ms: tuple[float, ...] = DEFAULT_BUCKETS_MS) -> None:
+        self.buckets_ms = buckets_ms
+        self._counts = [0] * (len(buckets_ms) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+
+    def observe(self, seconds: float) -> None:
+        duration_ms = seconds * 1000
+        self._counts[bisect.bisect_left(self.buckets_ms, duration_ms)] += 1
+        self.count += 1
+        self.sum_ms += duration_ms
+
+    def stats(self) -> dict[str, Any]:
+        buckets: dict[str, int] = {}
+        cumulative = 0
+        for bound, count in zip((*self.buckets_ms, "+Inf"), self._counts):
+            cumulative += count
+            buckets[f"le_{bound}"] = cumulative
+        return {"count": self.count, "sum_ms": round(self.sum_ms, 3), "buckets": buckets}
+
+
+class MetricsRegistry:
+    """Collects the stats of in-process components for the internal metrics endpoint.
+
+    Components register a callable returning a JSON-serializable dict. Nothing is computed
+    until the metrics are collected.
+    """
+
+    def __init__(self) -> None:
+        self._collectors: dict[str, Callable[[], dict[str, Any]]] = {}
+
+    def register(self, name: str, collect: Callable[[], dict[str, Any]]) -> None:
+        self._collectors[name] = collect
+
+    def unregister(self, name: str) -> None:
+        self._collectors.pop(name, None)
+
+    def collect(self) -> dict[str, dict[str, Any]]:
+        metrics = {}
+        for name, collect in self._collectors.items():
+            try:
+                metrics[name] = collect()
+            except Exception as e:
+                logging.exception(f"Failed to collect metrics of {name}")
+                metrics[name] = {"error": repr(e)}
+        return metrics
+
+
+metrics_registry = MetricsRegistry()
+
+__all__ = [
+    "Histogram",
+    "MetricsRegistry",
+    "metrics_registry",
+]
@@ -0,0 +1,80 @@
+import time
+from collections import OrderedDict
+
+
+class RateLimiter:
+    """In-memory GCRA (generic cell rate algorithm) rate limiter.
+
+    Each key may make ``limit`` requests per ``period_seconds``, including bursts of up to
+    ``limit`` requests. Only the theoretical arrival time (TAT) is stored per key, so a check
+    is O(1). Keys whose TAT has passed are indistinguishable from unknown keys and are evicted
+    from the front of the LRU order. A TAT is at most ``period_seconds`` after the last
+    allowed request of its key, so a key stays in the table for at most that long.
+
+    ``max_keys`` bounds the memory for distinct keys. When the table is full, new keys are
+    rejected until the oldest key expires; evicting a key that is still throttled would let
+    an attacker rotating keys, e.g. usernames, reset the limits of the others.
+    """
+
+    def __init__(self, limit: int, period_seconds: float, max_keys: int = 100_000) -> None:
+        self.limit = limit
+        self.period_seconds = period_seconds
+        self.max_keys = max_keys
+        self.emission_interval = period_seconds / limit
+        self._tats: OrderedDict[str, float] = OrderedDict()
+        self.allowed = 0
+        self.rejected = 0
+        self.rejected_full = 0
+
+    def hit(self, key: str) -> float:
+        """Registers a request for the key.
+
+        Args:
+            key (str): The client identifier, e.g. an IP address or a username.
+
+        Returns:
+            float: 0 if the request is allowed, otherwise the number of seconds to wait.
+        """
+        now = time.monotonic()
+        self._evict_expired(now)
+
+        if key not in self._tats and len(self._tats) >= self.max_keys:
+            self.rejected += 1
+            self.rejected_full += 1
+            return next(iter(self._tats.values())) - now
+
+        tat = max(self._tats.get(key, now), now)
+        allowed_at = tat + self.emission_interval - self.period_seconds
+        if now < allowed_at:
+            self.rejected += 1
+            return allowed_at - now
+
+        self._tats[key] = tat + self.emission_interval
+        self._tats.move_to_end(key)
+        self.allowed += 1
+        return 0
+
+    def clear(self) -> None:
+        self._tats.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "limit": self.limit,
+            "period_seconds": self.period_seconds,
+            "keys": len(self._tats),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "rejected_full": self.rejected_full,
+        }
+
+    def _evict_expired(self, now: float) -> None:
+        while self._tats:
+            key, tat = next(iter(self._tats.items()))
+            if tat > now:
+                break
+            del self._tats[key]
+
+
+__all__ = [
+    "RateLimiter",
+]
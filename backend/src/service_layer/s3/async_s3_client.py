@@ -0,0 +1,551 @@
+import asyncio
+import functools
+import hashlib
+import io
+import logging
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterable, Callable, TypeVar
+
+import certifi
+import urllib3
+from minio import Minio
+from minio.datatypes import Object, Part
+from minio.deleteobjects import DeleteObject
+from minio.error import S3Error
+
+from config import REMOTE_MINIO_URL, MinioConfig, minio_config
+from src.schemas.file_schemas import UploadedFile
+from src.service_layer.metrics import metrics_registry
+
+T = TypeVar("T")
+
+# Streaming uploads are stored under this prefix, which is checked for abandoned uploads.
+UPLOADS_PREFIX = "uploads/"
+
+
+class StorageError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class BaseAsyncStorageClient(ABC):
+    """The awaitable counterpart of BaseStorageClient, for use in async routes.
+
+    Results that the sync client returns as lazy streams, a response body or an object
+    listing, are read completely: reading them later would block the event loop.
+    """
+
+    @abstractmethod
+    async def put_object(
+        self, file_name: str, file_data: bytes, content_type: str, bucket_name: str
+    ) -> dict[str, str]:
+        pass
+
+    @abstractmethod
+    async def fput_object(
+        self, file_name: str, file_path: str, content_type: str, bucket_name: str
+    ) -> None:
+        pass
+
+    @abstractmethod
+    async def get_file(self, bucket_name: str, object_name: str) -> bytes:
+        pass
+
+    @abstractmethod
+    async def delete_file(self, object_name: str) -> None:
+        pass
+
+    @abstractmethod
+    def get_bucket_name(self) -> str:
+        pass
+
+    @abstractmethod
+    async def file_exists(self, bucket_name: str, object_name: str) -> bool:
+        pass
+
+    @abstractmethod
+    async def list_objects(self, prefix: str | None, recursive: bool = True) -> list[Object]:
+        pass
+
+    @abstractmethod
+    async def delete_batch_files(self, file_names: list[str]) -> None:
+        pass
+
+    @abstractmethod
+    async def generate_presigned_url(
+        self, bucket_name: str, object_name: str, expiry: int = 3600
+    ) -> str:
+        """Generate a temporary link for a file.
+
+        Args:
+            bucket_name: bucket name.
+            object_name: position in minio.
+            expiry: Link lifetime in minit (default 3600 = 1 hour).
+
+        Returns: Temporary link.
+        """
+        pass
+
+
+class AsyncMinIOClient(BaseAsyncStorageClient):
+    """MinIO client whose calls run in a dedicated bounded thread pool.
+
+    The ``minio`` SDK only has blocking calls, so each one runs in one of
+    ``max_concurrency`` threads while the event loop keeps serving other requests. The
+    threads share a pool of as many keep-alive connections. A call waiting for data longer
+    than the read timeout of the pool fails in its thread; the caller stops waiting after
+    ``call_timeout_seconds`` in any case, which raises TimeoutError. Calls beyond
+    ``max_concurrency`` wait for a free thread, the wait counts towards the call timeout.
+
+    Nothing is sent to MinIO before the first call, the bucket is created on it if missing.
+
+    ``put_stream`` uploads a stream of unknown length in parts of ``part_size`` bytes, see
+    MultipartUpload. Multipart uploads older than ``stale_upload_seconds`` under
+    ``UPLOADS_PREFIX`` are aborted periodically once ``start`` was called.
+    """
+
+    def __init__(
+        self,
+        bucket_name: str,
+        max_concurrency: int,
+        call_timeout_seconds: float,
+        client: Minio,
+        part_size: int = 8 * 1024 * 1024,
+        max_concurrent_parts: int = 4,
+        stale_upload_seconds: float = 24 * 3600,
+        stale_upload_check_seconds: float = 3600,
+    ) -> None:
+        self.bucket_name = bucket_name
+        self.max_concurrency = max_concurrency
+        self.call_timeout_seconds = call_timeout_seconds
+        self.client = client
+        self.part_size = part_size
+        self.max_concurrent_parts = max_concurrent_parts
+        self.stale_upload_seconds = stale_upload_seconds
+        self.stale_upload_check_seconds = stale_upload_check_seconds
+        self._cleanup_task: asyncio.Task | None = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # Created on the first call: threads do not survive the fork of the workers.
+        self._executor: ThreadPoolExecutor | None = None
+        self._bucket_checked = False
+        self._bucket_lock = threading.Lock()
+        self.calls = 0
+        self.running_calls = 0
+        self.timeouts = 0
+        self.streamed_uploads = 0
+        self.aborted_uploads = 0
+        self.aborted_stale_uploads = 0
+
+    async def put_object(
+        self, file_name: str, file_data: bytes, content_type: str, bucket_name: str
+    ) -> dict[str, str]:
+        await self._run(
+            self.client.put_object,
+            bucket_name,
+            file_name,
+            io.BytesIO(file_data),
+            len(file_data),
+            content_type=content_type,
+        )
+        return {"filename": file_name}
+
+    async def fput_object(
+        self, file_name: str, file_path: str, content_type: str, bucket_name: str
+    ) -> None:
+        await self._run(
+            self.client.fput_object,
+            bucket_name=bucket_name,
+            object_name=file_name,
+            file_path=file_path,
+            content_type=content_type,
+        )
+
+    async def get_file(self, bucket_name: str, object_name: str) -> bytes:
+        return await self._run(self._read_object, bucket_name, object_name)
+
+    async def delete_file(self, object_name: str) -> None:
+        await self._run(self.client.remove_object, self.bucket_name, object_name)
+
+    def get_bucket_name(self) -> str:
+        return self.bucket_name
+
+    async def file_exists(self, bucket_name: str, object_name: str) -> bool:
+        try:
+            await self._run(self.client.stat_object, bucket_name, object_name)
+            return True
+        except StorageError as e:
+            if e.status_code == 404:
+                return False
+            raise
+
+    async def list_objects(self, prefix: str | None, recursive: bool = True) -> list[Object]:
+        """Returns the objects of the bucket, optionally only the ones under ``prefix``.
+
+        Args:
+            prefix (str | None): The prefix of the object names, None for all objects.
+            recursive (bool): Whether to list the objects of nested prefixes too.
+
+        Returns:
+            list[Object]: The objects, all pages of the listing are fetched in the thread.
+        """
+        return await self._run(
+            lambda: list(
+                self.client.list_objects(self.bucket_name, prefix=prefix, recursive=recursive)
+            )
+        )
+
+    async def delete_batch_files(self, file_names: list[str]) -> None:
+        objects_to_delete = [DeleteObject(file_name) for file_name in file_names]
+        errors = await self._run(
+            lambda: list(self.client.remove_objects(self.bucket_name, objects_to_delete))
+        )
+        if errors:
+            raise StorageError(500, f"Failed to delete files: {errors}")
+
+    async def generate_presigned_url(
+        self, bucket_name: str, object_name: str, expiry: int = 3600
+    ) -> str:
+        # Signing may look up the region of the bucket over the network.
+        url = await self._run(
+            self.client.presigned_get_object, bucket_name, object_name, timedelta(minutes=expiry)
+        )
+        minio_url = f"http://{minio_config.MINIO_ENDPOINT}"
+        remote_url = f"http://{REMOTE_MINIO_URL}"
+        return url.replace(minio_url, remote_url)
+
+    async def put_stream(
+        self,
+        object_name: str,
+        chunks: AsyncIterable[bytes],
+        content_type: str,
+        max_size: int,
+        expected_sha256: str | None = None,
+    ) -> UploadedFile:
+        """Uploads a stream, e.g. a request body, holding at most a few parts in memory.
+
+        The sha256 of the content is computed while it is read. A stream shorter than one
+        part is sent in a single request, a longer one as a multipart upload, which is
+        aborted if anything fails, so no partial object is ever stored.
+
+        Args:
+            object_name (str): The name of the object in the bucket.
+            chunks (AsyncIterable[bytes]): The content.
+            content_type (str): The content type of the object.
+            max_size (int): The largest accepted size in bytes.
+            expected_sha256 (str | None): The hex sha256 the content must have.
+
+        Returns:
+            UploadedFile: The stored object.
+
+        Raises:
+            StorageError: 413 for a stream larger than ``max_size``, 400 for a content that
+                does not match ``expected_sha256``, others for failures of MinIO.
+        """
+        upload = MultipartUpload(self, object_name, content_type)
+        sha256 = hashlib.sha256()
+        size = 0
+        buffer = bytearray()
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_size:
+                    raise StorageError(413, f"The file is larger than {max_size} bytes")
+                sha256.update(chunk)
+                buffer += chunk
+                while len(buffer) >= self.part_size:
+                    # Through a view, slicing the bytearray would copy the part twice.
+                    with memoryview(buffer) as view:
+                        part = bytes(view[: self.part_size])
+                    del buffer[: self.part_size]
+                    await upload.add_part(part)
+
+            digest = sha256.hexdigest()
+            if expected_sha256 is not None and expected_sha256.lower() != digest:
+                raise StorageError(400, "The content does not match the sha256")
+            if upload.upload_id is None:
+                result = await self._run(
+                    self.client.put_object,
+                    self.bucket_name,
+                    object_name,
+                    io.BytesIO(buffer),
+                    len(buffer),
+                    content_type=content_type,
+                )
+                etag = result.etag
+            else:
+                if buffer:
+                    await upload.add_part(bytes(buffer))
+                etag = await upload.complete()
+        except BaseException:
+            self.aborted_uploads += 1
+            # Finish the abort even if the request handling is cancelled.
+            await asyncio.shield(upload.abort())
+            raise
+        self.streamed_uploads += 1
+        return UploadedFile(object_name=object_name, size=size, sha256=digest, etag=etag)
+
+    async def abort_stale_uploads(self) -> int:
+        """Aborts the multipart uploads under ``UPLOADS_PREFIX`` older than the limit.
+
+        Returns:
+            int: The number of aborted uploads.
+        """
+        aborted = await self._run(self._abort_stale_uploads)
+        self.aborted_stale_uploads += aborted
+        return aborted
+
+    async def start(self) -> None:
+        """Starts the periodic cleanup of abandoned multipart uploads."""
+        self._cleanup_task = asyncio.create_task(self._cleanup_loop())
+
+    async def stop(self) -> None:
+        if self._cleanup_task is None:
+            return
+        self._cleanup_task.cancel()
+        try:
+            await self._cleanup_task
+        except asyncio.CancelledError:
+            pass
+        self._cleanup_task = None
+
+    def shutdown(self) -> None:
+        """Stops the threads once the running calls are done."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "calls": self.calls,
+            "running_calls": self.running_calls,
+            "timeouts": self.timeouts,
+            "streamed_uploads": self.streamed_uploads,
+            "aborted_uploads": self.aborted_uploads,
+            "aborted_stale_uploads": self.aborted_stale_uploads,
+        }
+
+    async def _run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        self.calls += 1
+        try:
+            async with asyncio.timeout(self.call_timeout_seconds):
+                await self._semaphore.acquire()
+                try:
+                    future = asyncio.get_running_loop().run_in_executor(
+                        self._get_executor(), functools.partial(self._call, func, *args, **kwargs)
+                    )
+                except BaseException:
+                    self._semaphore.release()
+                    raise
+                self.running_calls += 1
+                # The thread cannot be interrupted, its slot is released when it finishes.
+                future.add_done_callback(self._release)
+                return await asyncio.shield(future)
+        except TimeoutError:
+            self.timeouts += 1
+            raise
+
+    def _call(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        try:
+            if not self._bucket_checked:
+                with self._bucket_lock:
+                    if not self._bucket_checked:
+                        if not self.client.bucket_exists(self.bucket_name):
+                            self.client.make_bucket(self.bucket_name)
+                        self._bucket_checked = True
+            return func(*args, **kwargs)
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchBucket", "NoSuchObject"):
+                raise StorageError(404, "File not found") from e
+            raise StorageError(500, str(e)) from e
+
+    def _abort_stale_uploads(self) -> int:
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.stale_upload_seconds)
+        aborted = 0
+        key_marker = None
+        while True:
+            # Paged by key only: the SDK does not parse the next upload id marker, and every
+            # streaming upload has a key of its own.
+            result = self.client._list_multipart_uploads(
+                self.bucket_name, prefix=UPLOADS_PREFIX, key_marker=key_marker, max_uploads=1000
+            )
+            for upload in result.uploads:
+                if upload.initiated_time is not None and upload.initiated_time < cutoff:
+                    self.client._abort_multipart_upload(
+                        self.bucket_name, upload.object_name, upload.upload_id
+                    )
+                    aborted += 1
+            if not result.is_truncated or not result.next_key_marker:
+                return aborted
+            key_marker = result.next_key_marker
+
+    async def _cleanup_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.stale_upload_check_seconds)
+            try:
+                aborted = await self.abort_stale_uploads()
+                if aborted:
+                    logging.info(f"Aborted {aborted} abandoned multipart uploads")
+            except Exception as e:
+                logging.warning(f"Failed to abort abandoned multipart uploads: {e!r}")
+
+    def _read_object(self, bucket_name: str, object_name: str) -> bytes:
+        response = self.client.get_object(bucket_name, object_name)
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrency, thread_name_prefix="minio"
+            )
+        return self._executor
+
+    def _release(self, future: asyncio.Future) -> None:
+        self.running_calls -= 1
+        self._semaphore.release()
+        if not future.cancelled():
+            # Retrieved here for the calls the caller stopped waiting for.
+            future.exception()
+
+
+class MultipartUpload:
+    """The parts of one streaming upload, sent while the next ones are read.
+
+    At most ``max_concurrent_parts`` of the client are uploaded at a time; ``add_part``
+    waits for a free slot, which stops reading the stream and bounds the memory. The upload
+    is created in MinIO with its first part.
+    """
+
+    def __init__(self, storage: AsyncMinIOClient, object_name: str, content_type: str) -> None:
+        self.storage = storage
+        self.object_name = object_name
+        self.content_type = content_type
+        self.upload_id: str | None = None
+        self.parts: list[Part] = []
+        self._tasks: list[asyncio.Task] = []
+        self._slots = asyncio.Semaphore(storage.max_concurrent_parts)
+        self._failure: BaseException | None = None
+
+    async def add_part(self, data: bytes) -> None:
+        await self._slots.acquire()
+        if self._failure is not None:
+            self._slots.release()
+            raise self._failure
+        if self.upload_id is None:
+            try:
+                self.upload_id = await self.storage._run(
+                    self.storage.client._create_multipart_upload,
+                    self.storage.bucket_name,
+                    self.object_name,
+                    {"Content-Type": self.content_type},
+                )
+            except BaseException:
+                self._slots.release()
+                raise
+        part_number = len(self._tasks) + 1
+        self._tasks.append(asyncio.create_task(self._upload_part(part_number, data)))
+
+    async def complete(self) -> str:
+        """Waits for the parts and assembles the object.
+
+        Returns:
+            str: The etag of the object.
+        """
+        await asyncio.gather(*self._tasks)
+        self.parts.sort(key=lambda part: part.part_number)
+        result = await self.storage._run(
+            self.storage.client._complete_multipart_upload,
+            self.storage.bucket_name,
+            self.object_name,
+            self.upload_id,
+            self.parts,
+        )
+        return result.etag
+
+    async def abort(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.upload_id is None:
+            return
+        try:
+            await self.storage._run(
+                self.storage.client._abort_multipart_upload,
+                self.storage.bucket_name,
+                self.object_name,
+                self.upload_id,
+            )
+        except Exception as e:
+            # Left to the periodic cleanup.
+            logging.warning(f"Failed to abort the upload of {self.object_name}: {e!r}")
+
+    async def _upload_part(self, part_number: int, data: bytes) -> None:
+        try:
+            etag = await self.storage._run(
+                self.storage.client._upload_part,
+                self.storage.bucket_name,
+                self.object_name,
+                data,
+                None,
+                self.upload_id,
+                part_number,
+            )
+        except BaseException as e:
+            self._failure = e
+            raise
+        finally:
+            self._slots.release()
+        self.parts.append(Part(part_number, etag))
+
+
+def create_async_minio_client(config: MinioConfig = minio_config) -> AsyncMinIOClient:
+    http_client = urllib3.PoolManager(
+        maxsize=config.MINIO_MAX_CONCURRENCY,
+        block=True,
+        timeout=urllib3.Timeout(
+            connect=config.MINIO_CONNECT_TIMEOUT_SECONDS, read=config.MINIO_READ_TIMEOUT_SECONDS
+        ),
+        cert_reqs="CERT_REQUIRED",
+        ca_certs=certifi.where(),
+        retries=urllib3.Retry(total=3, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]),
+    )
+    client = Minio(
+        config.MINIO_ENDPOINT,
+        access_key=config.MINIO_ROOT_USER,
+        secret_key=config.MINIO_ROOT_PASSWORD.get_secret_value(),
+        secure=config.MINIO_SECURE,
+        http_client=http_client,
+    )
+    return AsyncMinIOClient(
+        bucket_name=config.MINIO_BUCKET_NAME,
+        max_concurrency=config.MINIO_MAX_CONCURRENCY,
+        call_timeout_seconds=config.MINIO_CALL_TIMEOUT_SECONDS,
+        client=client,
+        part_size=config.MINIO_UPLOAD_PART_SIZE_BYTES,
+        max_concurrent_parts=config.MINIO_UPLOAD_MAX_CONCURRENT_PARTS,
+        stale_upload_seconds=config.MINIO_STALE_UPLOAD_SECONDS,
+        stale_upload_check_seconds=config.MINIO_STALE_UPLOAD_CHECK_SECONDS,
+    )
+
+
+async_minio_client = create_async_minio_client()
+metrics_registry.register("storage", async_minio_client.stats)
+
+__all__ = [
+    "AsyncMinIOClient",
+    "BaseAsyncStorageClient",
+    "MultipartUpload",
+    "UPLOADS_PREFIX",
+    "StorageError",
+    "async_minio_client",
+    "create_async_minio_client",
+]
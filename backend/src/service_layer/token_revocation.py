@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Callable
+
+from config import auth_config
+from src.service_layer.unit_of_work import IUnitOfWork
+
+
+class TokenRevocationRegistry:
+    """In-memory map of ``user_id -> token_version`` used by the stateless auth mode.
+
+    A token is revoked when the version embedded in it is lower than the current version of
+    its user. A revocation is only kept for ``max_token_age_seconds``, after which all tokens
+    issued before it have expired, so the map stays small. It is reloaded periodically from
+    the database, and updated immediately by the local worker whenever it changes a user.
+    """
+
+    def __init__(self, refresh_interval_seconds: float, max_token_age_seconds: float) -> None:
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self.max_token_age_seconds = max_token_age_seconds
+        # user_id -> (token_version, revoked_at), oldest revocation first.
+        self._versions: dict[int, tuple[int, float]] = {}
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+    def is_revoked(self, user_id: int, token_version: int) -> bool:
+        entry = self._versions.get(user_id)
+        return entry is not None and token_version < entry[0]
+
+    def revoke(self, user_id: int, token_version: int, revoked_at: float | None = None) -> None:
+        """Records the new token version of the user.
+
+        Args:
+            user_id (int): The id of the changed user.
+            token_version (int): The token version stored in the database after the change.
+            revoked_at (float | None): The Unix time of the change, defaults to now.
+        """
+        entry = self._versions.get(user_id)
+        if entry is not None and token_version <= entry[0]:
+            return
+        self._versions.pop(user_id, None)
+        self._versions[user_id] = (token_version, time.time() if revoked_at is None else revoked_at)
+        self.__forget_expired()
+
+    async def refresh(self, uow: IUnitOfWork) -> None:
+        revoked_after = time.time() - self.max_token_age_seconds
+        async with uow:
+            versions = await uow.user.find_token_versions(
+                datetime.fromtimestamp(revoked_after, tz=timezone.utc)
+            )
+        for user_id, (token_version, revoked_at) in versions.items():
+            self.revoke(user_id, token_version, revoked_at.timestamp())
+        self._versions = {
+            user_id: entry
+            for user_id, entry in sorted(self._versions.items(), key=lambda item: item[1][1])
+            if entry[1] > revoked_after
+        }
+
+    async def start(self, uow_factory: Callable[[], IUnitOfWork]) -> None:
+        """Loads the registry and starts the periodic refresh task.
+
+        Args:
+            uow_factory (Callable[[], IUnitOfWork]): Creates a unit of work for each refresh.
+        """
+        await self.refresh(uow_factory())
+        self._task = asyncio.create_task(self.__refresh_loop(uow_factory))
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def __refresh_loop(self, uow_factory: Callable[[], IUnitOfWork]) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval_seconds)
+            try:
+                await self.refresh(uow_factory())
+            except Exception as e:
+                logging.warning(f"Failed to refresh token revocation registry: {e}")
+
+    def __forget_expired(self) -> None:
+        """Drops the oldest revocations whose tokens have all expired."""
+        revoked_after = time.time() - self.max_token_age_seconds
+        expired = []
+        for user_id, (_, revoked_at) in self._versions.items():
+            if revoked_at > revoked_after:
+                break
+            expired.append(user_id)
+        for user_id in expired:
+            del self._versions[user_id]
+
+
+token_revocation_registry = TokenRevocationRegistry(
+    refresh_interval_seconds=auth_config.TOKEN_REVOCATION_REFRESH_SECONDS,
+    max_token_age_seconds=auth_config.JWT_LIFE_TIME_MINUTES * 60,
+)
+
+__all__ = [
+    "TokenRevocationRegistry",
+    "token_revocation_registry",
+]
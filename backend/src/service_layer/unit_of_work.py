@@ -1,13 +1,17 @@
 from abc import ABC, abstractmethod
 from typing import Any
 
-from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from src.repositories.user import UserRepository
 
 
 class IUnitOfWork(ABC):
     """Interface for Unit of Work pattern. Manages repositories and transactional behavior."""
+
+    session_factory: async_sessionmaker
+    session: AsyncSession
+    read_only: bool
     user: UserRepository
 
     @abstractmethod
@@ -32,18 +36,42 @@ class IUnitOfWork(ABC):
 
 
 class UnitOfWork(IUnitOfWork):
-    def __init__(self, session_factory: async_sessionmaker) -> None:
+    """Unit of Work over an SQLAlchemy session.
+
+    The session only checks out a connection and begins a transaction on its first query.
+    On exit the transaction is rolled back only if one is still open, so a unit of work that
+    made no queries or committed costs no extra round-trip.
+
+    The unit of work is re-entrant: nested ``async with`` blocks share the session, each block
+    ends its own transaction on exit and only the outermost block closes the session.
+
+    Args:
+        session_factory (async_sessionmaker): The factory of the sessions.
+        read_only (bool): Whether the unit of work only reads, commit is then refused. Use it
+            with a factory of read-only sessions, see Database.read_only_session.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker, read_only: bool = False) -> None:
         self.session_factory = session_factory
+        self.read_only = read_only
+        self._depth = 0
 
     async def __aenter__(self) -> None:
-        self.session = self.session_factory()
-        self.user = UserRepository(self.session)
+        if self._depth == 0:
+            self.session = self.session_factory()
+            self.user = UserRepository(self.session)
+        self._depth += 1
 
     async def __aexit__(self, *args: Any) -> None:
-        await self.rollback()
-        await self.session.close()
+        self._depth -= 1
+        if self.session.in_transaction():
+            await self.rollback()
+        if self._depth == 0:
+            await self.session.close()
 
     async def commit(self) -> None:
+        if self.read_only:
+            raise RuntimeError("A read-only unit of work cannot commit.")
         await self.session.commit()
 
     async def rollback(self) -> None:
@@ -0,0 +1,70 @@
+import csv
+import json
+from itertools import islice
+from typing import Any, Iterable, Iterator
+
+IMPORT_FORMATS = ("csv", "ndjson")
+CSV_ROLES_SEPARATOR = ";"
+
+
+def detect_import_format(file_name: str | None) -> str | None:
+    """Guesses the import format from the file extension.
+
+    Args:
+        file_name (str | None): The name of the uploaded file.
+
+    Returns:
+        str | None: One of IMPORT_FORMATS or None if the extension is unknown.
+    """
+    if not file_name:
+        return None
+    extension = file_name.rsplit(".", 1)[-1].lower()
+    if extension == "csv":
+        return "csv"
+    if extension in ("ndjson", "jsonl"):
+        return "ndjson"
+    return None
+
+
+def read_user_rows(lines: Iterable[str], file_format: str) -> Iterator[tuple[int, Any]]:
+    """Lazily parses user rows from CSV or NDJSON lines.
+
+    CSV files must have a header with the UserImportRow field names, roles are separated by
+    ``;``. Rows are not validated here: a line of invalid JSON is passed on as the raw string,
+    so that the validation error is reported for its row number.
+
+    Args:
+        lines (Iterable[str]): The lines of the file.
+        file_format (str): One of IMPORT_FORMATS.
+
+    Yields:
+        tuple[int, Any]: The 1-based row number and the raw row.
+    """
+    if file_format == "csv":
+        for row_number, row in enumerate(csv.DictReader(lines), start=1):
+            data: dict[str, Any] = {key: value for key, value in row.items() if value != ""}
+            if "roles" in data:
+                data["roles"] = [
+                    role.strip()
+                    for role in data["roles"].split(CSV_ROLES_SEPARATOR)
+                    if role.strip()
+                ]
+            yield row_number, data
+    elif file_format == "ndjson":
+        row_number = 0
+        for line in lines:
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                yield row_number, json.loads(line)
+            except json.JSONDecodeError:
+                yield row_number, line
+    else:
+        raise ValueError(f"Unknown import format: {file_format}")
+
+
+def batched(rows: Iterable[Any], batch_size: int) -> Iterator[list[Any]]:
+    iterator = iter(rows)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
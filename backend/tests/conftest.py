@@ -4,12 +4,14 @@ from typing import Any, AsyncGenerator, Generator
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from starlette.requests import HTTPConnection
 
 from config import DATABASE_URL_TEST
 from main import app
 from src.db.models.base import Base
 from src.db.session import Database, db_connections
-from src.routes.dependensies import get_uow
+from src.routes.dependensies import READ_ONLY_METHODS, get_stream_uow, get_uow
+from src.routes.rate_limit import rate_limiters
 from src.service_layer.unit_of_work import IUnitOfWork, UnitOfWork
 from tests.prepare_db.create_tables import prepare_db
 from tests.prepare_db.delete_tables import delete_tables
@@ -54,10 +56,21 @@ async def _get_test_db() -> AsyncGenerator[AsyncSession, None]:
         await test_engine.dispose()
 
 
-def get_uow_test() -> IUnitOfWork:
+def get_uow_test(read_only: bool = False) -> IUnitOfWork:
     test_engine = create_async_engine(DATABASE_URL_TEST, future=True, echo=True)
+    if read_only:
+        test_engine = test_engine.execution_options(postgresql_readonly=True)
     test_async_session = async_sessionmaker(test_engine, expire_on_commit=False)
-    return UnitOfWork(test_async_session)
+    return UnitOfWork(test_async_session, read_only=read_only)
+
+
+async def get_request_uow_test(connection: HTTPConnection) -> AsyncGenerator[IUnitOfWork, None]:
+    read_only = (
+        connection.scope["type"] == "websocket" or connection.scope["method"] in READ_ONLY_METHODS
+    )
+    uow = get_uow_test(read_only=read_only)
+    async with uow:
+        yield uow
 
 
 @pytest.fixture(scope="function")
@@ -68,7 +81,10 @@ async def client() -> Generator[TestClient, Any, None]:
     которая внедряется в маршруты.
     """
     app.dependency_overrides[db_connections.get_db] = _get_test_db
-    app.dependency_overrides[get_uow] = get_uow_test
+    app.dependency_overrides[get_uow] = get_request_uow_test
+    app.dependency_overrides[get_stream_uow] = get_uow_test
+    for limiter in rate_limiters:
+        limiter.clear()
     with TestClient(app, base_url="https://testserver") as client:
         auth_user(client)
         yield client
@@ -0,0 +1,118 @@
+import jwt
+
+from config import auth_config
+from src.db.models.user import PortalRole
+from tests.conftest import auth_user
+
+
+async def test_refresh_token(client):
+    old_token = client.cookies.get("access_token")
+
+    resp = client.post("/api/auth/refresh")
+    assert resp.status_code == 200
+
+    new_token = resp.json()["access_token"]
+    assert new_token != old_token
+    assert client.cookies.get("access_token") == new_token
+
+    payload = jwt.decode(new_token, options={"verify_signature": False})
+    old_payload = jwt.decode(old_token, options={"verify_signature": False})
+    assert payload["username"] == "johndoe"
+    assert payload["auth_time"] == old_payload["auth_time"]
+
+    resp = client.get("/api/auth/users/me")
+    assert resp.status_code == 200
+
+
+async def test_refresh_invalid_token(client):
+    client.cookies.set("access_token", "invalid")
+
+    resp = client.post("/api/auth/refresh")
+    assert resp.status_code == 401
+
+
+async def test_refresh_is_limited_by_the_session_age(client):
+    payload = jwt.decode(client.cookies.get("access_token"), options={"verify_signature": False})
+    payload["auth_time"] -= auth_config.JWT_MAX_SESSION_MINUTES * 60 + 1
+    token = jwt.encode(
+        payload, auth_config.VERIFYING_KEY.get_secret_value(), algorithm=auth_config.JWT_ALGORITHM
+    )
+    client.cookies.set("access_token", token)
+
+    resp = client.post("/api/auth/refresh")
+    assert resp.status_code == 401
+
+
+async def test_refresh_rejects_disabled_user(client):
+    user = {
+        "username": "refresh_disabled_user",
+        "fullname": "Disabled",
+        "email": "disabled@example.com",
+        "disabled": False,
+        "password": "123",
+    }
+    user_id = client.post("/api/users/", json=user).json()
+    auth_user(client, username="refresh_disabled_user")
+    token = client.cookies.get("access_token")
+
+    auth_user(client)
+    assert client.delete(f"/api/users/?user_id={user_id}").status_code == 200
+    client.cookies.set("access_token", token)
+
+    resp = client.post("/api/auth/refresh")
+    assert resp.status_code == 401
+
+
+async def test_tokens_expire_at_different_times(client):
+    expiry_times = set()
+    for _ in range(5):
+        resp = client.post("/api/auth/refresh")
+        payload = jwt.decode(resp.json()["access_token"], options={"verify_signature": False})
+        expiry_times.add(payload["exp"])
+
+    assert len(expiry_times) > 1
+
+
+async def test_token_claims(client):
+    payload = jwt.decode(client.cookies.get("access_token"), options={"verify_signature": False})
+
+    assert payload["username"] == "johndoe"
+    assert payload["user_id"] == 1
+    assert payload["email"] == "johndoe@example.com"
+    assert payload["disabled"] is False
+    assert set(payload["roles"]) == {role.value for role in PortalRole}
+    assert isinstance(payload["ver"], int)
+
+
+async def test_stateless_auth_revokes_tokens_on_claim_changes(client, monkeypatch):
+    monkeypatch.setattr(auth_config, "STATELESS_AUTH", True)
+    user = {
+        "username": "stateless_user",
+        "fullname": "Stateless",
+        "email": "stateless@example.com",
+        "disabled": False,
+        "password": "123",
+    }
+    user_id = client.post("/api/users/", json=user).json()
+    role = {"roles": ["STUDENT"]}
+    assert client.post(f"/api/users/{user_id}/roles", json=role).status_code == 200
+
+    auth_user(client, username="stateless_user")
+    resp = client.patch(
+        f"/api/users/?user_id={user_id}", json={"fullname": "Renamed", "username": None}
+    )
+    assert resp.status_code == 200
+    assert client.get("/api/auth/users/me").status_code == 401
+    assert client.post("/api/auth/refresh").status_code == 401
+
+    auth_user(client, username="stateless_user")
+    me = client.get("/api/auth/users/me").json()
+    assert (me["fullname"], me["roles"]) == ("Renamed", ["STUDENT"])
+    token = client.cookies.get("access_token")
+
+    auth_user(client)
+    assert client.request("DELETE", f"/api/users/{user_id}/roles", json=role).status_code == 200
+    client.cookies.set("access_token", token)
+
+    assert client.get("/api/auth/users/me").status_code == 401
+    assert client.post("/api/auth/refresh").status_code == 401
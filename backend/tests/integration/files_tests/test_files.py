@@ -0,0 +1,97 @@
+import hashlib
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+
+from config import minio_config
+from src.service_layer.identity_cache import identity_cache
+from src.service_layer.s3.async_s3_client import UPLOADS_PREFIX, async_minio_client
+
+
+class FakeMinio:
+    def __init__(self) -> None:
+        self.objects: dict[str, bytes] = {}
+        self.on_put = lambda: None
+
+    def bucket_exists(self, bucket_name: str) -> bool:
+        return True
+
+    def put_object(self, bucket_name: str, object_name: str, data, length: int, **_):
+        self.on_put()
+        self.objects[object_name] = data.read()
+        return SimpleNamespace(etag="single")
+
+
+@pytest.fixture
+def minio(monkeypatch) -> FakeMinio:
+    fake = FakeMinio()
+    monkeypatch.setattr(async_minio_client, "client", fake)
+    monkeypatch.setattr(async_minio_client, "_bucket_checked", False)
+    return fake
+
+
+async def test_upload_file(client, minio):
+    content = b"report content"
+
+    resp = client.post(
+        "/api/files/",
+        params={"filename": "report.txt", "sha256": hashlib.sha256(content).hexdigest()},
+        content=content,
+        headers={"content-type": "text/plain"},
+    )
+
+    assert resp.status_code == 201
+    uploaded = resp.json()
+    assert uploaded["size"] == len(content)
+    assert uploaded["sha256"] == hashlib.sha256(content).hexdigest()
+    [object_name] = minio.objects
+    assert object_name.startswith(UPLOADS_PREFIX) and object_name.endswith("/report.txt")
+    assert minio.objects[object_name] == content
+
+
+async def test_upload_with_wrong_sha256_is_rejected(client, minio):
+    resp = client.post(
+        "/api/files/",
+        params={"filename": "report.txt", "sha256": "0" * 64},
+        content=b"report content",
+    )
+
+    assert resp.status_code == 400
+    assert minio.objects == {}
+
+
+async def test_upload_larger_than_the_limit_is_rejected(client, minio, monkeypatch):
+    monkeypatch.setattr(minio_config, "MINIO_UPLOAD_MAX_BYTES", 10)
+
+    resp = client.post("/api/files/", params={"filename": "report.txt"}, content=b"x" * 11)
+
+    assert resp.status_code == 413
+    assert minio.objects == {}
+
+
+async def test_upload_holds_no_database_connection(client, minio):
+    checked_out = 0
+    during_upload = []
+
+    def on_checkout(*args):
+        nonlocal checked_out
+        checked_out += 1
+
+    def on_checkin(*args):
+        nonlocal checked_out
+        checked_out -= 1
+
+    minio.on_put = lambda: during_upload.append(checked_out)
+    event.listen(Pool, "checkout", on_checkout)
+    event.listen(Pool, "checkin", on_checkin)
+    try:
+        identity_cache.clear()
+        resp = client.post("/api/files/", params={"filename": "report.txt"}, content=b"report")
+    finally:
+        event.remove(Pool, "checkout", on_checkout)
+        event.remove(Pool, "checkin", on_checkin)
+
+    assert resp.status_code == 201
+    assert during_upload == [0]
@@ -1,5 +1,11 @@
 import json
 
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+
+from src.service_layer.identity_cache import identity_cache
+from tests.conftest import auth_user, get_uow_test
+
 
 async def test_create_user(client):
     user_data = {
@@ -11,7 +17,7 @@ async def test_create_user(client):
     }
     resp = client.post(
         "/api/users/",
-        data=json.dumps(user_data),
+        json=user_data,
     )
     user_id_resp = resp.json()
     assert resp.status_code == 200
@@ -28,13 +34,13 @@ async def test_create_similar_user(client):
     }
     resp = client.post(
         "/api/users/",
-        data=json.dumps(user_data),
+        json=user_data,
     )
     assert resp.status_code == 200
 
     resp = client.post(
         "/api/users/",
-        data=json.dumps(user_data),
+        json=user_data,
     )
     assert resp.status_code == 409
 
@@ -49,7 +55,7 @@ async def test_delete_user(client):
     }
     resp = client.post(
         "/api/users/",
-        data=json.dumps(user_data),
+        json=user_data,
     )
     assert resp.status_code == 200
 
@@ -70,7 +76,7 @@ async def test_update_user(client):
     }
     res = client.post(
         "/api/users/",
-        data=json.dumps(user_data),
+        json=user_data,
     )
 
     update_data = {
@@ -133,3 +139,153 @@ async def test_change_password_incorrect_id(client):
         json=user_data,
     )
     assert resp.status_code == 404
+
+
+async def test_get_users_keyset_pagination(client):
+    resp = client.get("/api/users/")
+    all_ids = [user["id"] for user in resp.json()]
+
+    resp = client.get("/api/users/?limit=2")
+    assert resp.status_code == 200
+    first_page = [user["id"] for user in resp.json()]
+    assert first_page == sorted(all_ids)[:2]
+
+    resp = client.get(f"/api/users/?limit=2&after={resp.headers['X-Next-Cursor']}")
+    assert resp.status_code == 200
+    second_page = [user["id"] for user in resp.json()]
+    assert second_page == sorted(all_ids)[2:4]
+
+
+async def test_stream_users(client):
+    resp = client.get("/api/users/stream")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+
+    streamed_users = [json.loads(line) for line in resp.text.splitlines()]
+    assert len(streamed_users) == len(client.get("/api/users/").json())
+    assert streamed_users[0]["username"] == "johndoe"
+
+
+async def test_bulk_grant_and_revoke_role(client):
+    body = {"user_ids": [2, 4], "roles": ["STUDENT"]}
+
+    resp = client.post("/api/users/roles", json=body)
+    assert resp.status_code == 200
+    assert sorted(resp.json()["updated_user_ids"]) == [2, 4]
+
+    resp = client.post("/api/users/roles", json=body)
+    assert resp.json()["updated_user_ids"] == []
+
+    roles = {user["id"]: user["roles"] for user in client.get("/api/users/").json()}
+    assert roles[2] == ["STUDENT"]
+    assert roles[4] == ["TUTOR", "STUDENT"]
+
+    resp = client.request("DELETE", "/api/users/roles", json=body)
+    assert resp.status_code == 200
+    assert sorted(resp.json()["updated_user_ids"]) == [2, 4]
+
+    roles = {user["id"]: user["roles"] for user in client.get("/api/users/").json()}
+    assert roles[2] == []
+    assert roles[4] == ["TUTOR"]
+
+
+async def test_import_users_reports_conflicts_and_errors(client):
+    content = "\n".join(
+        [
+            "username,email,password,fullname,roles",
+            "imported_1,imported_1@example.com,secret,Imported One,STUDENT",
+            "imported_2,imported_2@example.com,secret,,TUTOR;STUDENT",
+            "imported_1,imported_1@example.com,other,,",
+            "johndoe,johndoe@example.com,secret,,",
+            "imported_3,imported_3@example.com,,,",
+        ]
+    )
+
+    resp = client.post(
+        "/api/users/import", files={"file": ("users.csv", content.encode(), "text/csv")}
+    )
+    assert resp.status_code == 200
+    report = resp.json()
+    assert report["created"] == 2
+    assert [(c["row"], c["reason"]) for c in report["conflicts"]] == [
+        (3, "duplicate in file"),
+        (4, "already exists"),
+    ]
+    assert [error["row"] for error in report["errors"]] == [5]
+
+    users = {user["username"]: user for user in client.get("/api/users/").json()}
+    assert users["imported_1"]["fullname"] == "Imported One"
+    assert users["imported_2"]["roles"] == ["TUTOR", "STUDENT"]
+    auth_user(client, username="imported_1", password="secret")
+
+
+async def test_import_users_reads_files_spooled_to_disk(client):
+    # Larger than the 1 MB the upload is kept in memory, the rows lack a password.
+    rows = [f"spooled_{i},spooled_{i}@example.com,,,STUDENT" for i in range(30000)]
+    content = "\n".join(["username,email,password,fullname,roles", *rows]).encode()
+    assert len(content) > 1024 * 1024
+
+    resp = client.post("/api/users/import", files={"file": ("users.csv", content, "text/csv")})
+    assert resp.status_code == 200
+    report = resp.json()
+    assert report["created"] == 0
+    assert len(report["errors"]) == 30000
+    assert report["errors"][-1]["row"] == 30000
+
+
+async def test_import_users_rejects_non_utf8_files(client):
+    resp = client.post(
+        "/api/users/import", files={"file": ("users.csv", "имя".encode("cp1251"), "text/csv")}
+    )
+    assert resp.status_code == 422
+
+
+async def test_copy_import_skips_existing_and_repeated_users():
+    uow = get_uow_test()
+    record = ("copy_import", "Copy", "copy_import@example.com", "hash", False, [])
+
+    async with uow:
+        inserted = await uow.user.copy_import([(1, *record), (2, *record)])
+        await uow.commit()
+    assert inserted == {("copy_import", "copy_import@example.com")}
+
+    async with uow:
+        inserted = await uow.user.copy_import([(1, *record)])
+        await uow.commit()
+    assert inserted == set()
+
+
+async def test_authenticated_request_checks_out_one_connection(client):
+    res = client.post(
+        "/api/users/",
+        json={
+            "username": "checkouts",
+            "fullname": "Checkouts",
+            "email": "checkouts@example.com",
+            "disabled": False,
+            "password": "66",
+        },
+    )
+    checkouts = []
+
+    def count_checkout(*args):
+        checkouts.append(args)
+
+    event.listen(Pool, "checkout", count_checkout)
+    try:
+        for method, url, body in [
+            ("GET", "/api/users/", None),
+            (
+                "PATCH",
+                f"/api/users/?user_id={res.json()}",
+                {"fullname": "Checked Out", "username": "checked_out"},
+            ),
+        ]:
+            identity_cache.clear()
+            checkouts.clear()
+            resp = client.request(method, url, json=body)
+
+            assert resp.status_code == 200
+            assert len(checkouts) == 1, f"{method} {url}"
+    finally:
+        event.remove(Pool, "checkout", count_checkout)
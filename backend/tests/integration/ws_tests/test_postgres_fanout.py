@@ -0,0 +1,34 @@
+import asyncio
+import json
+
+from sqlalchemy import make_url
+
+from config import DATABASE_URL_TEST
+from src.controllers.ws_fanout import PostgresFanout
+
+
+async def test_events_reach_the_other_workers_only():
+    dsn = make_url(DATABASE_URL_TEST).set(drivername="postgresql").render_as_string(False)
+    first_received: list = []
+    second_received: list = []
+    first = PostgresFanout(dsn, channel="ws_fanout_test", batch_interval_seconds=0.001)
+    second = PostgresFanout(dsn, channel="ws_fanout_test", batch_interval_seconds=0.001)
+    await first.start(first_received.append)
+    await second.start(second_received.append)
+    try:
+        events = [{"kind": "broadcast", "message": str(i)} for i in range(50)]
+        events.append({"kind": "topic", "topic": "room:1", "message": json.dumps("x" * 20_000)})
+        for event in events:
+            first.publish(event)
+
+        for _ in range(100):
+            if len(second_received) == len(events):
+                break
+            await asyncio.sleep(0.02)
+
+        assert second_received == events
+        assert first_received == []
+        assert first.stats()["sent_notifications"] < len(events)
+    finally:
+        await first.stop()
+        await second.stop()
@@ -0,0 +1,222 @@
+import asyncio
+import hashlib
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from minio.error import S3Error
+
+from src.service_layer.s3.async_s3_client import UPLOADS_PREFIX, AsyncMinIOClient, StorageError
+
+
+class FakeResponse:
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.released = False
+
+    def read(self) -> bytes:
+        return self.data
+
+    def close(self) -> None:
+        pass
+
+    def release_conn(self) -> None:
+        self.released = True
+
+
+class BlockingMinio:
+    """Blocks like the SDK does while a request is in flight."""
+
+    def __init__(self, delay_seconds: float = 0) -> None:
+        self.delay_seconds = delay_seconds
+        self.objects = {"report.pdf": b"content"}
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+    def bucket_exists(self, bucket_name: str) -> bool:
+        return True
+
+    def get_object(self, bucket_name: str, object_name: str) -> FakeResponse:
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.delay_seconds)
+        with self.lock:
+            self.running -= 1
+        if object_name not in self.objects:
+            raise S3Error(None, "NoSuchKey", "Not found", object_name, "", "")
+        return FakeResponse(self.objects[object_name])
+
+    def stat_object(self, bucket_name: str, object_name: str) -> None:
+        self.get_object(bucket_name, object_name)
+
+    def put_object(self, bucket_name: str, object_name: str, data, length: int, **_):
+        self.objects[object_name] = data.read()
+        return SimpleNamespace(etag="single")
+
+    def _create_multipart_upload(self, bucket_name: str, object_name: str, headers: dict) -> str:
+        self.uploads = {"upload-1": {}}
+        return "upload-1"
+
+    def _upload_part(self, bucket_name, object_name, data, headers, upload_id, part_number):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.delay_seconds)
+        with self.lock:
+            self.running -= 1
+        if data == b"fail":
+            raise S3Error(None, "InternalError", "Failed", object_name, "", "")
+        self.uploads[upload_id][part_number] = data
+        return f"etag-{part_number}"
+
+    def _complete_multipart_upload(self, bucket_name, object_name, upload_id, parts):
+        uploaded = self.uploads.pop(upload_id)
+        self.objects[object_name] = b"".join(uploaded[part.part_number] for part in parts)
+        return SimpleNamespace(etag="multipart")
+
+    def _abort_multipart_upload(self, bucket_name: str, object_name: str, upload_id: str):
+        self.uploads.pop(upload_id)
+
+
+def make_client(minio: BlockingMinio, **options: float) -> AsyncMinIOClient:
+    options = {
+        "max_concurrency": 4,
+        "call_timeout_seconds": 5,
+        "part_size": 16,
+        "max_concurrent_parts": 2,
+        **options,
+    }
+    return AsyncMinIOClient(bucket_name="test", client=minio, **options)
+
+
+async def test_calls_do_not_block_the_event_loop():
+    client = make_client(BlockingMinio(delay_seconds=0.1))
+    ticks = 0
+
+    async def tick() -> None:
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    ticker = asyncio.create_task(tick())
+    assert await client.get_file("test", "report.pdf") == b"content"
+    ticker.cancel()
+
+    assert ticks >= 5
+    client.shutdown()
+
+
+async def test_concurrency_is_bounded():
+    minio = BlockingMinio(delay_seconds=0.05)
+    client = make_client(minio, max_concurrency=2)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(client.get_file("test", "report.pdf") for _ in range(6)))
+
+    assert results == [b"content"] * 6
+    assert minio.max_running == 2
+    assert time.perf_counter() - started >= 0.15
+    assert client.stats()["running_calls"] == 0
+    client.shutdown()
+
+
+async def test_slow_call_times_out_and_frees_its_slot_when_done():
+    minio = BlockingMinio(delay_seconds=0.1)
+    client = make_client(minio, max_concurrency=1, call_timeout_seconds=0.02)
+
+    with pytest.raises(TimeoutError):
+        await client.get_file("test", "report.pdf")
+    assert client.stats()["running_calls"] == 1
+    await asyncio.sleep(0.15)
+
+    stats = client.stats()
+    assert (stats["calls"], stats["running_calls"], stats["timeouts"]) == (1, 0, 1)
+    client.shutdown()
+
+
+async def test_missing_object():
+    client = make_client(BlockingMinio())
+
+    assert await client.file_exists("test", "report.pdf")
+    assert not await client.file_exists("test", "missing.pdf")
+    with pytest.raises(StorageError) as e:
+        await client.get_file("test", "missing.pdf")
+    assert e.value.status_code == 404
+    client.shutdown()
+
+
+async def stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+        await asyncio.sleep(0)
+
+
+async def test_stream_is_uploaded_in_concurrent_parts():
+    minio = BlockingMinio(delay_seconds=0.02)
+    client = make_client(minio, max_concurrency=8)
+    chunks = [bytes([i]) * 7 for i in range(10)]
+
+    uploaded = await client.put_stream("file", stream(*chunks), "text/plain", max_size=1000)
+
+    content = b"".join(chunks)
+    assert uploaded.size == 70
+    assert uploaded.sha256 == hashlib.sha256(content).hexdigest()
+    assert uploaded.etag == "multipart"
+    assert minio.objects["file"] == content
+    assert minio.max_running == 2
+    client.shutdown()
+
+
+async def test_small_stream_is_uploaded_in_one_request():
+    minio = BlockingMinio()
+    client = make_client(minio)
+
+    uploaded = await client.put_stream("file", stream(b"small"), "text/plain", max_size=1000)
+
+    assert uploaded.etag == "single"
+    assert minio.objects["file"] == b"small"
+    client.shutdown()
+
+
+async def test_failed_upload_is_aborted():
+    minio = BlockingMinio()
+    client = make_client(minio, part_size=4)
+
+    with pytest.raises(StorageError) as e:
+        await client.put_stream("file", stream(b"okok", b"fail", b"okok"), "", max_size=1000)
+    assert e.value.status_code == 500
+    with pytest.raises(StorageError) as e:
+        await client.put_stream("file", stream(b"x" * 40), "", max_size=20)
+    assert e.value.status_code == 413
+    with pytest.raises(StorageError) as e:
+        await client.put_stream("file", stream(b"x" * 40), "", 1000, expected_sha256="0" * 64)
+    assert e.value.status_code == 400
+
+    assert minio.uploads == {}
+    assert "file" not in minio.objects
+    assert client.stats()["aborted_uploads"] == 3
+    client.shutdown()
+
+
+async def test_stale_uploads_are_aborted():
+    now = datetime.now(timezone.utc)
+    minio = BlockingMinio()
+    aborted = []
+    uploads = [
+        SimpleNamespace(object_name="old", upload_id="1", initiated_time=now - timedelta(days=2)),
+        SimpleNamespace(object_name="new", upload_id="2", initiated_time=now),
+    ]
+    minio._list_multipart_uploads = lambda bucket_name, prefix, **_: SimpleNamespace(
+        uploads=uploads if prefix == UPLOADS_PREFIX else [], is_truncated=False
+    )
+    minio._abort_multipart_upload = lambda bucket, name, upload_id: aborted.append(name)
+    client = make_client(minio)
+
+    assert await client.abort_stale_uploads() == 1
+    assert aborted == ["old"]
+    client.shutdown()
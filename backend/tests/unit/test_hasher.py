@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+import pytest
+
+from src.service_layer.hasher import Hasher
+from src.service_layer.hashing_service import HashingQueueFullError, HashingService
+
+LEGACY_HASH_OF_123 = "a665a45920422f9d417e4867efdc4fb8a04a1f3fff1fa07e998e86f7f7a27ae3"
+
+
+async def test_verify_legacy_sha256_hash():
+    assert Hasher.verify_password("123", LEGACY_HASH_OF_123)
+    assert not Hasher.verify_password("1234", LEGACY_HASH_OF_123)
+    assert Hasher.needs_rehash(LEGACY_HASH_OF_123)
+
+
+async def test_scrypt_hash_is_salted_and_current():
+    first_hash = Hasher.get_password_hash("123")
+    second_hash = Hasher.get_password_hash("123")
+
+    assert first_hash != second_hash
+    assert Hasher.verify_password("123", first_hash)
+    assert not Hasher.verify_password("1234", first_hash)
+    assert not Hasher.needs_rehash(first_hash)
+
+
+async def test_hashing_service_rejects_jobs_over_queue_limit():
+    service = HashingService(pool_kind="thread", pool_size=1, queue_size=0)
+    service._in_flight = 1
+
+    with pytest.raises(HashingQueueFullError):
+        await service.hash_password("123")
+    service.shutdown()
+
+
+async def test_bulk_hashing_leaves_room_for_logins(monkeypatch):
+    def slow_hashes(passwords: list[str]) -> list[str]:
+        time.sleep(0.05)
+        return [f"hash-{password}" for password in passwords]
+
+    monkeypatch.setattr(Hasher, "get_password_hashes", staticmethod(slow_hashes))
+    service = HashingService(pool_kind="thread", pool_size=2, queue_size=4)
+    passwords = [str(i) for i in range(10 * HashingService.BULK_CHUNK_SIZE)]
+
+    bulk = asyncio.create_task(service.hash_passwords(passwords))
+    await asyncio.sleep(0.01)
+    started = time.perf_counter()
+    assert await service._run(len, "login") == 5
+    login_wait = time.perf_counter() - started
+
+    assert await bulk == [f"hash-{password}" for password in passwords]
+    assert login_wait < 0.03
+    service.shutdown()
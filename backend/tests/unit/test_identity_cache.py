@@ -0,0 +1,71 @@
+import asyncio
+
+from src.schemas.user_schemas import PortalRole, ShowUser
+from src.service_layer.identity_cache import IdentityCache
+
+
+def _user(user_id: int, username: str) -> ShowUser:
+    return ShowUser(id=user_id, username=username, roles=[PortalRole.STUDENT])
+
+
+async def test_identity_cache_hit_and_miss():
+    cache = IdentityCache(max_size=10, ttl_seconds=60)
+
+    assert cache.get("johndoe") is None
+    cache.set(_user(1, "johndoe"))
+    assert cache.get("johndoe").id == 1
+
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+async def test_identity_cache_lru_eviction():
+    cache = IdentityCache(max_size=2, ttl_seconds=60)
+    cache.set(_user(1, "first"))
+    cache.set(_user(2, "second"))
+    cache.get("first")
+    cache.set(_user(3, "third"))
+
+    assert cache.get("second") is None
+    assert cache.get("first") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+async def test_identity_cache_ttl_expiry():
+    cache = IdentityCache(max_size=10, ttl_seconds=-1)
+    cache.set(_user(1, "johndoe"))
+
+    assert cache.get("johndoe") is None
+
+
+async def test_identity_cache_invalidate_by_user_id():
+    cache = IdentityCache(max_size=10, ttl_seconds=60)
+    cache.set(_user(1, "johndoe"))
+    cache.invalidate(1)
+
+    assert cache.get("johndoe") is None
+
+
+async def test_identity_cache_skips_users_invalidated_within_the_stale_window():
+    cache = IdentityCache(max_size=10, ttl_seconds=60, stale_window_seconds=60)
+    cache.set(_user(1, "johndoe"))
+    cache.invalidate(1)
+
+    # E.g. read again from a replica that has not replayed the change yet.
+    cache.set(_user(1, "johndoe"))
+    cache.set(_user(2, "other"))
+
+    assert cache.get("johndoe") is None
+    assert cache.get("other") is not None
+    assert cache.stats()["stale_skips"] == 1
+
+
+async def test_identity_cache_caches_again_after_the_stale_window():
+    cache = IdentityCache(max_size=10, ttl_seconds=60, stale_window_seconds=0.01)
+    cache.invalidate(1)
+    await asyncio.sleep(0.02)
+
+    cache.set(_user(1, "johndoe"))
+
+    assert cache.get("johndoe") is not None
+    assert cache.stats()["stale_skips"] == 0
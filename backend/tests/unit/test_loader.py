@@ -0,0 +1,144 @@
+import asyncio
+import contextvars
+
+import pytest
+
+from src.db.round_trips import add_round_trips, track_round_trips
+from src.repositories.loader import BatchLoader
+
+
+async def test_batch_loader_coalesces_keys_of_one_tick():
+    calls = []
+
+    async def batch_fn(keys, session):
+        calls.append(keys)
+        return {key: key.upper() for key in keys if key != "missing"}
+
+    loader = BatchLoader(batch_fn)
+    results = await asyncio.gather(*(loader.load(key) for key in ["a", "b", "a", "missing"]))
+
+    assert results == ["A", "B", "A", None]
+    assert calls == [["a", "b", "missing"]]
+
+
+async def test_batch_loader_shares_in_flight_loads():
+    release = asyncio.Event()
+    calls = []
+
+    async def batch_fn(keys, session):
+        calls.append(keys)
+        await release.wait()
+        return {key: len(calls) for key in keys}
+
+    loader = BatchLoader(batch_fn)
+    first = asyncio.create_task(loader.load("a"))
+    await asyncio.sleep(0.01)
+    second = asyncio.create_task(loader.load("a"))
+    await asyncio.sleep(0.01)
+    release.set()
+
+    assert await asyncio.gather(first, second) == [1, 1]
+    assert calls == [["a"]]
+    assert await loader.load("a") == 2
+
+
+async def test_batch_loader_propagates_errors_to_the_whole_batch():
+    async def batch_fn(keys, session):
+        raise RuntimeError("database is down")
+
+    loader = BatchLoader(batch_fn)
+    results = await asyncio.gather(loader.load("a"), loader.load("b"), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    with pytest.raises(RuntimeError):
+        await loader.load("a")
+
+
+async def test_batch_loader_splits_large_batches():
+    calls = []
+
+    async def batch_fn(keys, session):
+        calls.append(len(keys))
+        return {key: key for key in keys}
+
+    loader = BatchLoader(batch_fn, max_batch_size=2)
+    await asyncio.gather(*(loader.load(key) for key in range(5)))
+
+    assert calls == [2, 2, 1]
+
+
+async def test_batch_loader_batches_partitions_apart():
+    pinned = contextvars.ContextVar("pinned", default=False)
+    calls = []
+
+    async def batch_fn(keys, session):
+        calls.append((pinned.get(), keys))
+        return {key: pinned.get() for key in keys}
+
+    async def load(key, pin):
+        pinned.set(pin)
+        return await loader.load(key)
+
+    loader = BatchLoader(batch_fn, partition=pinned.get)
+    results = await asyncio.gather(load("a", False), load("a", True), load("b", False))
+
+    assert results == [False, True, False]
+    assert sorted(calls) == [(False, ["a", "b"]), (True, ["a"])]
+
+
+async def test_batch_loader_counts_round_trips_for_every_caller():
+    async def batch_fn(keys, session):
+        add_round_trips(2)
+        return {key: key for key in keys}
+
+    async def load(key):
+        with track_round_trips() as round_trips:
+            await loader.load(key)
+        return round_trips.count
+
+    loader = BatchLoader(batch_fn)
+
+    assert await asyncio.gather(load("a"), load("b"), load("a")) == [2, 2, 2]
+
+
+async def test_batch_loader_runs_chunks_in_the_owner_session_one_after_another():
+    running = []
+    calls = []
+
+    async def batch_fn(keys, session):
+        running.append(session)
+        assert len(running) == 1
+        calls.append((session, keys))
+        await asyncio.sleep(0.01)
+        running.remove(session)
+        return {key: key for key in keys}
+
+    loader = BatchLoader(batch_fn, max_batch_size=2)
+    await asyncio.gather(*(loader.load(key, f"session {key}") for key in range(3)))
+
+    assert calls == [("session 0", [0, 1]), ("session 0", [2])]
+
+
+async def test_batch_loader_cancelled_owner_waits_for_its_batch():
+    release = asyncio.Event()
+    sessions_in_use = set()
+
+    async def batch_fn(keys, session):
+        sessions_in_use.add(session)
+        await release.wait()
+        sessions_in_use.discard(session)
+        return {key: key for key in keys}
+
+    loader = BatchLoader(batch_fn)
+    owner = asyncio.create_task(loader.load("a", "owner session"))
+    other = asyncio.create_task(loader.load("b", "other session"))
+    await asyncio.sleep(0.01)
+    owner.cancel()
+    await asyncio.sleep(0.01)
+
+    assert not owner.done()
+    release.set()
+    with pytest.raises(asyncio.CancelledError):
+        await owner
+    assert sessions_in_use == set()
+    assert await other == "b"
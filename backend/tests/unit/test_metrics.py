@@ -0,0 +1,22 @@
+from src.service_layer.metrics import Histogram, MetricsRegistry
+
+
+async def test_histogram_counts_cumulatively():
+    histogram = Histogram(buckets_ms=(10, 100))
+    for seconds in (0.001, 0.05, 0.05, 2):
+        histogram.observe(seconds)
+
+    stats = histogram.stats()
+    assert stats["count"] == 4
+    assert stats["buckets"] == {"le_10": 1, "le_100": 3, "le_+Inf": 4}
+
+
+async def test_metrics_registry_reports_failing_collectors():
+    registry = MetricsRegistry()
+    registry.register("ok", lambda: {"value": 1})
+    registry.register("broken", lambda: 1 / 0)
+
+    metrics = registry.collect()
+
+    assert metrics["ok"] == {"value": 1}
+    assert "ZeroDivisionError" in metrics["broken"]["error"]
@@ -0,0 +1,46 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from config import app_config
+from src.db.replicas import READ_YOUR_WRITES_COOKIE, is_pinned_to_primary
+from src.db.round_trips import add_round_trips
+from src.db.session import db_connections
+from src.routes.middleware import ReadYourWritesMiddleware, RoundTripsMiddleware
+
+
+@pytest.fixture
+def client(monkeypatch: pytest.MonkeyPatch) -> TestClient:
+    monkeypatch.setattr(app_config, "PRODUCTION", False)
+    monkeypatch.setattr(db_connections.replica_set, "replicas", [object()])
+    app = FastAPI()
+
+    @app.get("/read")
+    async def read() -> dict[str, bool]:
+        add_round_trips(2)
+        return {"pinned": is_pinned_to_primary()}
+
+    @app.post("/write")
+    async def write() -> None:
+        add_round_trips(1)
+
+    app.add_middleware(RoundTripsMiddleware)
+    app.add_middleware(ReadYourWritesMiddleware)
+    return TestClient(app, base_url="https://testserver")
+
+
+def test_round_trips_are_reported_per_request(client: TestClient):
+    assert client.get("/read").headers[RoundTripsMiddleware.HEADER] == "2"
+    assert client.post("/write").headers[RoundTripsMiddleware.HEADER] == "1"
+
+
+def test_reads_after_a_write_are_pinned_to_the_primary(client: TestClient):
+    assert client.get("/read").json() == {"pinned": False}
+
+    response = client.post("/write")
+
+    assert float(response.cookies[READ_YOUR_WRITES_COOKIE]) > time.time()
+    assert "HttpOnly" in response.headers["set-cookie"]
+    assert client.get("/read").json() == {"pinned": True}
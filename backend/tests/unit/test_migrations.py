@@ -0,0 +1,7 @@
+from alembic.script import ScriptDirectory
+from src.db.migrations import alembic_config
+
+
+def test_migrations_have_a_single_head():
+    # The schema check at startup compares the database with the heads of the scripts.
+    assert len(ScriptDirectory.from_config(alembic_config()).get_heads()) == 1
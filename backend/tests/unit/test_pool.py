@@ -0,0 +1,49 @@
+import asyncio
+import time
+from unittest.mock import MagicMock
+
+from sqlalchemy.util import greenlet_spawn
+
+from src.db.pool import InstrumentedPool, PoolMetrics, instrumented_pool_class
+
+
+def make_pool(metrics: PoolMetrics, connect_seconds: float) -> InstrumentedPool:
+    def slow_connect() -> MagicMock:
+        time.sleep(connect_seconds)
+        return MagicMock()
+
+    return instrumented_pool_class(metrics)(slow_connect, pool_size=1, max_overflow=0, timeout=1)
+
+
+async def test_checkout_wait_excludes_connect_time():
+    metrics = PoolMetrics()
+    pool = make_pool(metrics, connect_seconds=0.2)
+
+    connection = await greenlet_spawn(pool.connect)
+    await greenlet_spawn(connection.close)
+
+    assert metrics.checkouts == 1
+    assert metrics.connect_histogram.count == 1
+    assert metrics.connect_histogram.sum_ms >= 200
+    assert metrics.wait_histogram.count == 1
+    assert metrics.wait_histogram.sum_ms < 50
+
+
+async def test_checkout_wait_covers_queueing_for_a_busy_pool():
+    metrics = PoolMetrics()
+    pool = make_pool(metrics, connect_seconds=0)
+    connection = await greenlet_spawn(pool.connect)
+
+    async def release_later() -> None:
+        await asyncio.sleep(0.2)
+        await greenlet_spawn(connection.close)
+
+    release = asyncio.create_task(release_later())
+    second = await greenlet_spawn(pool.connect)
+    await release
+    await greenlet_spawn(second.close)
+
+    assert metrics.checkouts == 2
+    assert metrics.connect_histogram.count == 1
+    assert metrics.wait_histogram.sum_ms >= 150
+    assert pool.stats()["connect"]["count"] == 1
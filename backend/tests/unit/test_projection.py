@@ -0,0 +1,27 @@
+import pytest
+from pydantic import BaseModel
+
+from src.repositories.user import UserRepository
+from src.schemas import ShowUser
+from src.schemas.user_schemas import UserInDB
+
+
+async def test_projection_selects_schema_fields_only():
+    stmt = UserRepository(session=None)._projection(ShowUser)
+
+    assert list(stmt.selected_columns.keys()) == list(ShowUser.model_fields)
+    assert "hashed_password" not in str(stmt)
+
+
+async def test_projection_reads_aliased_columns():
+    stmt = UserRepository(session=None)._projection(UserInDB)
+
+    assert "user_accounts.hashed_password AS password" in str(stmt)
+
+
+async def test_projection_rejects_fields_without_column():
+    class UnknownField(BaseModel):
+        nickname: str
+
+    with pytest.raises(ValueError):
+        UserRepository(session=None)._projection(UnknownField)
@@ -0,0 +1,60 @@
+import time
+
+from starlette.requests import Request
+
+from src.routes.rate_limit import get_client_ip, parse_trusted_proxies
+from src.service_layer.rate_limiter import RateLimiter
+
+
+async def test_rate_limiter_allows_burst_up_to_limit():
+    limiter = RateLimiter(limit=3, period_seconds=60)
+
+    assert [limiter.hit("127.0.0.1") for _ in range(3)] == [0, 0, 0]
+    assert limiter.hit("127.0.0.1") > 0
+    assert limiter.hit("10.0.0.1") == 0
+
+
+async def test_rate_limiter_keeps_throttled_keys_when_full():
+    limiter = RateLimiter(limit=1, period_seconds=60, max_keys=2)
+    limiter.hit("first")
+    limiter.hit("second")
+
+    assert limiter.hit("third") > 0
+    assert limiter.stats()["keys"] == 2
+    assert limiter.stats()["rejected_full"] == 1
+    assert limiter.hit("first") > 0
+
+
+async def test_rate_limiter_evicts_expired_keys():
+    limiter = RateLimiter(limit=1, period_seconds=0.01, max_keys=2)
+    limiter.hit("first")
+    limiter.hit("second")
+    time.sleep(0.02)
+
+    assert limiter.hit("third") == 0
+    assert limiter.stats()["keys"] == 1
+
+
+def _request(peer: str, **headers: str) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "client": (peer, 50000),
+            "headers": [
+                (name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()
+            ],
+        }
+    )
+
+
+async def test_client_ip_is_read_from_trusted_proxies_only():
+    proxies = parse_trusted_proxies("10.0.0.0/8, 127.0.0.1")
+
+    assert (
+        get_client_ip(_request("203.0.113.7", x_forwarded_for="1.2.3.4"), proxies) == "203.0.113.7"
+    )
+    assert get_client_ip(_request("10.0.0.2", x_real_ip="198.51.100.1"), proxies) == "198.51.100.1"
+    assert get_client_ip(_request("10.0.0.2"), proxies) == "10.0.0.2"
+
+    spoofed = _request("127.0.0.1", x_forwarded_for="1.2.3.4, 198.51.100.1, 10.0.0.3")
+    assert get_client_ip(spoofed, proxies) == "198.51.100.1"
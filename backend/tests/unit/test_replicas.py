@@ -0,0 +1,44 @@
+import time
+from types import SimpleNamespace
+
+from src.db.replicas import Replica, ReplicaSet, is_read_your_writes_window
+
+
+def make_replica_set(selection: str, checked_out: list[int]) -> ReplicaSet:
+    replicas = [
+        Replica(
+            name=f"replica-{i}",
+            engine=SimpleNamespace(pool=SimpleNamespace(checkedout=lambda n=n: n)),
+        )
+        for i, n in enumerate(checked_out)
+    ]
+    return ReplicaSet(replicas, selection, max_lag_seconds=5, check_interval_seconds=1)
+
+
+async def test_round_robin_skips_replicas_out_of_rotation():
+    replica_set = make_replica_set("round_robin", [0, 0, 0])
+    replica_set.replicas[1].in_rotation = False
+    engines = [replica_set.replicas[i].engine for i in (0, 2)]
+
+    assert [replica_set.choose() for _ in range(4)] == engines * 2
+
+
+async def test_least_busy_picks_fewest_checked_out_connections():
+    replica_set = make_replica_set("least_busy", [3, 1, 2])
+
+    assert replica_set.choose() is replica_set.replicas[1].engine
+
+
+async def test_reads_fall_back_to_primary_without_replicas_in_rotation():
+    replica_set = make_replica_set("round_robin", [0])
+    replica_set.replicas[0].in_rotation = False
+
+    assert replica_set.choose() is None
+    assert replica_set.primary_reads == 1
+
+
+async def test_read_your_writes_window():
+    assert is_read_your_writes_window(str(time.time() + 5))
+    assert not is_read_your_writes_window(str(time.time() - 5))
+    assert not is_read_your_writes_window("garbage")
+    assert not is_read_your_writes_window(None)
@@ -0,0 +1,62 @@
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from src.service_layer.token_revocation import TokenRevocationRegistry
+
+
+class FakeUnitOfWork:
+    def __init__(self, versions: dict[int, tuple[int, datetime]]) -> None:
+        self.revoked_after: datetime | None = None
+
+        async def find_token_versions(revoked_after: datetime) -> dict:
+            self.revoked_after = revoked_after
+            return {
+                user_id: entry for user_id, entry in versions.items() if entry[1] > revoked_after
+            }
+
+        self.user = SimpleNamespace(find_token_versions=find_token_versions)
+
+    async def __aenter__(self) -> "FakeUnitOfWork":
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        pass
+
+
+async def test_tokens_of_older_versions_are_revoked():
+    registry = TokenRevocationRegistry(refresh_interval_seconds=30, max_token_age_seconds=60)
+
+    registry.revoke(1, 2)
+    registry.revoke(1, 1)
+
+    assert registry.is_revoked(1, 0)
+    assert registry.is_revoked(1, 1)
+    assert not registry.is_revoked(1, 2)
+    assert not registry.is_revoked(2, 0)
+
+
+async def test_revocations_older_than_a_token_lifetime_are_forgotten():
+    registry = TokenRevocationRegistry(refresh_interval_seconds=30, max_token_age_seconds=60)
+
+    registry.revoke(1, 1, revoked_at=time.time() - 120)
+    registry.revoke(2, 1, revoked_at=time.time() - 30)
+    registry.revoke(3, 1)
+
+    assert len(registry) == 2
+    assert not registry.is_revoked(1, 0)
+    assert registry.is_revoked(2, 0)
+
+
+async def test_refresh_loads_only_recent_revocations():
+    now = datetime.now(timezone.utc)
+    uow = FakeUnitOfWork({1: (3, now - timedelta(days=2)), 2: (1, now - timedelta(seconds=10))})
+    registry = TokenRevocationRegistry(refresh_interval_seconds=30, max_token_age_seconds=3600)
+    registry.revoke(3, 1, revoked_at=time.time() - 7200)
+
+    await registry.refresh(uow)
+
+    assert now - uow.revoked_after > timedelta(seconds=3599)
+    assert len(registry) == 1
+    assert registry.is_revoked(2, 0)
+    assert not registry.is_revoked(1, 0)
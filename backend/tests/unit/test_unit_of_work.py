@@ -0,0 +1,50 @@
+import pytest
+
+from src.service_layer.unit_of_work import UnitOfWork
+
+
+class FakeSession:
+    def __init__(self) -> None:
+        self.transaction_open = False
+        self.rollbacks = 0
+        self.closed = False
+
+    def in_transaction(self) -> bool:
+        return self.transaction_open
+
+    async def commit(self) -> None:
+        self.transaction_open = False
+
+    async def rollback(self) -> None:
+        self.transaction_open = False
+        self.rollbacks += 1
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+async def test_nested_blocks_share_the_session_and_end_their_transactions():
+    sessions = []
+    uow = UnitOfWork(lambda: sessions.append(FakeSession()) or sessions[-1])
+
+    async with uow:
+        async with uow:
+            uow.session.transaction_open = True
+        assert uow.session.rollbacks == 1
+        assert not uow.session.closed
+
+        async with uow:
+            uow.session.transaction_open = True
+            await uow.commit()
+        assert uow.session.rollbacks == 1
+
+    assert len(sessions) == 1
+    assert sessions[0].closed
+
+
+async def test_read_only_unit_of_work_refuses_to_commit():
+    uow = UnitOfWork(FakeSession, read_only=True)
+
+    async with uow:
+        with pytest.raises(RuntimeError):
+            await uow.commit()
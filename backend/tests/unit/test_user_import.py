@@ -0,0 +1,34 @@
+from src.service_layer.user_import import batched, detect_import_format, read_user_rows
+
+
+async def test_detect_import_format():
+    assert detect_import_format("users.CSV") == "csv"
+    assert detect_import_format("users.jsonl") == "ndjson"
+    assert detect_import_format("users.xlsx") is None
+    assert detect_import_format(None) is None
+
+
+async def test_read_user_rows_from_csv_splits_roles_and_drops_empty_cells():
+    lines = ["username,email,password,fullname,roles", "john,john@example.com,123,,TUTOR; STUDENT"]
+
+    assert list(read_user_rows(lines, "csv")) == [
+        (
+            1,
+            {
+                "username": "john",
+                "email": "john@example.com",
+                "password": "123",
+                "roles": ["TUTOR", "STUDENT"],
+            },
+        )
+    ]
+
+
+async def test_read_user_rows_from_ndjson_passes_invalid_lines_on():
+    lines = ['{"username": "john"}\n', "\n", "not json\n"]
+
+    assert list(read_user_rows(lines, "ndjson")) == [(1, {"username": "john"}), (2, "not json\n")]
+
+
+async def test_batched():
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import random
+
+from src.controllers.ws import ConnectionManager
+from src.controllers.ws_fanout import FanoutBackend, PostgresFanout
+from tests.unit.test_ws_manager import FakeWebSocket
+
+
+def make_fanout(origin: str, received: list) -> PostgresFanout:
+    fanout = PostgresFanout(dsn="", channel="test", batch_interval_seconds=0, max_payload_bytes=500)
+    fanout.origin = origin
+    fanout._deliver = received.append
+    return fanout
+
+
+def test_small_events_are_packed_within_the_payload_limit():
+    received: list = []
+    sender, receiver = make_fanout("a", []), make_fanout("b", received)
+    events = [{"kind": "broadcast", "message": f"message {i}"} for i in range(100)]
+
+    payloads = sender.encode([json.dumps(event) for event in events])
+
+    assert 1 < len(payloads) < 20
+    assert all(len(payload) <= 500 for payload in payloads)
+    assert len(set(payloads)) == len(payloads)
+    for payload in payloads:
+        receiver.receive(payload)
+    assert received == events
+
+
+def test_large_event_is_chunked_and_reassembled():
+    received: list = []
+    sender, receiver = make_fanout("a", []), make_fanout("b", received)
+    event = {"kind": "topic", "topic": "room:1", "message": "ä" * 3000}
+
+    before, after = {"kind": "user", "user_id": 1, "message": ""}, {"kind": "broadcast"}
+    payloads = sender.encode([json.dumps(before), json.dumps(event), json.dumps(after)])
+    chunks = payloads[1:-1]
+    random.shuffle(chunks)
+
+    assert len(chunks) > 1
+    assert all(len(payload) <= 500 for payload in payloads)
+    for payload in [payloads[0], *chunks, payloads[-1]]:
+        receiver.receive(payload)
+    assert received == [before, event, after]
+    assert receiver._chunks == {}
+
+
+def test_own_and_malformed_notifications_are_ignored():
+    received: list = []
+    fanout = make_fanout("a", received)
+
+    for payload in fanout.encode([json.dumps({"kind": "broadcast", "message": "own"})]):
+        fanout.receive(payload)
+    fanout.receive("not json")
+    fanout.receive('{"o": "b"}')
+
+    assert received == []
+
+
+class RecordingFanout(FanoutBackend):
+    def __init__(self) -> None:
+        self.events: list = []
+
+    def publish(self, event: dict) -> None:
+        self.events.append(event)
+
+
+async def test_manager_hands_events_to_the_fanout_and_delivers_remote_ones():
+    fanout = RecordingFanout()
+    manager = ConnectionManager(fanout=fanout)
+
+    manager.publish("room:1", {"text": "hi"})
+    manager.send_personal_message(1, "personal")
+    manager.broadcast("everyone")
+    manager.broadcast("this worker", local=True)
+
+    assert [event["kind"] for event in fanout.events] == ["topic", "user", "broadcast"]
+
+    other = ConnectionManager(fanout=RecordingFanout())
+    websocket = FakeWebSocket()
+    connection = await other.connect(1, websocket)
+    other.subscribe(connection, "room:1")
+    await asyncio.sleep(0)
+    for event in fanout.events:
+        other.deliver(event)
+    await asyncio.sleep(0)
+
+    assert websocket.sent == [event["message"] for event in fanout.events]
+    assert [json.loads(message)["data"] for message in websocket.sent] == [
+        {"text": "hi"},
+        "personal",
+        "everyone",
+    ]
+    assert other.fanout.events == []
+    await other.close_all()
@@ -0,0 +1,69 @@
+import asyncio
+import json
+
+from src.controllers.ws import ConnectionManager
+from src.controllers.ws_framing import (
+    MSGPACK_SUBPROTOCOL,
+    MsgpackFraming,
+    OutgoingMessage,
+    decode_frame,
+)
+from tests.unit.test_ws_manager import FakeWebSocket
+
+
+def make_manager(**framing: float) -> ConnectionManager:
+    options = {
+        "batch_interval_seconds": 0.01,
+        "max_batch_messages": 100,
+        "compression_threshold_bytes": 10_000,
+        **framing,
+    }
+    return ConnectionManager(framings={MSGPACK_SUBPROTOCOL: MsgpackFraming(**options)})
+
+
+async def test_client_negotiates_binary_framing():
+    manager = make_manager()
+    text, binary = FakeWebSocket(), FakeWebSocket(subprotocols=("chat", MSGPACK_SUBPROTOCOL))
+    await manager.connect(1, text)
+    await manager.connect(2, binary)
+
+    assert text.subprotocol is None
+    assert binary.subprotocol == MSGPACK_SUBPROTOCOL
+    assert manager.stats()["binary_connections"] == 1
+    await manager.close_all()
+
+
+async def test_messages_within_the_interval_share_one_frame():
+    manager = make_manager(max_batch_messages=3)
+    text, binary = FakeWebSocket(), FakeWebSocket(subprotocols=(MSGPACK_SUBPROTOCOL,))
+    await manager.connect(1, text)
+    await manager.connect(2, binary)
+    await asyncio.sleep(0)
+
+    for i in range(5):
+        manager.broadcast(str(i))
+    manager.broadcast("local", local=True)
+    await asyncio.sleep(0.05)
+
+    assert len(text.sent) == 6
+    assert [len(decode_frame(frame)) for frame in binary.sent] == [3, 3]
+    received = [message for frame in binary.sent for message in decode_frame(frame)]
+    assert received == [json.loads(message) for message in text.sent]
+    assert manager.sent_messages == 12
+    await manager.close_all()
+
+
+def test_only_large_frames_are_compressed():
+    framing = MsgpackFraming(
+        batch_interval_seconds=0, max_batch_messages=100, compression_threshold_bytes=200
+    )
+    small = [OutgoingMessage(json.dumps({"type": "message", "data": "x"}))]
+    large = [OutgoingMessage(json.dumps({"type": "message", "data": "x" * 500}))] * 3
+
+    small_frame, large_frame = framing.encode(small), framing.encode(large)
+
+    assert small_frame[0] == 0
+    assert large_frame[0] == 1
+    assert len(large_frame) < 200
+    assert decode_frame(small_frame) == [{"type": "message", "data": "x"}]
+    assert decode_frame(large_frame) == [{"type": "message", "data": "x" * 500}] * 3
@@ -0,0 +1,69 @@
+import asyncio
+import json
+
+from fastapi import status
+
+from src.controllers.ws import ConnectionManager
+from tests.unit.test_ws_manager import FakeWebSocket
+
+PONG = json.dumps({"action": "pong"})
+
+
+async def test_unresponsive_client_is_pinged_then_evicted():
+    manager = ConnectionManager(heartbeat_interval_seconds=0.02, heartbeat_timeout_seconds=0.02)
+    silent, answering = FakeWebSocket(), FakeWebSocket()
+    await manager.connect(1, silent)
+    connection = await manager.connect(2, answering)
+
+    for _ in range(6):
+        await asyncio.sleep(0.015)
+        if answering.sent:
+            manager.handle_message(connection, PONG)
+
+    assert silent.sent[0] == json.dumps({"type": "ping"})
+    assert silent.close_code == status.WS_1001_GOING_AWAY
+    assert list(manager.active_connections) == [2]
+    assert answering.close_code is None
+    stats = manager.stats()["heartbeat"]
+    assert stats["unresponsive_evictions"] == 1
+    assert stats["pings_sent"] >= 2
+    await manager.close_all()
+
+
+async def test_active_client_is_not_pinged():
+    manager = ConnectionManager(heartbeat_interval_seconds=0.03, heartbeat_timeout_seconds=0.03)
+    websocket = FakeWebSocket()
+    connection = await manager.connect(1, websocket)
+
+    for _ in range(5):
+        await asyncio.sleep(0.01)
+        manager.handle_message(connection, "ping")
+
+    assert all(message.startswith("WS Pong") for message in websocket.sent)
+    assert manager.heartbeat.stats()["scheduled"] == 1
+    await manager.close_all()
+    assert manager.heartbeat.stats()["scheduled"] == 0
+
+
+async def test_idle_client_is_evicted_although_it_answers_pings():
+    manager = ConnectionManager(
+        heartbeat_interval_seconds=0.01, heartbeat_timeout_seconds=0.05, idle_timeout_seconds=0.05
+    )
+    websocket = FakeWebSocket()
+    connection = await manager.connect(1, websocket)
+
+    for _ in range(10):
+        await asyncio.sleep(0.01)
+        manager.handle_message(connection, PONG)
+
+    assert manager.active_connections == {}
+    assert manager.heartbeat.idle_evictions == 1
+    assert manager.heartbeat.unresponsive_evictions == 0
+
+
+async def test_disabled_heartbeat_schedules_nothing():
+    manager = ConnectionManager(heartbeat_interval_seconds=0)
+    await manager.connect(1, FakeWebSocket())
+
+    assert manager.heartbeat.stats()["scheduled"] == 0
+    await manager.close_all()
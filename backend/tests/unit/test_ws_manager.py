@@ -0,0 +1,260 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import status
+
+from src.controllers.ws import ConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(
+        self, blocked: bool = False, fail_close: bool = False, subprotocols: tuple = ()
+    ) -> None:
+        self.scope = {"subprotocols": list(subprotocols)}
+        self.subprotocol: str | None = None
+        self.sent: list = []
+        self.close_code: int | None = None
+        self.fail_close = fail_close
+        self.unblocked = asyncio.Event()
+        if not blocked:
+            self.unblocked.set()
+
+    async def accept(self, subprotocol: str | None = None) -> None:
+        self.subprotocol = subprotocol
+
+    async def send_text(self, message: str) -> None:
+        await self.unblocked.wait()
+        self.sent.append(message)
+
+    async def send_bytes(self, message: bytes) -> None:
+        await self.unblocked.wait()
+        self.sent.append(message)
+
+    async def close(self, code: int) -> None:
+        if self.fail_close:
+            raise RuntimeError("Connection already closed")
+        self.close_code = code
+
+
+def received(websocket: FakeWebSocket) -> list:
+    return [json.loads(message)["data"] for message in websocket.sent]
+
+
+async def connect(manager: ConnectionManager, *websockets: FakeWebSocket) -> None:
+    for user_id, websocket in enumerate(websockets):
+        await manager.connect(user_id, websocket)
+    # Let the writers start.
+    await asyncio.sleep(0)
+
+
+async def test_slow_client_does_not_stall_broadcast():
+    manager = ConnectionManager(queue_size=2, overflow_policy="drop_oldest")
+    fast, slow = FakeWebSocket(), FakeWebSocket(blocked=True)
+    await connect(manager, fast, slow)
+
+    for i in range(5):
+        assert manager.broadcast(str(i)) == 2
+        await asyncio.sleep(0)
+
+    assert received(fast) == ["0", "1", "2", "3", "4"]
+    assert manager.stats()["max_queue_depth"] == 2
+    slow.unblocked.set()
+    await asyncio.sleep(0.01)
+    # The first message was taken by the blocked writer, then the queue kept the newest two.
+    assert received(slow) == ["0", "3", "4"]
+    assert manager.dropped_messages == 2
+    await manager.close_all()
+
+
+async def test_drop_newest_keeps_queued_messages():
+    manager = ConnectionManager(queue_size=1, overflow_policy="drop_newest")
+    slow = FakeWebSocket(blocked=True)
+    await connect(manager, slow)
+
+    assert manager.send_personal_message(0, "0")
+    await asyncio.sleep(0)
+    assert [manager.send_personal_message(0, str(i)) for i in range(1, 4)] == [True, False, False]
+    slow.unblocked.set()
+    await asyncio.sleep(0.01)
+
+    assert received(slow) == ["0", "1"]
+    await manager.close_all()
+
+
+async def test_disconnect_policy_closes_slow_client():
+    manager = ConnectionManager(queue_size=1, overflow_policy="disconnect")
+    fast, slow = FakeWebSocket(), FakeWebSocket(blocked=True)
+    await connect(manager, fast, slow)
+
+    for i in range(3):
+        manager.broadcast(str(i))
+        await asyncio.sleep(0)
+
+    assert list(manager.active_connections) == [0]
+    assert slow.close_code == status.WS_1013_TRY_AGAIN_LATER
+    assert manager.slow_disconnects == 1
+    await manager.close_all()
+
+
+async def test_client_not_reading_is_disconnected():
+    manager = ConnectionManager(send_timeout_seconds=0.01)
+    slow = FakeWebSocket(blocked=True)
+    await connect(manager, slow)
+
+    manager.broadcast("message")
+    await asyncio.sleep(0.05)
+
+    assert manager.active_connections == {}
+    assert slow.close_code == status.WS_1013_TRY_AGAIN_LATER
+
+
+async def test_user_receives_personal_messages_on_every_connection():
+    manager = ConnectionManager()
+    first, second = FakeWebSocket(), FakeWebSocket()
+    first_connection = await manager.connect(1, first)
+    await manager.connect(1, second)
+    await asyncio.sleep(0)
+
+    assert manager.send_personal_message(1, "both") == 2
+    await asyncio.sleep(0)
+    manager.disconnect(first_connection)
+    assert manager.send_personal_message(1, "second") == 1
+    await asyncio.sleep(0)
+
+    assert received(first) == ["both"]
+    assert received(second) == ["both", "second"]
+    await manager.close_all()
+
+
+async def test_publish_reaches_topic_subscribers_only():
+    manager = ConnectionManager()
+    room, dashboard, both = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+    await connect(manager, room, dashboard, both)
+    connections = {c.websocket: c for cs in manager.active_connections.values() for c in cs}
+    manager.subscribe(connections[room], "room:1")
+    manager.subscribe(connections[dashboard], "dashboard:tutor")
+    manager.subscribe(connections[both], "room:1")
+    manager.subscribe(connections[both], "dashboard:tutor")
+
+    assert manager.publish("room:1", {"text": "hello"}) == 2
+    assert manager.publish("room:2", {"text": "nobody"}) == 0
+    manager.unsubscribe(connections[both], "room:1")
+    assert manager.publish("room:1", "again") == 1
+    await asyncio.sleep(0)
+
+    assert received(room) == [{"text": "hello"}, "again"]
+    assert dashboard.sent == []
+    message = json.loads(both.sent[0])
+    assert message.pop("seq") < json.loads(room.sent[1])["seq"]
+    assert message == {
+        "type": "message",
+        "origin": manager.replay.origin,
+        "topic": "room:1",
+        "data": {"text": "hello"},
+    }
+    await manager.close_all()
+
+
+async def test_removed_connection_leaves_its_topics():
+    manager = ConnectionManager(queue_size=1, overflow_policy="disconnect")
+    slow = FakeWebSocket(blocked=True)
+    connection = await manager.connect(1, slow)
+    manager.subscribe(connection, "room:1")
+    await asyncio.sleep(0)
+
+    for i in range(3):
+        manager.publish("room:1", i)
+    await asyncio.sleep(0)
+
+    assert manager.active_connections == {}
+    assert manager.topic_subscribers == {}
+    await manager.close_all()
+
+
+async def test_handle_message():
+    manager = ConnectionManager(max_topics_per_connection=1)
+    websocket = FakeWebSocket()
+    connection = await manager.connect(1, websocket, roles=["TUTOR"])
+    await asyncio.sleep(0)
+
+    for text in (
+        "ping",
+        '{"action": "subscribe", "topic": "room:1"}',
+        '{"action": "subscribe", "topic": "room:2"}',
+        '{"action": "subscribe", "topic": "room 1"}',
+        '{"action": "unsubscribe", "topic": "room:1"}',
+    ):
+        manager.handle_message(connection, text)
+        await asyncio.sleep(0)
+
+    assert websocket.sent[0] == "WS Pong: ping"
+    replies = [json.loads(message) for message in websocket.sent[1:]]
+    assert replies[0] == {"type": "subscribed", "topic": "room:1"}
+    assert replies[1]["type"] == "error"
+    assert replies[2]["type"] == "error"
+    assert replies[3] == {"type": "unsubscribed", "topic": "room:1"}
+    assert manager.topic_subscribers == {}
+    await manager.close_all()
+
+
+async def test_close_all_closes_every_connection():
+    manager = ConnectionManager()
+    websockets = [FakeWebSocket(), FakeWebSocket(fail_close=True), FakeWebSocket()]
+    await connect(manager, *websockets)
+
+    await manager.close_all()
+
+    assert manager.active_connections == {}
+    assert [websocket.close_code for websocket in websockets] == [
+        status.WS_1001_GOING_AWAY,
+        None,
+        status.WS_1001_GOING_AWAY,
+    ]
+
+
+def test_unknown_overflow_policy():
+    with pytest.raises(ValueError):
+        ConnectionManager(overflow_policy="block")
+
+
+async def test_clients_only_subscribe_to_authorized_topics():
+    manager = ConnectionManager()
+    student, tutor = FakeWebSocket(), FakeWebSocket()
+    connections = {
+        student: await manager.connect(1, student, roles=["STUDENT"]),
+        tutor: await manager.connect(2, tutor, roles=["TUTOR"]),
+    }
+    await asyncio.sleep(0)
+
+    for websocket, topic in [
+        (student, "dashboard:student"),
+        (student, "dashboard:tutor"),
+        (student, "room:1"),
+        (tutor, "room:1"),
+        (tutor, "dashboard:user_admin"),
+        (tutor, "unknown:1"),
+    ]:
+        manager.handle_message(
+            connections[websocket], json.dumps({"action": "subscribe", "topic": topic})
+        )
+    manager.handle_message(
+        connections[student],
+        json.dumps({"action": "resume", "topics": ["dashboard:student", "room:2"]}),
+    )
+    await asyncio.sleep(0)
+
+    assert [json.loads(message)["type"] for message in student.sent] == [
+        "subscribed",
+        "error",
+        "error",
+        "error",
+    ]
+    assert [json.loads(message)["type"] for message in tutor.sent] == [
+        "subscribed",
+        "error",
+        "error",
+    ]
+    assert manager.topic_subscribers.keys() == {"dashboard:student", "room:1"}
+    assert manager.stats()["denied_subscriptions"] == 5
+    await manager.close_all()
@@ -0,0 +1,179 @@
+import asyncio
+import json
+
+from src.controllers.ws import ConnectionManager
+from src.controllers.ws_fanout import FanoutBackend
+from src.controllers.ws_replay import ReplayStore
+from tests.unit.test_ws_manager import FakeWebSocket
+
+
+def test_sequence_numbers_count_the_messages_of_the_origin():
+    store = ReplayStore(buffer_size=10, max_streams=10)
+    store.start()
+
+    assert [store.next_seq() for _ in range(3)] == [1, 2, 3]
+    assert store.cursor() == {store.origin: 0}
+
+
+def test_replay_returns_the_gap_of_the_streams_in_arrival_order():
+    store = ReplayStore(buffer_size=3, max_streams=10)
+    store.start()
+    for i in range(1, 6):
+        store.record("a", "x", i, f"a{i}")
+    store.record("b", "y", 1, "b1")
+    store.record("c", "x", 6, "c6")
+
+    assert store.replay(["a", "b"], {"x": 3, "y": 0}) == (["a4", "a5", "b1"], True)
+    assert store.replay(["a"], {"x": 2}) == (["a3", "a4", "a5"], True)
+    # a2 was pushed out of the buffer.
+    assert store.replay(["a"], {"x": 1}) == (["a3", "a4", "a5"], False)
+    # Messages of an origin the client does not know are all new to it.
+    assert store.replay(["b"], {"x": 5}) == (["b1"], True)
+    assert store.replay(["unknown"], {"x": 6}) == ([], True)
+    assert store.cursor() == {store.origin: 0, "x": 6, "y": 1}
+
+
+def test_messages_this_worker_did_not_receive_are_incomplete():
+    store = ReplayStore(buffer_size=3, max_streams=1)
+    store.start()
+
+    # The worker started after the first four messages of x, and x5 never arrived.
+    store.record("a", "x", 5, "x5")
+    store.record("a", "x", 7, "x7")
+
+    assert store.replay(["a"], {"x": 3})[1] is False
+    assert store.replay(["a"], {"x": 5})[1] is False
+    assert store.replay(["a"], {"x": 6}) == (["x7"], True)
+    # The worker never heard of z, which may have sent the client messages it missed.
+    assert store.replay(["a"], {"x": 6, "z": 1})[1] is False
+    assert store.stats()["lost_messages"] == 1
+
+    store.record("b", "x", 8, "x8")
+
+    assert store.evicted_streams == 1
+    assert store.replay(["a", "b"], {"x": 6})[1] is False
+    assert store.replay(["b"], {"x": 7}) == (["x8"], True)
+
+
+class LinkedFanout(FanoutBackend):
+    """Hands the published events to the test, which delivers them to other workers."""
+
+    def __init__(self) -> None:
+        self.events: list = []
+
+    def publish(self, event: dict) -> None:
+        self.events.append(event)
+
+
+async def start_worker() -> ConnectionManager:
+    manager = ConnectionManager(fanout=LinkedFanout())
+    await manager.start()
+    return manager
+
+
+async def connect(manager: ConnectionManager, cursor: dict | None) -> tuple:
+    websocket = FakeWebSocket()
+    connection = await manager.connect(1, websocket, roles=["TUTOR"])
+    await asyncio.sleep(0)
+    manager.handle_message(
+        connection, json.dumps({"action": "resume", "cursor": cursor, "topics": ["room:1"]})
+    )
+    await asyncio.sleep(0)
+    return connection, websocket
+
+
+def received(websocket: FakeWebSocket, cursor: dict) -> list:
+    data = []
+    for message in map(json.loads, websocket.sent):
+        if message["type"] == "resumed":
+            cursor.update(message["cursor"])
+        elif message["type"] == "message":
+            cursor[message["origin"]] = max(cursor.get(message["origin"], 0), message["seq"])
+            data.append(message["data"])
+    return data
+
+
+async def test_client_resumes_on_another_worker_without_gaps_or_duplicates():
+    a, b = await start_worker(), await start_worker()
+    connection, websocket = await connect(b, None)
+    cursor: dict = {}
+
+    # The event of a reaches b only after b published its own, so b sends them to the client
+    # in another order than a has them.
+    a.publish("room:1", "a1")
+    b.publish("room:1", "b1")
+    for event in a.fanout.events:
+        b.deliver(event)
+    for event in b.fanout.events:
+        a.deliver(event)
+    a.fanout.events.clear()
+    b.fanout.events.clear()
+    await asyncio.sleep(0)
+    assert received(websocket, cursor) == ["b1", "a1"]
+    b.disconnect(connection)
+
+    b.publish("room:1", "b2")
+    a.publish("room:1", "a2")
+    a.send_personal_message(1, "personal")
+    a.broadcast("only a", local=True)
+    for event in b.fanout.events:
+        a.deliver(event)
+
+    connection, websocket = await connect(a, cursor)
+    resumed = json.loads(websocket.sent[0])
+    assert resumed["complete"] is True
+    assert received(websocket, cursor) == ["a2", "personal", "b2"]
+    assert cursor == a.replay.cursor()
+
+    # Resuming again from the new cursor replays nothing twice.
+    _, websocket = await connect(a, cursor)
+    assert json.loads(websocket.sent[0])["replayed"] == 0
+    for manager in (a, b):
+        await manager.close_all()
+        await manager.stop()
+
+
+async def test_new_client_starts_at_the_current_cursor():
+    manager = await start_worker()
+    manager.publish("room:1", "before")
+
+    _, websocket = await connect(manager, None)
+
+    assert json.loads(websocket.sent[0]) == {
+        "type": "resumed",
+        "complete": True,
+        "replayed": 0,
+        "cursor": {manager.replay.origin: 1},
+    }
+    assert len(websocket.sent) == 1
+    await manager.close_all()
+    await manager.stop()
+
+
+async def test_resume_too_far_back_asks_for_a_reload():
+    manager = ConnectionManager(replay_buffer_size=2)
+    await manager.start()
+    websocket = FakeWebSocket()
+    connection = await manager.connect(1, websocket)
+    await asyncio.sleep(0)
+    for i in range(3):
+        manager.send_personal_message(2, str(i))
+    for i in range(3):
+        manager.broadcast(str(i))
+
+    cursor = {manager.replay.origin: 3}
+    manager.handle_message(connection, json.dumps({"action": "resume", "cursor": cursor}))
+    await asyncio.sleep(0)
+
+    replies = [json.loads(message) for message in websocket.sent]
+    resumed = [reply for reply in replies if reply["type"] == "resumed"]
+    assert resumed == [
+        {
+            "type": "resumed",
+            "complete": False,
+            "replayed": 0,
+            "cursor": {manager.replay.origin: 6},
+        }
+    ]
+    await manager.close_all()
+    await manager.stop()
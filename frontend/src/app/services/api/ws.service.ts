@@ -1,8 +1,10 @@
 /* eslint-disable no-console */
 import { Injectable } from '@angular/core';
-import { BehaviorSubject, Observable, combineLatest, filter, startWith } from 'rxjs';
+import { BehaviorSubject, Observable, Subject, combineLatest, filter, startWith } from 'rxjs';
 import { MachineHistoryItem } from '../../openapi/models/machine-history-item';
 
+type WsEvent = { event?: string; [key: string]: unknown };
+
 @Injectable({
   providedIn: 'root',
 })
@@ -19,6 +21,12 @@ export class WSService {
 
   machineHistoryUpdate$ = new BehaviorSubject<MachineHistoryItem | undefined>(undefined);
 
+  // Emits when messages were missed while disconnected and the state has to be reloaded.
+  reloadRequired$ = new Subject<void>();
+
+  // The seq of the last message received per origin (server worker), sent on reconnect.
+  private cursor: Record<string, number> | null = null;
+
   constructor() {
     this.connect();
   }
@@ -37,36 +45,39 @@ export class WSService {
         return;
       }
       try {
-        const data = JSON.parse(event.data);
-        switch (data.event) {
-          case 'PRESET_LIST_UPDATED':
-            this.presetsListUpdated$.next('');
+        const message = JSON.parse(event.data);
+        switch (message.type) {
+          case 'message': {
+            // Messages a worker sends only to its own clients have no origin and are not replayed.
+            if (typeof message.origin === 'string' && typeof message.seq === 'number') {
+              this.cursor = {
+                ...this.cursor,
+                [message.origin]: Math.max(this.cursor?.[message.origin] ?? 0, message.seq),
+              };
+            }
+            const data = this.parseEventData(message.data);
+            if (data) {
+              this.handleEvent(data);
+            } else {
+              console.warn('Server message', message.data);
+            }
             break;
-          case 'PRESET_UPDATED':
-            this.presetUpdated$.next(data.id.toString());
+          }
+          case 'resumed':
+            this.cursor = message.cursor;
+            if (!message.complete) {
+              this.reload();
+            }
             break;
-          case 'ASSET_DOWNLOAD_COMPLETE':
-            this.assetStatusUpdate$.next('');
+          case 'ping':
+            // The server evicts connections that do not answer its heartbeat.
+            ws.send(JSON.stringify({ action: 'pong' }));
             break;
-
-          case 'FILE_STATUS_UPDATE':
-            this.wizardFileProgress$.next('');
+          case 'error':
+            console.error('Websocket error', message.detail);
             break;
-
-          case 'PORTAL_STATUS_UPDATE':
-            this.portalSrtatusUpdate$.next('');
-            break;
-
-          case 'MACHINE_HISTORY_UPDATE':
-            this.machineHistoryUpdate$.next({
-              id: data.id,
-              operation: data.operation,
-              date: data.date,
-            } as MachineHistoryItem);
-            break;
-
           default:
-            console.error('Unknown event', data.event);
+            break;
         }
       } catch (e) {
         console.error('Error', e);
@@ -75,6 +86,7 @@ export class WSService {
 
     ws.onopen = () => {
       console.info('connected');
+      ws.send(JSON.stringify({ action: 'resume', cursor: this.cursor }));
       ws.send('WS ping');
     };
 
@@ -87,4 +99,57 @@ export class WSService {
       }, 1000);
     };
   }
+
+  // Event data is an object or its JSON, other data, e.g. a plain-text notice, is not an event.
+  private parseEventData(data: unknown): WsEvent | null {
+    if (typeof data === 'string') {
+      try {
+        return this.parseEventData(JSON.parse(data));
+      } catch {
+        return null;
+      }
+    }
+    return typeof data === 'object' && data !== null ? (data as WsEvent) : null;
+  }
+
+  private handleEvent(data: WsEvent) {
+    switch (data.event) {
+      case 'PRESET_LIST_UPDATED':
+        this.presetsListUpdated$.next('');
+        break;
+      case 'PRESET_UPDATED':
+        this.presetUpdated$.next(String(data['id']));
+        break;
+      case 'ASSET_DOWNLOAD_COMPLETE':
+        this.assetStatusUpdate$.next('');
+        break;
+
+      case 'FILE_STATUS_UPDATE':
+        this.wizardFileProgress$.next('');
+        break;
+
+      case 'PORTAL_STATUS_UPDATE':
+        this.portalSrtatusUpdate$.next('');
+        break;
+
+      case 'MACHINE_HISTORY_UPDATE':
+        this.machineHistoryUpdate$.next({
+          id: data['id'],
+          operation: data['operation'],
+          date: data['date'],
+        } as MachineHistoryItem);
+        break;
+
+      default:
+        console.error('Unknown event', data.event);
+    }
+  }
+
+  private reload() {
+    this.presetsListUpdated$.next('');
+    this.assetStatusUpdate$.next('');
+    this.wizardFileProgress$.next('');
+    this.portalSrtatusUpdate$.next('');
+    this.reloadRequired$.next();
+  }
 }